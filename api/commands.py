@@ -549,6 +549,45 @@ def add_qdrant_index(field: str):
     click.echo(click.style(f"Index creation complete. Created {create_count} collection indexes.", fg="green"))
 
 
+@click.command("add-oceanbase-metadata-index", help="Add OceanBase metadata columns and indexes.")
+def add_oceanbase_metadata_index():
+    """
+    Add the generated document_id / doc_id / dataset_id columns and their indexes
+    to OceanBase collections created before they were introduced.
+    """
+    click.echo(click.style("Starting OceanBase metadata index creation.", fg="green"))
+
+    from core.rag.datasource.vdb.oceanbase.oceanbase_vector import OceanBaseVector, OceanBaseVectorConfig
+
+    config = OceanBaseVectorConfig(
+        host=dify_config.OCEANBASE_VECTOR_HOST or "",
+        port=dify_config.OCEANBASE_VECTOR_PORT or 0,
+        user=dify_config.OCEANBASE_VECTOR_USER or "",
+        password=(dify_config.OCEANBASE_VECTOR_PASSWORD or ""),
+        database=dify_config.OCEANBASE_VECTOR_DATABASE or "",
+    )
+
+    collection_names = {binding.collection_name.lower() for binding in db.session.query(DatasetCollectionBinding).all()}
+    datasets = db.session.query(Dataset).filter(Dataset.index_struct.isnot(None)).all()
+    for dataset in datasets:
+        index_struct = dataset.index_struct_dict
+        if index_struct and index_struct.get("type") == VectorType.OCEANBASE:
+            collection_names.add(index_struct["vector_store"]["class_prefix"].lower())
+
+    upgraded_count = 0
+    for collection_name in sorted(collection_names):
+        try:
+            if OceanBaseVector(collection_name, config).add_metadata_columns():
+                upgraded_count += 1
+                click.echo(click.style(f"Added metadata index for collection: {collection_name}.", fg="green"))
+        except Exception as e:
+            click.echo(
+                click.style(f"Failed to add metadata index for collection {collection_name}: {str(e)}.", fg="red")
+            )
+
+    click.echo(click.style(f"Index creation complete. Upgraded {upgraded_count} OceanBase collections.", fg="green"))
+
+
 @click.command("old-metadata-migration", help="Old metadata migration.")
 def old_metadata_migration():
     """
@@ -688,9 +727,48 @@ def ensure_caches_table_exists():
             INDEX caches_expire_time_idx (expire_time)
         ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
         """
+        # 本地缓存层（MYSQL_CACHE_LOCAL_ENABLED）使用的跨进程失效日志表
+        create_cache_invalidations_table_sql = """
+        CREATE TABLE IF NOT EXISTS cache_invalidations (
+            id BIGINT AUTO_INCREMENT PRIMARY KEY,
+            cache_key VARCHAR(255) NOT NULL,
+            created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            INDEX cache_invalidations_created_at_idx (created_at)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+        """
+
+        # 有序集合（zadd/zremrangebyscore/zcard）按成员存储，(cache_key, score) 上建索引
+        create_cache_sorted_sets_table_sql = """
+        CREATE TABLE IF NOT EXISTS cache_sorted_sets (
+            id BIGINT AUTO_INCREMENT PRIMARY KEY,
+            cache_key VARCHAR(255) NOT NULL,
+            member VARCHAR(255) NOT NULL,
+            score DOUBLE NOT NULL,
+            expire_time DATETIME NULL,
+            UNIQUE INDEX cache_sorted_sets_key_member_idx (cache_key, member),
+            INDEX cache_sorted_sets_key_score_idx (cache_key, score),
+            INDEX cache_sorted_sets_expire_time_idx (expire_time)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+        """
+
+        # 哈希（hset/hgetall/hlen/hdel）按字段存储，(cache_key, field) 唯一
+        create_cache_hashes_table_sql = """
+        CREATE TABLE IF NOT EXISTS cache_hashes (
+            id BIGINT AUTO_INCREMENT PRIMARY KEY,
+            cache_key VARCHAR(255) NOT NULL,
+            field VARCHAR(255) NOT NULL,
+            value LONGBLOB NOT NULL,
+            expire_time DATETIME NULL,
+            UNIQUE INDEX cache_hashes_key_field_idx (cache_key, field),
+            INDEX cache_hashes_expire_time_idx (expire_time)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+        """
 
         with db.engine.begin() as conn:
             conn.execute(db.text(create_caches_table_sql))
+            conn.execute(db.text(create_cache_invalidations_table_sql))
+            conn.execute(db.text(create_cache_sorted_sets_table_sql))
+            conn.execute(db.text(create_cache_hashes_table_sql))
             click.echo(click.style("Caches table ensured for MySQL cache mode.", fg="green"))
 
     except Exception as e:
@@ -74,6 +74,15 @@ class AppExecutionConfig(BaseSettings):
         description="Maximum number of requests per app per day",
         default=5000,
     )
+    APP_STOP_FLAG_CHECK_INTERVAL: NonNegativeInt = Field(
+        description="Interval in milliseconds at which running apps check whether they were asked to stop",
+        default=500,
+    )
+    APP_STOP_FLAG_BATCH_POLLING_ENABLED: bool = Field(
+        description="Check the stop flags of all apps running in a process with one cache lookup per interval,"
+        " instead of one lookup per app",
+        default=True,
+    )
 
 
 class CodeExecutionSandboxConfig(BaseSettings):
@@ -106,6 +115,26 @@ class CodeExecutionSandboxConfig(BaseSettings):
         default=10.0,
     )
 
+    CODE_EXECUTION_POOL_MAX_CONNECTIONS: PositiveInt = Field(
+        description="Maximum number of concurrent connections to the code execution service",
+        default=100,
+    )
+
+    CODE_EXECUTION_POOL_MAX_KEEPALIVE_CONNECTIONS: NonNegativeInt = Field(
+        description="Maximum number of idle keep-alive connections to the code execution service",
+        default=20,
+    )
+
+    CODE_EXECUTION_POOL_KEEPALIVE_EXPIRY: PositiveFloat = Field(
+        description="Seconds after which an idle keep-alive connection to the code execution service is closed",
+        default=5.0,
+    )
+
+    CODE_EXECUTION_BATCH_CONCURRENCY: PositiveInt = Field(
+        description="Maximum number of code executions of one batch sent to the code execution service at once",
+        default=10,
+    )
+
     CODE_MAX_NUMBER: PositiveInt = Field(
         description="Maximum allowed numeric value in code execution",
         default=9223372036854775807,
@@ -184,6 +213,17 @@ class PluginConfig(BaseSettings):
         default=15728640 * 12,
     )
 
+    PLUGIN_DAEMON_POOL_MAX_CONNECTIONS: PositiveInt = Field(
+        description="Maximum number of keep-alive connections to the plugin daemon kept by each API process",
+        default=100,
+    )
+
+    PLUGIN_DAEMON_MAX_RETRIES: NonNegativeInt = Field(
+        description="Maximum number of retries of plugin daemon requests failing to connect,"
+        " read errors are only retried for idempotent methods",
+        default=3,
+    )
+
 
 class MarketplaceConfig(BaseSettings):
     """
@@ -397,6 +437,27 @@ class HttpConfig(BaseSettings):
         default=5,
     )
 
+    SSRF_POOL_MAX_CONNECTIONS: PositiveInt = Field(
+        description="Maximum number of concurrent connections of each pooled HTTP client for network requests (SSRF)",
+        default=100,
+    )
+
+    SSRF_POOL_MAX_KEEPALIVE_CONNECTIONS: NonNegativeInt = Field(
+        description="Maximum number of idle keep-alive connections of each pooled HTTP client for network"
+        " requests (SSRF)",
+        default=20,
+    )
+
+    SSRF_POOL_KEEPALIVE_EXPIRY: PositiveFloat = Field(
+        description="Seconds after which an idle keep-alive connection for network requests (SSRF) is closed",
+        default=5.0,
+    )
+
+    SSRF_POOL_HTTP2_ENABLED: bool = Field(
+        description="Enable HTTP/2 for network requests (SSRF), requires the 'h2' package",
+        default=False,
+    )
+
     RESPECT_XFORWARD_HEADERS_ENABLED: bool = Field(
         description="Enable handling of X-Forwarded-For, X-Forwarded-Proto, and X-Forwarded-Port headers"
         " when the app is behind a single trusted reverse proxy.",
@@ -524,6 +585,17 @@ class WorkflowConfig(BaseSettings):
         default=3,
     )
 
+    WORKFLOW_THREAD_POOL_MAX_WORKERS: PositiveInt = Field(
+        description="Maximum number of threads in the process-wide pool running parallel branches and parallel"
+        " iterations of all workflow runs",
+        default=200,
+    )
+
+    WORKFLOW_RUN_MAX_PARALLELISM: PositiveInt = Field(
+        description="Maximum number of parallel branches of a single workflow run executing at once",
+        default=10,
+    )
+
     MAX_VARIABLE_SIZE: PositiveInt = Field(
         description="Maximum size in bytes for a single variable in workflows. Default to 200 KB.",
         default=200 * 1024,
@@ -545,6 +617,24 @@ class WorkflowNodeExecutionConfig(BaseSettings):
         description="Storage backend for WorkflowNodeExecution. Options: 'rdbms', 'hybrid'",
     )
 
+    WORKFLOW_NODE_EXECUTION_FLUSH_INTERVAL: PositiveFloat = Field(
+        description="Interval in seconds at which the write-behind node execution repository writes buffered"
+        " node executions",
+        default=1.0,
+    )
+
+    WORKFLOW_NODE_EXECUTION_FLUSH_BATCH_SIZE: PositiveInt = Field(
+        description="Maximum number of node executions written by one statement of the write-behind node"
+        " execution repository",
+        default=200,
+    )
+
+    WORKFLOW_NODE_EXECUTION_FLUSH_MAX_ATTEMPTS: PositiveInt = Field(
+        description="Number of failed writes after which the write-behind node execution repository drops a node"
+        " execution",
+        default=3,
+    )
+
 
 class RepositoryConfig(BaseSettings):
     """
@@ -557,7 +647,9 @@ class RepositoryConfig(BaseSettings):
     )
 
     CORE_WORKFLOW_NODE_EXECUTION_REPOSITORY: str = Field(
-        description="Repository implementation for WorkflowNodeExecution. Specify as a module path",
+        description="Repository implementation for WorkflowNodeExecution. Specify as a module path,"
+        " use core.repositories.write_behind_workflow_node_execution_repository."
+        "WriteBehindWorkflowNodeExecutionRepository to write node executions in batches from a background thread",
         default="core.repositories.sqlalchemy_workflow_node_execution_repository.SQLAlchemyWorkflowNodeExecutionRepository",
     )
 
@@ -735,7 +827,8 @@ class RagEtlConfig(BaseSettings):
 
     KEYWORD_DATA_SOURCE_TYPE: str = Field(
         description="Data source type for keyword extraction"
-        " ('database' or other supported types), default to 'database'",
+        " ('database', 'inverted_index' for a row-based keyword index, or other supported types),"
+        " default to 'database'",
         default="database",
     )
 
@@ -790,6 +883,16 @@ class DataSetConfig(BaseSettings):
         default=30,
     )
 
+    SEGMENT_HIT_COUNT_FLUSH_INTERVAL: PositiveFloat = Field(
+        description="Interval in seconds at which hit counts of retrieved segments are written to the database",
+        default=5,
+    )
+
+    SEGMENT_HIT_COUNT_BATCH_SIZE: PositiveInt = Field(
+        description="Maximum number of segments updated by one hit count UPDATE statement",
+        default=500,
+    )
+
 
 class WorkspaceConfig(BaseSettings):
     """
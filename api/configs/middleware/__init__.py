@@ -183,10 +183,22 @@ class DatabaseConfig(BaseSettings):
     )
 
     RETRIEVAL_SERVICE_EXECUTORS: NonNegativeInt = Field(
-        description="Number of processes for the retrieval service, default to CPU cores.",
+        description="Maximum number of retrieval tasks a single request runs in parallel on the shared retrieval"
+        " executor (0 for no per-request limit), default to CPU cores.",
         default=os.cpu_count() or 1,
     )
 
+    RETRIEVAL_EXECUTOR_MAX_WORKERS: PositiveInt = Field(
+        description="Number of threads of the process-wide retrieval executor shared by all requests.",
+        default=min(32, (os.cpu_count() or 1) + 4),
+    )
+
+    RETRIEVAL_TIMEOUT: PositiveFloat = Field(
+        description="Timeout in seconds for a retrieval; datasets or search methods that have not finished are"
+        " left out of the results.",
+        default=30,
+    )
+
     @computed_field  # type: ignore[misc]
     @property
     def SQLALCHEMY_ENGINE_OPTIONS(self) -> dict[str, Any]:
@@ -1,6 +1,6 @@
 from typing import Optional
 
-from pydantic import Field, NonNegativeInt, PositiveFloat, PositiveInt
+from pydantic import Field, NonNegativeFloat, NonNegativeInt, PositiveFloat, PositiveInt
 from pydantic_settings import BaseSettings
 
 
@@ -14,6 +14,67 @@ class RedisConfig(BaseSettings):
         default="redis",
     )
 
+    MYSQL_CACHE_DATABASE_URI: Optional[str] = Field(
+        description="SQLAlchemy URI of the database holding the MySQL cache tables,"
+        " defaults to the main database (CACHE_SCHEME=mysql only)",
+        default=None,
+    )
+
+    MYSQL_CACHE_POOL_SIZE: NonNegativeInt = Field(
+        description="Number of connections kept in the dedicated MySQL cache connection pool",
+        default=10,
+    )
+
+    MYSQL_CACHE_MAX_OVERFLOW: NonNegativeInt = Field(
+        description="Maximum number of connections the MySQL cache pool can open beyond MYSQL_CACHE_POOL_SIZE",
+        default=10,
+    )
+
+    MYSQL_CACHE_POOL_RECYCLE: NonNegativeInt = Field(
+        description="Number of seconds after which a MySQL cache connection is recycled",
+        default=3600,
+    )
+
+    MYSQL_CACHE_POOL_PRE_PING: bool = Field(
+        description="Check MySQL cache connections for liveness on checkout",
+        default=True,
+    )
+
+    MYSQL_CACHE_SWEEP_INTERVAL: PositiveFloat = Field(
+        description="Seconds between two sweeps of expired MySQL cache rows, performed by one process cluster-wide",
+        default=300,
+    )
+
+    MYSQL_CACHE_SWEEP_BATCH_SIZE: PositiveInt = Field(
+        description="Maximum number of expired MySQL cache rows deleted by a single statement of the sweeper",
+        default=1000,
+    )
+
+    MYSQL_CACHE_SWEEP_BATCH_PAUSE: NonNegativeFloat = Field(
+        description="Seconds the MySQL cache sweeper pauses between two delete batches",
+        default=0.1,
+    )
+
+    MYSQL_CACHE_LOCAL_ENABLED: bool = Field(
+        description="Enable the in-process LRU layer in front of the MySQL cache table (CACHE_SCHEME=mysql only)",
+        default=False,
+    )
+
+    MYSQL_CACHE_LOCAL_MAX_SIZE: PositiveInt = Field(
+        description="Maximum number of keys held by the in-process MySQL cache layer",
+        default=10000,
+    )
+
+    MYSQL_CACHE_LOCAL_TTL: PositiveFloat = Field(
+        description="Maximum number of seconds a key is served from the in-process MySQL cache layer",
+        default=5.0,
+    )
+
+    MYSQL_CACHE_INVALIDATION_POLL_INTERVAL: PositiveFloat = Field(
+        description="Minimum number of seconds between two polls of the cross-process cache invalidation table",
+        default=1.0,
+    )
+
     REDIS_HOST: str = Field(
         description="Hostname or IP address of the Redis server",
         default="localhost",
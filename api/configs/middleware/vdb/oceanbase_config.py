@@ -1,6 +1,6 @@
 from typing import Optional
 
-from pydantic import Field, PositiveInt
+from pydantic import Field, NonNegativeInt, PositiveInt
 from pydantic_settings import BaseSettings
 
 
@@ -34,12 +34,44 @@ class OceanBaseVectorConfig(BaseSettings):
         default=None,
     )
 
+    OCEANBASE_VECTOR_BATCH_SIZE: PositiveInt = Field(
+        description="Number of rows written by a single multi-row statement when indexing documents (default is 100)",
+        default=100,
+    )
+
+    OCEANBASE_VECTOR_INSERT_WORKERS: PositiveInt = Field(
+        description="Number of batches written in parallel when indexing documents, bounded by the client "
+        "connection pool (default is 1, sequential)",
+        default=1,
+    )
+
+    OCEANBASE_VECTOR_POOL_SIZE: PositiveInt = Field(
+        description="Number of persistent connections kept by the process-wide OceanBase Vector client (default is 10)",
+        default=10,
+    )
+
+    OCEANBASE_VECTOR_MAX_OVERFLOW: NonNegativeInt = Field(
+        description="Number of connections that may be opened beyond OCEANBASE_VECTOR_POOL_SIZE (default is 10)",
+        default=10,
+    )
+
+    OCEANBASE_VECTOR_POOL_RECYCLE: PositiveInt = Field(
+        description="Seconds after which pooled OceanBase Vector connections are recycled (default is 3600)",
+        default=3600,
+    )
+
     OCEANBASE_ENABLE_HYBRID_SEARCH: bool = Field(
         description="Enable hybrid search features (requires OceanBase >= 4.3.5.1). Set to false for compatibility "
         "with older versions",
         default=False,
     )
 
+    OCEANBASE_HYBRID_SEARCH_RRF_K: PositiveInt = Field(
+        description="Rank constant of the reciprocal rank fusion used when hybrid search is executed natively "
+        "by OceanBase (default is 60)",
+        default=60,
+    )
+
     OCEANBASE_FULLTEXT_PARSER: Optional[str] = Field(
         description="Fulltext parser to use for text indexing. Options: 'thai_ftparser' (Thai), 'ik' (Chinese), "
         "'auto' (automatic language detection). Default is 'ik'",
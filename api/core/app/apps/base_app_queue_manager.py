@@ -1,4 +1,5 @@
 import queue
+import threading
 import time
 from abc import abstractmethod
 from enum import Enum
@@ -7,6 +8,7 @@ from typing import Any, Optional
 from sqlalchemy.orm import DeclarativeMeta
 
 from configs import dify_config
+from core.app.apps.stop_flag_watcher import stop_flag_watcher
 from core.app.entities.app_invoke_entities import InvokeFrom
 from core.app.entities.queue_entities import (
     AppQueueEvent,
@@ -42,6 +44,12 @@ class AppQueueManager:
 
         self._q = q
 
+        self._stopped = False
+        self._last_stop_check: float = 0
+        self._stop_event: Optional[threading.Event] = None
+        if dify_config.APP_STOP_FLAG_BATCH_POLLING_ENABLED and dify_config.APP_STOP_FLAG_CHECK_INTERVAL:
+            self._stop_event = stop_flag_watcher.watch(AppQueueManager._generate_stopped_cache_key(self._task_id))
+
     def listen(self):
         """
         Listen to queue
@@ -51,27 +59,31 @@ class AppQueueManager:
         listen_timeout = dify_config.APP_MAX_EXECUTION_TIME
         start_time = time.time()
         last_ping_time: int | float = 0
-        while True:
-            try:
-                message = self._q.get(timeout=1)
-                if message is None:
-                    break
-
-                yield message
-            except queue.Empty:
-                continue
-            finally:
-                elapsed_time = time.time() - start_time
-                if elapsed_time >= listen_timeout or self._is_stopped():
-                    # publish two messages to make sure the client can receive the stop signal
-                    # and stop listening after the stop signal processed
-                    self.publish(
-                        QueueStopEvent(stopped_by=QueueStopEvent.StopBy.USER_MANUAL), PublishFrom.TASK_PIPELINE
-                    )
-
-                if elapsed_time // 10 > last_ping_time:
-                    self.publish(QueuePingEvent(), PublishFrom.TASK_PIPELINE)
-                    last_ping_time = elapsed_time // 10
+        try:
+            while True:
+                try:
+                    message = self._q.get(timeout=1)
+                    if message is None:
+                        break
+
+                    yield message
+                except queue.Empty:
+                    continue
+                finally:
+                    elapsed_time = time.time() - start_time
+                    if elapsed_time >= listen_timeout or self._is_stopped():
+                        # publish two messages to make sure the client can receive the stop signal
+                        # and stop listening after the stop signal processed
+                        self.publish(
+                            QueueStopEvent(stopped_by=QueueStopEvent.StopBy.USER_MANUAL), PublishFrom.TASK_PIPELINE
+                        )
+
+                    if elapsed_time // 10 > last_ping_time:
+                        self.publish(QueuePingEvent(), PublishFrom.TASK_PIPELINE)
+                        last_ping_time = elapsed_time // 10
+        finally:
+            if self._stop_event is not None:
+                stop_flag_watcher.unwatch(AppQueueManager._generate_stopped_cache_key(self._task_id))
 
     def stop_listen(self) -> None:
         """
@@ -128,15 +140,26 @@ class AppQueueManager:
 
     def _is_stopped(self) -> bool:
         """
-        Check if task is stopped
+        Check if task is stopped, looking the stop flag up at most every APP_STOP_FLAG_CHECK_INTERVAL ms
         :return:
         """
+        if self._stopped:
+            return True
+        if self._stop_event is not None:
+            self._stopped = self._stop_event.is_set()
+            return self._stopped
+
+        now = time.monotonic()
+        if now - self._last_stop_check < dify_config.APP_STOP_FLAG_CHECK_INTERVAL / 1000:
+            return False
+        self._last_stop_check = now
+
         stopped_cache_key = AppQueueManager._generate_stopped_cache_key(self._task_id)
         result = redis_client.get(stopped_cache_key)
         if result is not None:
-            return True
+            self._stopped = True
 
-        return False
+        return self._stopped
 
     @classmethod
     def _generate_task_belong_cache_key(cls, task_id: str) -> str:
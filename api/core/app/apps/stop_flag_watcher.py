@@ -0,0 +1,88 @@
+import logging
+import os
+import threading
+import time
+from typing import Optional
+
+from configs import dify_config
+from extensions.ext_redis import redis_client
+
+logger = logging.getLogger(__name__)
+
+
+class StopFlagWatcher:
+    """
+    Process-wide poller of app stop flags.
+
+    Every running app registers the cache key of its stop flag and gets an event back. One daemon
+    thread looks all registered keys up with a single `mget` per interval (a single `IN` query on
+    the MySQL cache backend) and sets the events of the flags it finds, so checking for a stop is
+    a local `Event.is_set()` no matter how many messages an app streams.
+    """
+
+    def __init__(self, interval: float, max_watch_time: float):
+        self._interval = interval
+        self._max_watch_time = max_watch_time
+        self._lock = threading.Lock()
+        # cache key -> (event, monotonic deadline after which the key is dropped even if never unwatched)
+        self._watched: dict[str, tuple[threading.Event, float]] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+
+    def watch(self, cache_key: str) -> threading.Event:
+        with self._lock:
+            self._ensure_thread()
+            watched = self._watched.get(cache_key)
+            if watched is None:
+                watched = (threading.Event(), time.monotonic() + self._max_watch_time)
+                self._watched[cache_key] = watched
+            return watched[0]
+
+    def unwatch(self, cache_key: str) -> None:
+        with self._lock:
+            self._watched.pop(cache_key, None)
+
+    def poll(self) -> None:
+        now = time.monotonic()
+        with self._lock:
+            for cache_key in [key for key, (_, deadline) in self._watched.items() if deadline <= now]:
+                del self._watched[cache_key]
+            watched = list(self._watched.items())
+        if not watched:
+            return
+
+        cache_keys = [cache_key for cache_key, _ in watched]
+        # a cluster client cannot MGET keys of different slots atomically
+        mysql_cache = "mysql" in dify_config.SQLALCHEMY_DATABASE_URI_SCHEME and dify_config.CACHE_SCHEME == "mysql"
+        if dify_config.REDIS_USE_CLUSTERS and not mysql_cache:
+            values = redis_client.mget_nonatomic(cache_keys)
+        else:
+            values = redis_client.mget(cache_keys)
+        for (cache_key, (event, _)), value in zip(watched, values):
+            if value is not None:
+                event.set()
+                self.unwatch(cache_key)
+
+    def _ensure_thread(self) -> None:
+        # threads do not survive a fork, so the child starts its own poller
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        if self._pid != os.getpid():
+            self._watched.clear()
+        self._pid = os.getpid()
+        self._thread = threading.Thread(target=self._run, name="stop_flag_watcher", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self._interval)
+            try:
+                self.poll()
+            except Exception:
+                logger.exception("Failed to poll app stop flags")
+
+
+stop_flag_watcher = StopFlagWatcher(
+    interval=dify_config.APP_STOP_FLAG_CHECK_INTERVAL / 1000,
+    max_watch_time=dify_config.APP_MAX_EXECUTION_TIME,
+)
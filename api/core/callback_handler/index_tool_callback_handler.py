@@ -1,17 +1,13 @@
-import logging
 from collections.abc import Sequence
 
 from core.app.apps.base_app_queue_manager import AppQueueManager, PublishFrom
 from core.app.entities.app_invoke_entities import InvokeFrom
 from core.app.entities.queue_entities import QueueRetrieverResourcesEvent
 from core.rag.entities.citation_metadata import RetrievalSourceMetadata
-from core.rag.index_processor.constant.index_type import IndexType
 from core.rag.models.document import Document
+from core.rag.retrieval.segment_hit_counter import segment_hit_counter
 from extensions.ext_database import db
-from models.dataset import ChildChunk, DatasetQuery, DocumentSegment
-from models.dataset import Document as DatasetDocument
-
-_logger = logging.getLogger(__name__)
+from models.dataset import DatasetQuery
 
 
 class DatasetIndexToolCallbackHandler:
@@ -46,46 +42,7 @@ class DatasetIndexToolCallbackHandler:
 
     def on_tool_end(self, documents: list[Document]) -> None:
         """Handle tool end."""
-        for document in documents:
-            if document.metadata is not None:
-                document_id = document.metadata["document_id"]
-                dataset_document = db.session.query(DatasetDocument).filter(DatasetDocument.id == document_id).first()
-                if not dataset_document:
-                    _logger.warning(
-                        "Expected DatasetDocument record to exist, but none was found, document_id=%s",
-                        document_id,
-                    )
-                    continue
-                if dataset_document.doc_form == IndexType.PARENT_CHILD_INDEX:
-                    child_chunk = (
-                        db.session.query(ChildChunk)
-                        .filter(
-                            ChildChunk.index_node_id == document.metadata["doc_id"],
-                            ChildChunk.dataset_id == dataset_document.dataset_id,
-                            ChildChunk.document_id == dataset_document.id,
-                        )
-                        .first()
-                    )
-                    if child_chunk:
-                        segment = (
-                            db.session.query(DocumentSegment)
-                            .filter(DocumentSegment.id == child_chunk.segment_id)
-                            .update(
-                                {DocumentSegment.hit_count: DocumentSegment.hit_count + 1}, synchronize_session=False
-                            )
-                        )
-                else:
-                    query = db.session.query(DocumentSegment).filter(
-                        DocumentSegment.index_node_id == document.metadata["doc_id"]
-                    )
-
-                    if "dataset_id" in document.metadata:
-                        query = query.filter(DocumentSegment.dataset_id == document.metadata["dataset_id"])
-
-                    # add hit count to document segment
-                    query.update({DocumentSegment.hit_count: DocumentSegment.hit_count + 1}, synchronize_session=False)
-
-                db.session.commit()
+        segment_hit_counter.add(documents)
 
     # TODO(-LAN-): Improve type check
     def return_retriever_resource_info(self, resource: Sequence[RetrievalSourceMetadata]):
@@ -1,10 +1,12 @@
 import logging
-from collections.abc import Mapping
+import os
+from collections.abc import Mapping, Sequence
+from concurrent.futures import ThreadPoolExecutor
 from enum import StrEnum
 from threading import Lock
-from typing import Any, Optional
+from typing import Any, Optional, cast
 
-from httpx import Timeout, post
+from httpx import Client, Limits, Timeout
 from pydantic import BaseModel
 from yarl import URL
 
@@ -56,6 +58,35 @@ class CodeExecutor:
 
     supported_dependencies_languages: set[CodeLanguage] = {CodeLanguage.PYTHON3}
 
+    # keep-alive client and batch workers, created lazily per process
+    _client: Optional[Client] = None
+    _batch_executor: Optional[ThreadPoolExecutor] = None
+    _pid: Optional[int] = None
+    _lock = Lock()
+
+    @classmethod
+    def _get_client(cls) -> Client:
+        if cls._client is None or cls._pid != os.getpid():
+            with cls._lock:
+                if cls._client is None or cls._pid != os.getpid():
+                    cls._client = Client(
+                        limits=Limits(
+                            max_connections=dify_config.CODE_EXECUTION_POOL_MAX_CONNECTIONS,
+                            max_keepalive_connections=dify_config.CODE_EXECUTION_POOL_MAX_KEEPALIVE_CONNECTIONS,
+                            keepalive_expiry=dify_config.CODE_EXECUTION_POOL_KEEPALIVE_EXPIRY,
+                        ),
+                    )
+                    cls._batch_executor = ThreadPoolExecutor(
+                        max_workers=dify_config.CODE_EXECUTION_BATCH_CONCURRENCY, thread_name_prefix="code_executor"
+                    )
+                    cls._pid = os.getpid()
+        return cls._client
+
+    @classmethod
+    def _get_batch_executor(cls) -> ThreadPoolExecutor:
+        cls._get_client()
+        return cast(ThreadPoolExecutor, cls._batch_executor)
+
     @classmethod
     def execute_code(cls, language: CodeLanguage, preload: str, code: str) -> str:
         """
@@ -77,7 +108,7 @@ class CodeExecutor:
         }
 
         try:
-            response = post(
+            response = cls._get_client().post(
                 str(url),
                 json=data,
                 headers=headers,
@@ -140,3 +171,27 @@ class CodeExecutor:
             raise e
 
         return template_transformer.transform_response(response)
+
+    @classmethod
+    def execute_workflow_code_template_batch(
+        cls, language: CodeLanguage, code: str, inputs_list: Sequence[Mapping[str, Any]]
+    ) -> list[Mapping[str, Any] | CodeExecutionError]:
+        """
+        Execute the same code against many inputs
+        :param language: code language
+        :param code: code
+        :param inputs_list: inputs of every execution
+        :return: the result of every execution, in order, or the CodeExecutionError it failed with
+        """
+        template_transformer = cls.code_template_transformers.get(language)
+        if not template_transformer:
+            raise CodeExecutionError(f"Unsupported language {language}")
+
+        def execute(inputs: Mapping[str, Any]) -> Mapping[str, Any] | CodeExecutionError:
+            try:
+                return cls.execute_workflow_code_template(language, code, inputs)
+            except CodeExecutionError as e:
+                return e
+
+        # the sandbox only runs one script per request, so a batch is pipelined over the keep-alive connections
+        return list(cls._get_batch_executor().map(execute, inputs_list))
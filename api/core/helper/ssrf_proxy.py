@@ -2,8 +2,14 @@
 Proxy requests to avoid SSRF
 """
 
+import asyncio
 import logging
+import os
+import threading
 import time
+import weakref
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+from typing import Optional
 
 import httpx
 
@@ -34,7 +40,85 @@ class MaxRetriesExceededError(ValueError):
     pass
 
 
-def make_request(method, url, max_retries=SSRF_DEFAULT_MAX_RETRIES, **kwargs):
+# Long-lived clients keyed by (proxy settings, ssl_verify), so connections are kept alive across requests.
+# Async clients are kept per event loop, their connections can only be used on the loop that opened them.
+_clients: dict[tuple, httpx.Client] = {}
+_async_clients: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[tuple, httpx.AsyncClient]] = (
+    weakref.WeakKeyDictionary()
+)
+_clients_lock = threading.Lock()
+_clients_pid = os.getpid()
+
+
+def _proxy_settings() -> tuple[Optional[str], Optional[str], Optional[str]]:
+    if dify_config.SSRF_PROXY_ALL_URL:
+        return dify_config.SSRF_PROXY_ALL_URL, None, None
+    if dify_config.SSRF_PROXY_HTTP_URL and dify_config.SSRF_PROXY_HTTPS_URL:
+        return None, dify_config.SSRF_PROXY_HTTP_URL, dify_config.SSRF_PROXY_HTTPS_URL
+    return None, None, None
+
+
+def _client_kwargs(proxy_settings: tuple, ssl_verify: bool, transport_cls: type) -> dict:
+    limits = httpx.Limits(
+        max_connections=dify_config.SSRF_POOL_MAX_CONNECTIONS,
+        max_keepalive_connections=dify_config.SSRF_POOL_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=dify_config.SSRF_POOL_KEEPALIVE_EXPIRY,
+    )
+    http2 = dify_config.SSRF_POOL_HTTP2_ENABLED
+    kwargs = {
+        "verify": ssl_verify,
+        "limits": limits,
+        "http2": http2,
+        # clients are shared by all callers, so cookies set by one response must never reach another request
+        "cookies": CookieJar(policy=DefaultCookiePolicy(allowed_domains=[])),
+    }
+    proxy_all_url, proxy_http_url, proxy_https_url = proxy_settings
+    if proxy_all_url:
+        kwargs["proxy"] = proxy_all_url
+    elif proxy_http_url and proxy_https_url:
+        kwargs["mounts"] = {
+            "http://": transport_cls(proxy=proxy_http_url, verify=ssl_verify, limits=limits, http2=http2),
+            "https://": transport_cls(proxy=proxy_https_url, verify=ssl_verify, limits=limits, http2=http2),
+        }
+    return kwargs
+
+
+def _get_client(ssl_verify: bool) -> httpx.Client:
+    global _clients_pid
+
+    proxy_settings = _proxy_settings()
+    key = (proxy_settings, ssl_verify)
+    client = _clients.get(key)
+    if client is not None and _clients_pid == os.getpid():
+        return client
+    with _clients_lock:
+        # connections opened before a fork must not be shared with the child
+        if _clients_pid != os.getpid():
+            _clients.clear()
+            _async_clients.clear()
+            _clients_pid = os.getpid()
+        client = _clients.get(key)
+        if client is None:
+            client = httpx.Client(**_client_kwargs(proxy_settings, ssl_verify, httpx.HTTPTransport))
+            _clients[key] = client
+        return client
+
+
+def _get_async_client(ssl_verify: bool) -> httpx.AsyncClient:
+    proxy_settings = _proxy_settings()
+    key = (proxy_settings, ssl_verify)
+    loop = asyncio.get_running_loop()
+    with _clients_lock:
+        loop_clients = _async_clients.setdefault(loop, {})
+        client = loop_clients.get(key)
+        if client is None:
+            client = httpx.AsyncClient(**_client_kwargs(proxy_settings, ssl_verify, httpx.AsyncHTTPTransport))
+            loop_clients[key] = client
+        return client
+
+
+def _prepare_request_kwargs(kwargs: dict) -> bool:
+    """Normalize request kwargs in place and return the ssl_verify to use."""
     if "allow_redirects" in kwargs:
         allow_redirects = kwargs.pop("allow_redirects")
         if "follow_redirects" not in kwargs:
@@ -51,24 +135,16 @@ def make_request(method, url, max_retries=SSRF_DEFAULT_MAX_RETRIES, **kwargs):
     if "ssl_verify" not in kwargs:
         kwargs["ssl_verify"] = HTTP_REQUEST_NODE_SSL_VERIFY
 
-    ssl_verify = kwargs.pop("ssl_verify")
+    return kwargs.pop("ssl_verify")
+
+
+def make_request(method, url, max_retries=SSRF_DEFAULT_MAX_RETRIES, **kwargs):
+    ssl_verify = _prepare_request_kwargs(kwargs)
 
     retries = 0
     while retries <= max_retries:
         try:
-            if dify_config.SSRF_PROXY_ALL_URL:
-                with httpx.Client(proxy=dify_config.SSRF_PROXY_ALL_URL, verify=ssl_verify) as client:
-                    response = client.request(method=method, url=url, **kwargs)
-            elif dify_config.SSRF_PROXY_HTTP_URL and dify_config.SSRF_PROXY_HTTPS_URL:
-                proxy_mounts = {
-                    "http://": httpx.HTTPTransport(proxy=dify_config.SSRF_PROXY_HTTP_URL, verify=ssl_verify),
-                    "https://": httpx.HTTPTransport(proxy=dify_config.SSRF_PROXY_HTTPS_URL, verify=ssl_verify),
-                }
-                with httpx.Client(mounts=proxy_mounts, verify=ssl_verify) as client:
-                    response = client.request(method=method, url=url, **kwargs)
-            else:
-                with httpx.Client(verify=ssl_verify) as client:
-                    response = client.request(method=method, url=url, **kwargs)
+            response = _get_client(ssl_verify).request(method=method, url=url, **kwargs)
 
             if response.status_code not in STATUS_FORCELIST:
                 return response
@@ -86,6 +162,30 @@ def make_request(method, url, max_retries=SSRF_DEFAULT_MAX_RETRIES, **kwargs):
     raise MaxRetriesExceededError(f"Reached maximum retries ({max_retries}) for URL {url}")
 
 
+async def make_request_async(method, url, max_retries=SSRF_DEFAULT_MAX_RETRIES, **kwargs):
+    ssl_verify = _prepare_request_kwargs(kwargs)
+
+    retries = 0
+    while retries <= max_retries:
+        try:
+            response = await _get_async_client(ssl_verify).request(method=method, url=url, **kwargs)
+
+            if response.status_code not in STATUS_FORCELIST:
+                return response
+            else:
+                logging.warning(f"Received status code {response.status_code} for URL {url} which is in the force list")
+
+        except httpx.RequestError as e:
+            logging.warning(f"Request to URL {url} failed on attempt {retries + 1}: {e}")
+            if max_retries == 0:
+                raise
+
+        retries += 1
+        if retries <= max_retries:
+            await asyncio.sleep(BACKOFF_FACTOR * (2 ** (retries - 1)))
+    raise MaxRetriesExceededError(f"Reached maximum retries ({max_retries}) for URL {url}")
+
+
 def get(url, max_retries=SSRF_DEFAULT_MAX_RETRIES, **kwargs):
     return make_request("GET", url, max_retries=max_retries, **kwargs)
 
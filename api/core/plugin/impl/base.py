@@ -1,12 +1,20 @@
 import inspect
 import json
 import logging
+import os
+import re
+import threading
+import time
 from collections.abc import Callable, Generator
-from typing import TypeVar
+from http.cookiejar import DefaultCookiePolicy
+from typing import Optional, TypeVar
 
 import requests
+from opentelemetry.metrics import get_meter
 from pydantic import BaseModel
+from requests.adapters import HTTPAdapter
 from requests.exceptions import HTTPError
+from urllib3.util.retry import Retry
 from yarl import URL
 
 from configs import dify_config
@@ -37,6 +45,83 @@ T = TypeVar("T", bound=(BaseModel | dict | list | bool | str))
 
 logger = logging.getLogger(__name__)
 
+# no-op until a meter provider is configured by ext_otel
+_meter = get_meter("plugin_daemon_client")
+_request_duration = _meter.create_histogram(
+    "plugin_daemon.request.duration",
+    description="Duration of requests to the plugin daemon until the response headers are received",
+    unit="s",
+)
+
+# routes with path parameters below plugin/{tenant_id}, the first one matching the path is used; a trailing
+# parameter takes the rest of the path, as plugin unique identifiers contain slashes
+_PARAMETERIZED_ROUTES = [
+    (re.compile(r"management/install/tasks/delete_all"), "management/install/tasks/delete_all"),
+    (
+        re.compile(r"management/install/tasks/[^/]+/delete/.+"),
+        "management/install/tasks/{task_id}/delete/{identifier}",
+    ),
+    (re.compile(r"management/install/tasks/[^/]+/delete"), "management/install/tasks/{task_id}/delete"),
+    (re.compile(r"management/install/tasks/[^/]+"), "management/install/tasks/{task_id}"),
+    (re.compile(r"asset/.+"), "asset/{id}"),
+]
+_ID_SEGMENT_PATTERN = re.compile(r"^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$")
+
+# One session per process shared by all plugin clients, so connections to the daemon are kept alive across calls.
+_session: Optional[requests.Session] = None
+_session_pid = os.getpid()
+_session_lock = threading.Lock()
+
+
+def _get_session() -> requests.Session:
+    global _session, _session_pid
+
+    session = _session
+    if session is not None and _session_pid == os.getpid():
+        return session
+    with _session_lock:
+        # connections opened before a fork must not be shared with the child
+        if _session_pid != os.getpid():
+            _session = None
+            _session_pid = os.getpid()
+        session = _session
+        if session is None:
+            session = requests.Session()
+            # the session is shared by all callers, so cookies set by one response must never reach another request
+            session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+            # connection errors are retried for every method, read errors only for idempotent ones
+            retries = Retry(
+                total=dify_config.PLUGIN_DAEMON_MAX_RETRIES,
+                status=0,
+                backoff_factor=0.1,
+                allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,
+                raise_on_status=False,
+            )
+            adapter = HTTPAdapter(
+                pool_connections=1,
+                pool_maxsize=dify_config.PLUGIN_DAEMON_POOL_MAX_CONNECTIONS,
+                max_retries=retries,
+            )
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+        return session
+
+
+def _endpoint(path: str) -> str:
+    """
+    Path of a plugin daemon request with tenant and other ids replaced, to keep metric attributes bounded.
+    """
+    segments = path.strip("/").split("/")
+    if len(segments) > 1 and segments[0] == "plugin":
+        route = "/".join(segments[2:])
+        for pattern, template in _PARAMETERIZED_ROUTES:
+            if pattern.fullmatch(route):
+                return f"plugin/{{tenant_id}}/{template}"
+        segments[1] = "{tenant_id}"
+    # ids in routes not listed above
+    return "/".join("{id}" if _ID_SEGMENT_PATTERN.match(segment) else segment for segment in segments)
+
 
 class BasePluginClient:
     def _request(
@@ -60,13 +145,21 @@ class BasePluginClient:
         if headers.get("Content-Type") == "application/json" and isinstance(data, dict):
             data = json.dumps(data)
 
+        start = time.perf_counter()
+        status_code = 0
         try:
-            response = requests.request(
+            response = _get_session().request(
                 method=method, url=str(url), headers=headers, data=data, params=params, stream=stream, files=files
             )
+            status_code = response.status_code
         except requests.exceptions.ConnectionError:
             logger.exception("Request to Plugin Daemon Service failed")
             raise PluginDaemonInnerError(code=-500, message="Request to Plugin Daemon Service failed")
+        finally:
+            _request_duration.record(
+                time.perf_counter() - start,
+                {"method": method, "endpoint": _endpoint(path), "status_code": status_code},
+            )
 
         return response
 
@@ -1,10 +1,14 @@
 import json
+import threading
+import uuid
 from collections import defaultdict
 from typing import Any, Optional
 
+from cachetools import LRUCache
 from pydantic import BaseModel
 
 from configs import dify_config
+from core.rag.datasource.keyword.jieba.jieba_keyword_index import JiebaKeywordIndex
 from core.rag.datasource.keyword.jieba.jieba_keyword_table_handler import JiebaKeywordTableHandler
 from core.rag.datasource.keyword.keyword_base import BaseKeyword
 from core.rag.models.document import Document
@@ -19,11 +23,29 @@ class KeywordTableConfig(BaseModel):
 
 
 class Jieba(BaseKeyword):
+    # decoded keyword tables, keyed by (dataset id, keyword table version)
+    keyword_tables_cache: LRUCache = LRUCache(maxsize=32)
+    keyword_tables_cache_lock = threading.Lock()
+
     def __init__(self, dataset: Dataset):
         super().__init__(dataset)
         self._config = KeywordTableConfig()
 
     def create(self, texts: list[Document], **kwargs) -> BaseKeyword:
+        keyword_index = self._get_keyword_index()
+        if keyword_index is not None:
+            keyword_table_handler = JiebaKeywordTableHandler()
+            node_keywords = {}
+            for text in texts:
+                keywords = keyword_table_handler.extract_keywords(
+                    text.page_content, self._config.max_keywords_per_chunk
+                )
+                if text.metadata is not None:
+                    self._update_segment_keywords(self.dataset.id, text.metadata["doc_id"], list(keywords))
+                    node_keywords[text.metadata["doc_id"]] = keywords
+            keyword_index.add(node_keywords)
+            return self
+
         lock_name = "keyword_indexing_lock_{}".format(self.dataset.id)
         with redis_client.lock(lock_name, timeout=600):
             keyword_table_handler = JiebaKeywordTableHandler()
@@ -43,6 +65,18 @@ class Jieba(BaseKeyword):
             return self
 
     def add_texts(self, texts: list[Document], **kwargs):
+        keyword_index = self._get_keyword_index()
+        if keyword_index is not None:
+            keyword_table_handler = JiebaKeywordTableHandler()
+            node_keywords = {}
+            for i, text in enumerate(texts):
+                keywords = self._get_text_keywords(keyword_table_handler, text, kwargs.get("keywords_list"), i)
+                if text.metadata is not None:
+                    self._update_segment_keywords(self.dataset.id, text.metadata["doc_id"], list(keywords))
+                    node_keywords[text.metadata["doc_id"]] = keywords
+            keyword_index.add(node_keywords)
+            return
+
         lock_name = "keyword_indexing_lock_{}".format(self.dataset.id)
         with redis_client.lock(lock_name, timeout=600):
             keyword_table_handler = JiebaKeywordTableHandler()
@@ -51,16 +85,7 @@ class Jieba(BaseKeyword):
             keywords_list = kwargs.get("keywords_list")
             for i in range(len(texts)):
                 text = texts[i]
-                if keywords_list:
-                    keywords = keywords_list[i]
-                    if not keywords:
-                        keywords = keyword_table_handler.extract_keywords(
-                            text.page_content, self._config.max_keywords_per_chunk
-                        )
-                else:
-                    keywords = keyword_table_handler.extract_keywords(
-                        text.page_content, self._config.max_keywords_per_chunk
-                    )
+                keywords = self._get_text_keywords(keyword_table_handler, text, keywords_list, i)
                 if text.metadata is not None:
                     self._update_segment_keywords(self.dataset.id, text.metadata["doc_id"], list(keywords))
                     keyword_table = self._add_text_to_keyword_table(
@@ -69,13 +94,29 @@ class Jieba(BaseKeyword):
 
             self._save_dataset_keyword_table(keyword_table)
 
+    def _get_text_keywords(
+        self, keyword_table_handler: JiebaKeywordTableHandler, text: Document, keywords_list: Optional[list], i: int
+    ):
+        if keywords_list and keywords_list[i]:
+            return keywords_list[i]
+        return keyword_table_handler.extract_keywords(text.page_content, self._config.max_keywords_per_chunk)
+
     def text_exists(self, id: str) -> bool:
+        keyword_index = self._get_keyword_index()
+        if keyword_index is not None:
+            return keyword_index.exists(id)
+
         keyword_table = self._get_dataset_keyword_table()
         if keyword_table is None:
             return False
         return id in set.union(*keyword_table.values())
 
     def delete_by_ids(self, ids: list[str]) -> None:
+        keyword_index = self._get_keyword_index()
+        if keyword_index is not None:
+            keyword_index.delete(ids)
+            return
+
         lock_name = "keyword_indexing_lock_{}".format(self.dataset.id)
         with redis_client.lock(lock_name, timeout=600):
             keyword_table = self._get_dataset_keyword_table()
@@ -85,30 +126,39 @@ class Jieba(BaseKeyword):
             self._save_dataset_keyword_table(keyword_table)
 
     def search(self, query: str, **kwargs: Any) -> list[Document]:
-        keyword_table = self._get_dataset_keyword_table()
-
         k = kwargs.get("top_k", 4)
         document_ids_filter = kwargs.get("document_ids_filter")
-        sorted_chunk_indices = self._retrieve_ids_by_query(keyword_table or {}, query, k)
+        keyword_index = self._get_keyword_index()
+        if keyword_index is not None:
+            keywords = JiebaKeywordTableHandler().extract_keywords(query)
+            sorted_chunk_indices = keyword_index.search(keywords, k)
+        else:
+            keyword_table = self._get_cached_dataset_keyword_table()
+            sorted_chunk_indices = self._retrieve_ids_by_query(keyword_table or {}, query, k)
+        if not sorted_chunk_indices:
+            return []
+
+        segment_query = db.session.query(DocumentSegment).filter(
+            DocumentSegment.dataset_id == self.dataset.id, DocumentSegment.index_node_id.in_(sorted_chunk_indices)
+        )
+        if document_ids_filter:
+            segment_query = segment_query.filter(DocumentSegment.document_id.in_(document_ids_filter))
+        segments: dict[str, DocumentSegment] = {}
+        for segment in segment_query.all():
+            segments.setdefault(segment.index_node_id, segment)
 
         documents = []
         for chunk_index in sorted_chunk_indices:
-            segment_query = db.session.query(DocumentSegment).filter(
-                DocumentSegment.dataset_id == self.dataset.id, DocumentSegment.index_node_id == chunk_index
-            )
-            if document_ids_filter:
-                segment_query = segment_query.filter(DocumentSegment.document_id.in_(document_ids_filter))
-            segment = segment_query.first()
-
-            if segment:
+            chunk_segment = segments.get(chunk_index)
+            if chunk_segment:
                 documents.append(
                     Document(
-                        page_content=segment.content,
+                        page_content=chunk_segment.content,
                         metadata={
                             "doc_id": chunk_index,
-                            "doc_hash": segment.index_node_hash,
-                            "document_id": segment.document_id,
-                            "dataset_id": segment.dataset_id,
+                            "doc_hash": chunk_segment.index_node_hash,
+                            "document_id": chunk_segment.document_id,
+                            "dataset_id": chunk_segment.dataset_id,
                         },
                     )
                 )
@@ -120,9 +170,11 @@ class Jieba(BaseKeyword):
         with redis_client.lock(lock_name, timeout=600):
             dataset_keyword_table = self.dataset.dataset_keyword_table
             if dataset_keyword_table:
+                if dataset_keyword_table.data_source_type == JiebaKeywordIndex.DATA_SOURCE_TYPE:
+                    JiebaKeywordIndex(self.dataset.id).clear()
                 db.session.delete(dataset_keyword_table)
                 db.session.commit()
-                if dataset_keyword_table.data_source_type != "database":
+                if dataset_keyword_table.data_source_type not in {"database", JiebaKeywordIndex.DATA_SOURCE_TYPE}:
                     file_key = "keyword_files/" + self.dataset.tenant_id + "/" + self.dataset.id + ".txt"
                     storage.delete(file_key)
 
@@ -136,11 +188,15 @@ class Jieba(BaseKeyword):
         if keyword_data_source_type == "database":
             dataset_keyword_table.keyword_table = json.dumps(keyword_table_dict, cls=SetEncoder)
             db.session.commit()
+        elif keyword_data_source_type == JiebaKeywordIndex.DATA_SOURCE_TYPE:
+            raise ValueError("Keyword table blobs are not used by the inverted index data source")
         else:
             file_key = "keyword_files/" + self.dataset.tenant_id + "/" + self.dataset.id + ".txt"
             if storage.exists(file_key):
                 storage.delete(file_key)
             storage.save(file_key, json.dumps(keyword_table_dict, cls=SetEncoder).encode("utf-8"))
+        # bumped only once the new table is persisted, so a version never maps to an older table
+        redis_client.set(self._keyword_table_version_key(), uuid.uuid4().hex)
 
     def _get_dataset_keyword_table(self) -> Optional[dict]:
         dataset_keyword_table = self.dataset.dataset_keyword_table
@@ -168,6 +224,46 @@ class Jieba(BaseKeyword):
 
         return {}
 
+    def _keyword_table_version_key(self) -> str:
+        return "keyword_table_version_{}".format(self.dataset.id)
+
+    def _get_cached_dataset_keyword_table(self) -> Optional[dict]:
+        """
+        Read-only variant of `_get_dataset_keyword_table` for searches.
+
+        Decoded tables are kept in-process per table version. Versions are random tokens replaced on
+        every save, so a table cached by any process is never served once another one has rewritten it.
+        """
+        version_key = self._keyword_table_version_key()
+        version = redis_client.get(version_key)
+        if version is None:
+            redis_client.setnx(version_key, uuid.uuid4().hex)
+            version = redis_client.get(version_key)
+            if version is None:
+                return self._get_dataset_keyword_table()
+
+        cache_key = (self.dataset.id, version)
+        with self.keyword_tables_cache_lock:
+            keyword_table = self.keyword_tables_cache.get(cache_key)
+        if keyword_table is None:
+            keyword_table = self._get_dataset_keyword_table()
+            with self.keyword_tables_cache_lock:
+                self.keyword_tables_cache[cache_key] = keyword_table
+        return keyword_table
+
+    def _get_keyword_index(self) -> Optional[JiebaKeywordIndex]:
+        """Return the row-based inverted index if this dataset stores its keywords in one."""
+        dataset_keyword_table = self.dataset.dataset_keyword_table
+        if dataset_keyword_table is None:
+            # registers the dataset with the configured KEYWORD_DATA_SOURCE_TYPE
+            self._get_dataset_keyword_table()
+            data_source_type = dify_config.KEYWORD_DATA_SOURCE_TYPE
+        else:
+            data_source_type = dataset_keyword_table.data_source_type
+        if data_source_type != JiebaKeywordIndex.DATA_SOURCE_TYPE:
+            return None
+        return JiebaKeywordIndex(self.dataset.id)
+
     def _add_text_to_keyword_table(self, keyword_table: dict, id: str, keywords: list[str]) -> dict:
         for keyword in keywords:
             if keyword not in keyword_table:
@@ -198,7 +294,7 @@ class Jieba(BaseKeyword):
 
         # go through text chunks in order of most matching keywords
         chunk_indices_count: dict[str, int] = defaultdict(int)
-        keywords_list = [keyword for keyword in keywords if keyword in set(keyword_table.keys())]
+        keywords_list = [keyword for keyword in keywords if keyword in keyword_table]
         for keyword in keywords_list:
             for node_id in keyword_table[keyword]:
                 chunk_indices_count[node_id] += 1
@@ -223,6 +319,12 @@ class Jieba(BaseKeyword):
             db.session.commit()
 
     def create_segment_keywords(self, node_id: str, keywords: list[str]):
+        keyword_index = self._get_keyword_index()
+        if keyword_index is not None:
+            self._update_segment_keywords(self.dataset.id, node_id, keywords)
+            keyword_index.add({node_id: keywords})
+            return
+
         keyword_table = self._get_dataset_keyword_table()
         self._update_segment_keywords(self.dataset.id, node_id, keywords)
         keyword_table = self._add_text_to_keyword_table(keyword_table or {}, node_id, keywords)
@@ -230,6 +332,21 @@ class Jieba(BaseKeyword):
 
     def multi_create_segment_keywords(self, pre_segment_data_list: list):
         keyword_table_handler = JiebaKeywordTableHandler()
+        keyword_index = self._get_keyword_index()
+        if keyword_index is not None:
+            node_keywords = {}
+            for pre_segment_data in pre_segment_data_list:
+                segment = pre_segment_data["segment"]
+                if pre_segment_data["keywords"]:
+                    segment.keywords = pre_segment_data["keywords"]
+                else:
+                    segment.keywords = list(
+                        keyword_table_handler.extract_keywords(segment.content, self._config.max_keywords_per_chunk)
+                    )
+                node_keywords[segment.index_node_id] = segment.keywords
+            keyword_index.add(node_keywords)
+            return
+
         keyword_table = self._get_dataset_keyword_table()
         for pre_segment_data in pre_segment_data_list:
             segment = pre_segment_data["segment"]
@@ -247,6 +364,11 @@ class Jieba(BaseKeyword):
         self._save_dataset_keyword_table(keyword_table)
 
     def update_segment_keywords_index(self, node_id: str, keywords: list[str]):
+        keyword_index = self._get_keyword_index()
+        if keyword_index is not None:
+            keyword_index.add({node_id: keywords})
+            return
+
         keyword_table = self._get_dataset_keyword_table()
         keyword_table = self._add_text_to_keyword_table(keyword_table or {}, node_id, keywords)
         self._save_dataset_keyword_table(keyword_table)
@@ -0,0 +1,87 @@
+import uuid
+from collections.abc import Iterable, Mapping
+
+import sqlalchemy as sa
+from sqlalchemy import func
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.postgresql import insert
+
+from configs import dify_config
+from extensions.ext_database import db
+from models.dataset import DatasetKeyword
+
+
+class JiebaKeywordIndex:
+    """
+    Row-based inverted index for the jieba keyword store.
+
+    Instead of one JSON keyword table per dataset, every `keyword -> index node` pair
+    is stored as a `dataset_keywords` row, so adding or deleting segments only touches
+    their own rows and searches count keyword hits in SQL.
+    """
+
+    DATA_SOURCE_TYPE = "inverted_index"
+    BATCH_SIZE = 1000
+
+    def __init__(self, dataset_id: str):
+        self._dataset_id = dataset_id
+
+    def add(self, node_keywords: Mapping[str, Iterable[str]]) -> None:
+        rows = [
+            {"id": str(uuid.uuid4()), "dataset_id": self._dataset_id, "keyword": keyword, "index_node_id": node_id}
+            for node_id, keywords in node_keywords.items()
+            for keyword in set(keywords)
+            if keyword and len(keyword) <= DatasetKeyword.keyword.type.length
+        ]
+        for i in range(0, len(rows), self.BATCH_SIZE):
+            batch = rows[i : i + self.BATCH_SIZE]
+            if dify_config.SQLALCHEMY_DATABASE_URI_SCHEME == "postgresql":
+                stmt = (
+                    insert(DatasetKeyword)
+                    .values(batch)
+                    .on_conflict_do_nothing(index_elements=DatasetKeyword.unique_keys())
+                )
+            elif "mysql" in dify_config.SQLALCHEMY_DATABASE_URI_SCHEME:
+                # MySQL: INSERT IGNORE，忽略已存在的关键词
+                stmt = mysql_insert(DatasetKeyword).values(batch).prefix_with("IGNORE")
+            else:
+                raise Exception(f"Invalid SQLALCHEMY_DATABASE_URI_SCHEME: {dify_config.SQLALCHEMY_DATABASE_URI_SCHEME}")
+            db.session.execute(stmt)
+        db.session.commit()
+
+    def delete(self, node_ids: list[str]) -> None:
+        for i in range(0, len(node_ids), self.BATCH_SIZE):
+            db.session.execute(
+                sa.delete(DatasetKeyword).where(
+                    DatasetKeyword.dataset_id == self._dataset_id,
+                    DatasetKeyword.index_node_id.in_(node_ids[i : i + self.BATCH_SIZE]),
+                )
+            )
+        db.session.commit()
+
+    def clear(self) -> None:
+        db.session.execute(sa.delete(DatasetKeyword).where(DatasetKeyword.dataset_id == self._dataset_id))
+        db.session.commit()
+
+    def exists(self, node_id: str) -> bool:
+        stmt = (
+            sa.select(DatasetKeyword.id)
+            .where(DatasetKeyword.dataset_id == self._dataset_id, DatasetKeyword.index_node_id == node_id)
+            .limit(1)
+        )
+        return db.session.execute(stmt).first() is not None
+
+    def search(self, keywords: Iterable[str], k: int = 4) -> list[str]:
+        """Return the ids of the k index nodes matching the most keywords."""
+        keywords = list(set(keywords))
+        if not keywords:
+            return []
+        hits = func.count().label("hits")
+        stmt = (
+            sa.select(DatasetKeyword.index_node_id, hits)
+            .where(DatasetKeyword.dataset_id == self._dataset_id, DatasetKeyword.keyword.in_(keywords))
+            .group_by(DatasetKeyword.index_node_id)
+            .order_by(hits.desc(), DatasetKeyword.index_node_id)
+            .limit(k)
+        )
+        return [row.index_node_id for row in db.session.execute(stmt)]
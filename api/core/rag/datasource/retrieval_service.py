@@ -1,5 +1,6 @@
-import concurrent.futures
-from concurrent.futures import ThreadPoolExecutor
+import logging
+from collections.abc import Callable
+from functools import partial
 from typing import Optional
 
 from flask import Flask, current_app
@@ -9,17 +10,21 @@ from configs import dify_config
 from core.rag.data_post_processor.data_post_processor import DataPostProcessor
 from core.rag.datasource.keyword.keyword_factory import Keyword
 from core.rag.datasource.vdb.vector_factory import Vector
+from core.rag.datasource.vdb.vector_type import VectorType
 from core.rag.embedding.retrieval import RetrievalSegments
 from core.rag.entities.metadata_entities import MetadataCondition
 from core.rag.index_processor.constant.index_type import IndexType
 from core.rag.models.document import Document
 from core.rag.rerank.rerank_type import RerankMode
+from core.rag.retrieval.retrieval_executor import RetrievalExecutor
 from core.rag.retrieval.retrieval_methods import RetrievalMethod
 from extensions.ext_database import db
 from models.dataset import ChildChunk, Dataset, DocumentSegment
 from models.dataset import Document as DatasetDocument
 from services.external_knowledge_service import ExternalDatasetService
 
+logger = logging.getLogger(__name__)
+
 default_retrieval_model = {
     "search_method": RetrievalMethod.SEMANTIC_SEARCH.value,
     "reranking_enable": False,
@@ -52,61 +57,87 @@ class RetrievalService:
 
         all_documents: list[Document] = []
         exceptions: list[str] = []
+        # stores that fuse vector and full-text rankings in a single query handle hybrid search as one task
+        native_hybrid_search = retrieval_method == RetrievalMethod.HYBRID_SEARCH.value and (
+            cls._supports_native_hybrid_search(dataset)
+        )
 
-        # Optimize multithreading with thread pools
-        with ThreadPoolExecutor(max_workers=dify_config.RETRIEVAL_SERVICE_EXECUTORS) as executor:  # type: ignore
-            futures = []
-            if retrieval_method == "keyword_search":
-                futures.append(
-                    executor.submit(
-                        cls.keyword_search,
-                        flask_app=current_app._get_current_object(),  # type: ignore
-                        dataset_id=dataset_id,
-                        query=query,
-                        top_k=top_k,
-                        all_documents=all_documents,
-                        exceptions=exceptions,
-                        document_ids_filter=document_ids_filter,
-                    )
+        # the dataset and its Vector are loaded once here and shared by the search branches of this retrieval
+        vector: Optional[Vector] = None
+        if RetrievalMethod.is_support_semantic_search(retrieval_method) or RetrievalMethod.is_support_fulltext_search(
+            retrieval_method
+        ):
+            try:
+                vector = Vector(dataset=dataset)
+            except Exception as e:
+                exceptions.append(str(e))
+
+        flask_app = current_app._get_current_object()  # type: ignore
+        # every task collects into its own list, so a task finishing after the timeout changes nothing
+        task_documents: list[list[Document]] = []
+        tasks: list[Callable[[], None]] = []
+
+        def add_task(search: Callable[..., None], **kwargs) -> None:
+            documents: list[Document] = []
+            task_documents.append(documents)
+            tasks.append(
+                partial(
+                    search,
+                    flask_app=flask_app,
+                    dataset_id=dataset_id,
+                    dataset=dataset,
+                    query=query,
+                    top_k=top_k,
+                    all_documents=documents,
+                    exceptions=exceptions,
+                    document_ids_filter=document_ids_filter,
+                    **kwargs,
                 )
+            )
+
+        if retrieval_method == "keyword_search":
+            add_task(cls.keyword_search)
+        if vector is not None and native_hybrid_search:
+            add_task(
+                cls.hybrid_search,
+                vector=vector,
+                score_threshold=score_threshold,
+                reranking_model=reranking_model,
+                reranking_mode=reranking_mode,
+                weights=weights,
+            )
+        elif vector is not None:
             if RetrievalMethod.is_support_semantic_search(retrieval_method):
-                futures.append(
-                    executor.submit(
-                        cls.embedding_search,
-                        flask_app=current_app._get_current_object(),  # type: ignore
-                        dataset_id=dataset_id,
-                        query=query,
-                        top_k=top_k,
-                        score_threshold=score_threshold,
-                        reranking_model=reranking_model,
-                        all_documents=all_documents,
-                        retrieval_method=retrieval_method,
-                        exceptions=exceptions,
-                        document_ids_filter=document_ids_filter,
-                    )
+                add_task(
+                    cls.embedding_search,
+                    vector=vector,
+                    score_threshold=score_threshold,
+                    reranking_model=reranking_model,
+                    retrieval_method=retrieval_method,
                 )
             if RetrievalMethod.is_support_fulltext_search(retrieval_method):
-                futures.append(
-                    executor.submit(
-                        cls.full_text_index_search,
-                        flask_app=current_app._get_current_object(),  # type: ignore
-                        dataset_id=dataset_id,
-                        query=query,
-                        top_k=top_k,
-                        score_threshold=score_threshold,
-                        reranking_model=reranking_model,
-                        all_documents=all_documents,
-                        retrieval_method=retrieval_method,
-                        exceptions=exceptions,
-                        document_ids_filter=document_ids_filter,
-                    )
+                add_task(
+                    cls.full_text_index_search,
+                    vector=vector,
+                    score_threshold=score_threshold,
+                    reranking_model=reranking_model,
+                    retrieval_method=retrieval_method,
                 )
-            concurrent.futures.wait(futures, timeout=30, return_when=concurrent.futures.ALL_COMPLETED)
+        timed_out = RetrievalExecutor.get_instance().run_all(
+            tasks,
+            timeout=dify_config.RETRIEVAL_TIMEOUT,
+            max_fan_out=dify_config.RETRIEVAL_SERVICE_EXECUTORS,
+        )
+        if timed_out:
+            logger.warning("%d search task(s) of dataset %s timed out", len(timed_out), dataset_id)
+        for index, documents in enumerate(task_documents):
+            if index not in timed_out:
+                all_documents.extend(documents)
 
         if exceptions:
             raise ValueError(";\n".join(exceptions))
 
-        if retrieval_method == RetrievalMethod.HYBRID_SEARCH.value:
+        if retrieval_method == RetrievalMethod.HYBRID_SEARCH.value and not native_hybrid_search:
             data_post_processor = DataPostProcessor(
                 str(dataset.tenant_id), reranking_mode, reranking_model, weights, False
             )
@@ -147,6 +178,11 @@ class RetrievalService:
         with Session(db.engine) as session:
             return session.query(Dataset).filter(Dataset.id == dataset_id).first()
 
+    @classmethod
+    def _supports_native_hybrid_search(cls, dataset: Dataset) -> bool:
+        vector_type = dataset.index_struct_dict["type"] if dataset.index_struct_dict else dify_config.VECTOR_STORE
+        return vector_type == VectorType.OCEANBASE and dify_config.OCEANBASE_ENABLE_HYBRID_SEARCH
+
     @classmethod
     def keyword_search(
         cls,
@@ -157,10 +193,11 @@ class RetrievalService:
         all_documents: list,
         exceptions: list,
         document_ids_filter: Optional[list[str]] = None,
+        dataset: Optional[Dataset] = None,
     ):
         with flask_app.app_context():
             try:
-                dataset = cls._get_dataset(dataset_id)
+                dataset = dataset or cls._get_dataset(dataset_id)
                 if not dataset:
                     raise ValueError("dataset not found")
 
@@ -186,14 +223,16 @@ class RetrievalService:
         retrieval_method: str,
         exceptions: list,
         document_ids_filter: Optional[list[str]] = None,
+        dataset: Optional[Dataset] = None,
+        vector: Optional[Vector] = None,
     ):
         with flask_app.app_context():
             try:
-                dataset = cls._get_dataset(dataset_id)
+                dataset = dataset or cls._get_dataset(dataset_id)
                 if not dataset:
                     raise ValueError("dataset not found")
 
-                vector = Vector(dataset=dataset)
+                vector = vector or Vector(dataset=dataset)
                 documents = vector.search_by_vector(
                     query,
                     search_type="similarity_score_threshold",
@@ -239,14 +278,16 @@ class RetrievalService:
         retrieval_method: str,
         exceptions: list,
         document_ids_filter: Optional[list[str]] = None,
+        dataset: Optional[Dataset] = None,
+        vector: Optional[Vector] = None,
     ):
         with flask_app.app_context():
             try:
-                dataset = cls._get_dataset(dataset_id)
+                dataset = dataset or cls._get_dataset(dataset_id)
                 if not dataset:
                     raise ValueError("dataset not found")
 
-                vector_processor = Vector(dataset=dataset)
+                vector_processor = vector or Vector(dataset=dataset)
 
                 documents = vector_processor.search_by_full_text(
                     cls.escape_query_for_search(query), top_k=top_k, document_ids_filter=document_ids_filter
@@ -274,6 +315,80 @@ class RetrievalService:
             except Exception as e:
                 exceptions.append(str(e))
 
+    @classmethod
+    def hybrid_search(
+        cls,
+        flask_app: Flask,
+        dataset_id: str,
+        query: str,
+        top_k: int,
+        score_threshold: Optional[float],
+        reranking_model: Optional[dict],
+        reranking_mode: str,
+        weights: Optional[dict],
+        all_documents: list,
+        exceptions: list,
+        document_ids_filter: Optional[list[str]] = None,
+        dataset: Optional[Dataset] = None,
+        vector: Optional[Vector] = None,
+    ):
+        with flask_app.app_context():
+            try:
+                dataset = dataset or cls._get_dataset(dataset_id)
+                if not dataset:
+                    raise ValueError("dataset not found")
+
+                vector = vector or Vector(dataset=dataset)
+                weighted_fusion = reranking_mode == RerankMode.WEIGHTED_SCORE.value and bool(weights)
+                if vector.supports_hybrid_search():
+                    fusion_kwargs: dict = {"fusion": "rrf"}
+                    if weighted_fusion and weights:
+                        fusion_kwargs = {
+                            "fusion": "weighted",
+                            "vector_weight": weights["vector_setting"]["vector_weight"],
+                            "keyword_weight": weights["keyword_setting"]["keyword_weight"],
+                        }
+                    documents = vector.search_by_hybrid(
+                        query,
+                        full_text_query=cls.escape_query_for_search(query),
+                        top_k=top_k,
+                        score_threshold=score_threshold,
+                        document_ids_filter=document_ids_filter,
+                        **fusion_kwargs,
+                    )
+                    if weighted_fusion:
+                        # already fused, thresholded and truncated by the store
+                        all_documents.extend(documents)
+                        return
+                else:
+                    documents = vector.search_by_vector(
+                        query,
+                        search_type="similarity_score_threshold",
+                        top_k=top_k,
+                        score_threshold=score_threshold,
+                        filter={"group_id": [dataset.id]},
+                        document_ids_filter=document_ids_filter,
+                    )
+                    documents.extend(
+                        vector.search_by_full_text(
+                            cls.escape_query_for_search(query), top_k=top_k, document_ids_filter=document_ids_filter
+                        )
+                    )
+
+                data_post_processor = DataPostProcessor(
+                    str(dataset.tenant_id), reranking_mode, reranking_model, weights, False
+                )
+                all_documents.extend(
+                    data_post_processor.invoke(
+                        query=query,
+                        documents=documents,
+                        score_threshold=score_threshold,
+                        top_n=top_k,
+                    )
+                )
+            except Exception as e:
+                exceptions.append(str(e))
+
     @staticmethod
     def escape_query_for_search(query: str) -> str:
         return query.replace('"', '\\"')
@@ -1,12 +1,16 @@
 import json
 import logging
 import math
-from typing import Any
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Optional
 
 from pydantic import BaseModel, model_validator
 from pyobvector import VECTOR, ObVecClient  # type: ignore
-from sqlalchemy import JSON, Column, String, func
+from sqlalchemy import JSON, Column, Computed, Index, String, bindparam, column, func, text
 from sqlalchemy.dialects.mysql import LONGTEXT
+from sqlalchemy.sql.elements import ColumnElement
 
 from configs import dify_config
 from core.rag.datasource.vdb.vector_base import BaseVector
@@ -23,6 +27,34 @@ DEFAULT_OCEANBASE_HNSW_BUILD_PARAM = {"M": 16, "efConstruction": 256}
 DEFAULT_OCEANBASE_HNSW_SEARCH_PARAM = {"efSearch": 64}
 OCEANBASE_SUPPORTED_VECTOR_INDEX_TYPE = "HNSW"
 DEFAULT_OCEANBASE_VECTOR_METRIC_TYPE = "l2"
+# metadata fields materialized as stored generated columns with a secondary index each
+OCEANBASE_INDEXED_METADATA_FIELDS = ("document_id", "doc_id", "dataset_id")
+OCEANBASE_INDEXED_METADATA_FIELD_LENGTH = 255
+OCEANBASE_HYBRID_SEARCH_FUSION_RRF = "rrf"
+OCEANBASE_HYBRID_SEARCH_FUSION_WEIGHTED = "weighted"
+DEFAULT_OCEANBASE_HYBRID_SEARCH_RRF_K = 60
+
+# collections known to carry the generated metadata columns, shared by all instances of this process
+_collections_with_metadata_columns: set[str] = set()
+
+# process-wide clients, keyed by connection config, so that every OceanBaseVector reuses a warm engine and pool
+# instead of reflecting the schema and probing the server version on each instantiation
+_clients: dict[tuple, ObVecClient] = {}
+_hybrid_search_support: dict[tuple, bool] = {}
+_clients_lock = threading.Lock()
+
+
+def _reset_clients_after_fork() -> None:
+    # pooled connections must not be shared with a forked worker, the child builds its own clients
+    _clients.clear()
+    _hybrid_search_support.clear()
+
+
+os.register_at_fork(after_in_child=_reset_clients_after_fork)
+
+
+def _metadata_field_expression(field: str) -> str:
+    return f"json_unquote(json_extract(`metadata`, '$.{field}'))"
 
 
 class OceanBaseVectorConfig(BaseModel):
@@ -32,6 +64,12 @@ class OceanBaseVectorConfig(BaseModel):
     password: str
     database: str
     enable_hybrid_search: bool = False
+    hybrid_search_rrf_k: int = DEFAULT_OCEANBASE_HYBRID_SEARCH_RRF_K
+    batch_size: int = 100
+    insert_workers: int = 1
+    pool_size: int = 10
+    max_overflow: int = 10
+    pool_recycle: int = 3600
 
     @model_validator(mode="before")
     @classmethod
@@ -46,18 +84,47 @@ class OceanBaseVectorConfig(BaseModel):
             raise ValueError("config OCEANBASE_VECTOR_DATABASE is required")
         return values
 
+    def client_key(self) -> tuple:
+        return (
+            self.host,
+            self.port,
+            self.user,
+            self.password,
+            self.database,
+            self.pool_size,
+            self.max_overflow,
+            self.pool_recycle,
+        )
+
+
+def _get_client(config: OceanBaseVectorConfig) -> ObVecClient:
+    key = config.client_key()
+    client = _clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                client = ObVecClient(
+                    uri=f"{config.host}:{config.port}",
+                    user=config.user,
+                    password=config.password,
+                    db_name=config.database,
+                    pool_size=config.pool_size,
+                    max_overflow=config.max_overflow,
+                    pool_recycle=config.pool_recycle,
+                    pool_pre_ping=True,
+                )
+                _clients[key] = client
+    return client
+
 
 class OceanBaseVector(BaseVector):
     def __init__(self, collection_name: str, config: OceanBaseVectorConfig):
         super().__init__(collection_name)
         self._config = config
         self._hnsw_ef_search = -1
-        self._client = ObVecClient(
-            uri=f"{self._config.host}:{self._config.port}",
-            user=self._config.user,
-            password=self._config.password,
-            db_name=self._config.database,
-        )
+        self._metadata_columns_exist: Optional[bool] = None
+        self._client = _get_client(config)
         self._hybrid_search_enabled = self._check_hybrid_search_support()  # Check if hybrid search is supported
 
     def get_type(self) -> str:
@@ -102,7 +169,16 @@ class OceanBaseVector(BaseVector):
                 Column("vector", VECTOR(self._vec_dim)),
                 Column("text", LONGTEXT),
                 Column("metadata", JSON),
+                *(
+                    Column(
+                        field,
+                        String(OCEANBASE_INDEXED_METADATA_FIELD_LENGTH),
+                        Computed(_metadata_field_expression(field), persisted=True),
+                    )
+                    for field in OCEANBASE_INDEXED_METADATA_FIELDS
+                ),
             ]
+            indexes = [Index(f"idx_{field}", field) for field in OCEANBASE_INDEXED_METADATA_FIELDS]
             vidx_params = self._client.prepare_index_params()
             vidx_params.add_index(
                 field_name="vector",
@@ -115,8 +191,11 @@ class OceanBaseVector(BaseVector):
             self._client.create_table_with_index_params(
                 table_name=self._collection_name,
                 columns=cols,
+                indexes=indexes,
                 vidxs=vidx_params,
             )
+            _collections_with_metadata_columns.add(self._collection_name)
+            self._metadata_columns_exist = True
             if self._hybrid_search_enabled:
                 # Get parser from config or use default ik parser
                 parser_name = dify_config.OCEANBASE_FULLTEXT_PARSER or "ik"
@@ -135,6 +214,73 @@ class OceanBaseVector(BaseVector):
 
             redis_client.set(collection_exist_cache_key, 1, ex=3600)
 
+    def _has_metadata_columns(self) -> bool:
+        """
+        Whether the collection carries the generated metadata columns.
+        Collections created before they were introduced fall back to filtering on the JSON metadata
+        until they are upgraded with `add_metadata_columns`.
+        """
+        if self._collection_name in _collections_with_metadata_columns:
+            return True
+        if self._metadata_columns_exist is None:
+            self._metadata_columns_exist = not self._missing_metadata_columns()
+            if self._metadata_columns_exist:
+                _collections_with_metadata_columns.add(self._collection_name)
+        return self._metadata_columns_exist
+
+    def _missing_metadata_columns(self) -> list[str]:
+        with self._client.engine.connect() as conn:
+            result = conn.execute(
+                text(
+                    "SELECT column_name FROM information_schema.columns "
+                    "WHERE table_schema = DATABASE() AND table_name = :table_name AND column_name IN :fields"
+                ).bindparams(bindparam("fields", expanding=True)),
+                {"table_name": self._collection_name, "fields": list(OCEANBASE_INDEXED_METADATA_FIELDS)},
+            )
+            existing = {row[0].lower() for row in result}
+        return [field for field in OCEANBASE_INDEXED_METADATA_FIELDS if field not in existing]
+
+    def add_metadata_columns(self) -> bool:
+        """
+        Add the generated metadata columns and their indexes to an existing collection.
+        Returns True if the collection was altered, False if it does not exist or is already up to date.
+        """
+        lock_name = "vector_indexing_lock_" + self._collection_name
+        with redis_client.lock(lock_name, timeout=600):
+            if not self._client.check_table_exists(self._collection_name):
+                return False
+            missing = self._missing_metadata_columns()
+            for field in missing:
+                # one statement per field, so an interrupted upgrade resumes from the first missing column
+                self._client.perform_raw_text_sql(
+                    f"ALTER TABLE `{self._collection_name}` "
+                    f"ADD COLUMN `{field}` VARCHAR({OCEANBASE_INDEXED_METADATA_FIELD_LENGTH}) "
+                    f"GENERATED ALWAYS AS ({_metadata_field_expression(field)}) STORED, "
+                    f"ADD INDEX `idx_{field}` (`{field}`)"
+                )
+            _collections_with_metadata_columns.add(self._collection_name)
+            self._metadata_columns_exist = True
+            return bool(missing)
+
+    def _metadata_filter_sql(self, key: str) -> str:
+        if key in OCEANBASE_INDEXED_METADATA_FIELDS and self._has_metadata_columns():
+            return f"`{key}`"
+        return "json_unquote(json_extract(`metadata`, :metadata_path))"
+
+    def _reflect_collection(self) -> None:
+        """
+        Reflect the collection into the shared client metadata before pyobvector looks it up.
+        pyobvector reflects unknown tables lazily on a MetaData shared by all threads, where a concurrent
+        lookup could observe a half-loaded table, so the first reflection happens under the registry lock.
+        """
+        if self._collection_name in self._client.metadata_obj.tables:
+            return
+        with _clients_lock:
+            if self._collection_name in self._client.metadata_obj.tables:
+                return
+            if self._client.check_table_exists(self._collection_name):
+                self._client.refresh_metadata([self._collection_name])
+
     def _check_hybrid_search_support(self) -> bool:
         """
         Check if the current OceanBase version supports hybrid search.
@@ -143,6 +289,10 @@ class OceanBaseVector(BaseVector):
         if not self._config.enable_hybrid_search:
             return False
 
+        key = self._config.client_key()
+        if key in _hybrid_search_support:
+            return _hybrid_search_support[key]
+
         try:
             from packaging import version
 
@@ -151,47 +301,63 @@ class OceanBaseVector(BaseVector):
             ob_full_version = result.fetchone()[0]
             ob_version = ob_full_version.split()[1]
             logger.debug("Current OceanBase version is %s", ob_version)
-            return version.parse(ob_version).base_version >= version.parse("4.3.5.1").base_version
+            supported = version.parse(ob_version) >= version.parse("4.3.5.1")
         except Exception as e:
+            # not cached, a transient failure should not disable hybrid search for the lifetime of the process
             logger.warning(f"Failed to check OceanBase version: {str(e)}. Disabling hybrid search.")
             return False
+        _hybrid_search_support[key] = supported
+        return supported
 
     def add_texts(self, documents: list[Document], embeddings: list[list[float]], **kwargs):
         ids = self._get_uuids(documents)
-        for id, doc, emb in zip(ids, documents, embeddings):
-            self._client.insert(
-                table_name=self._collection_name,
-                data={
-                    "id": id,
-                    "vector": emb,
-                    "text": doc.page_content,
-                    "metadata": doc.metadata,
-                },
-            )
+        rows = [
+            {
+                "id": id,
+                "vector": emb,
+                "text": doc.page_content,
+                "metadata": doc.metadata,
+            }
+            for id, doc, emb in zip(ids, documents, embeddings)
+        ]
+        self._reflect_collection()
+        batch_size = self._config.batch_size
+        batches = [rows[i : i + batch_size] for i in range(0, len(rows), batch_size)]
+        if self._config.insert_workers <= 1 or len(batches) <= 1:
+            for batch in batches:
+                self._upsert_batch(batch)
+            return
+
+        with ThreadPoolExecutor(max_workers=min(self._config.insert_workers, len(batches))) as executor:
+            # consume results so that the first failing batch raises here
+            list(executor.map(self._upsert_batch, batches))
+
+    def _upsert_batch(self, rows: list[dict]) -> None:
+        # one multi-row REPLACE per batch, so re-indexing a segment overwrites its previous row
+        self._client.upsert(table_name=self._collection_name, data=rows)
 
     def text_exists(self, id: str) -> bool:
+        self._reflect_collection()
         cur = self._client.get(table_name=self._collection_name, ids=id)
         return bool(cur.rowcount != 0)
 
     def delete_by_ids(self, ids: list[str]) -> None:
         if not ids:
             return
+        self._reflect_collection()
         self._client.delete(table_name=self._collection_name, ids=ids)
 
     def get_ids_by_metadata_field(self, key: str, value: str) -> list[str]:
-        from sqlalchemy import text
-
-        cur = self._client.get(
-            table_name=self._collection_name,
-            ids=None,
-            where_clause=[text(f"metadata->>'$.{key}' = '{value}'")],
-            output_column_name=["id"],
-        )
-        return [row[0] for row in cur]
+        sql = f"SELECT id FROM `{self._collection_name}` WHERE {self._metadata_filter_sql(key)} = :value"
+        with self._client.engine.connect() as conn:
+            result = conn.execute(text(sql), {"value": value, "metadata_path": f"$.{key}"})
+            return [row[0] for row in result]
 
     def delete_by_metadata_field(self, key: str, value: str) -> None:
-        ids = self.get_ids_by_metadata_field(key, value)
-        self.delete_by_ids(ids)
+        # a single indexed DELETE instead of fetching the ids first
+        sql = f"DELETE FROM `{self._collection_name}` WHERE {self._metadata_filter_sql(key)} = :value"
+        with self._client.engine.begin() as conn:
+            conn.execute(text(sql), {"value": value, "metadata_path": f"$.{key}"})
 
     def search_by_full_text(self, query: str, **kwargs: Any) -> list[Document]:
         if not self._hybrid_search_enabled:
@@ -203,23 +369,26 @@ class OceanBaseVector(BaseVector):
                 raise ValueError("top_k must be a positive integer")
 
             document_ids_filter = kwargs.get("document_ids_filter")
+            params: dict[str, Any] = {"query": query, "top_k": top_k}
             where_clause = ""
             if document_ids_filter:
-                document_ids = ", ".join(f"'{id}'" for id in document_ids_filter)
-                where_clause = f" AND metadata->>'$.document_id' IN ({document_ids})"
+                where_clause = f" AND {self._metadata_filter_sql('document_id')} IN :document_ids"
+                params["document_ids"] = list(document_ids_filter)
+                params["metadata_path"] = "$.document_id"
 
             full_sql = f"""SELECT metadata, text, MATCH (text) AGAINST (:query) AS score
             FROM {self._collection_name}
             WHERE MATCH (text) AGAINST (:query) > 0
             {where_clause}
             ORDER BY score DESC
-            LIMIT {top_k}"""
+            LIMIT :top_k"""
+            statement = text(full_sql)
+            if document_ids_filter:
+                statement = statement.bindparams(bindparam("document_ids", expanding=True))
 
             with self._client.engine.connect() as conn:
                 with conn.begin():
-                    from sqlalchemy import text
-
-                    result = conn.execute(text(full_sql), {"query": query})
+                    result = conn.execute(statement, params)
                     rows = result.fetchall()
 
                     docs = []
@@ -238,20 +407,135 @@ class OceanBaseVector(BaseVector):
             logger.warning(f"Failed to fulltext search: {str(e)}.")
             return []
 
+    def supports_hybrid_search(self) -> bool:
+        return self._hybrid_search_enabled
+
+    def search_by_hybrid(self, query: str, query_vector: list[float], **kwargs: Any) -> list[Document]:
+        """
+        Run the ANN search and the full-text search in a single statement and fuse both rankings server-side.
+
+        `fusion` is either "rrf" (reciprocal rank fusion, the default) or "weighted", which combines the
+        vector similarity with the full-text relevance normalized to [0, 1], weighted by `vector_weight`
+        and `keyword_weight`. The fused value is returned as `fusion_score`. With RRF, `score_threshold`
+        applies to the vector similarity, like in `search_by_vector`, and `score` is the similarity of the
+        branch that found the document (the full-text relevance for full-text only hits). With weighted
+        fusion, `score` is the fused value and `score_threshold` applies to it.
+        """
+        if not self._hybrid_search_enabled:
+            raise ValueError("Hybrid search is not supported by this OceanBase collection.")
+
+        top_k = kwargs.get("top_k", 10)
+        if not isinstance(top_k, int) or top_k <= 0:
+            raise ValueError("top_k must be a positive integer")
+        fusion = kwargs.get("fusion", OCEANBASE_HYBRID_SEARCH_FUSION_RRF)
+        score_threshold = float(kwargs.get("score_threshold") or 0.0)
+        if fusion == OCEANBASE_HYBRID_SEARCH_FUSION_RRF:
+            vector_score = ":vector_weight / (:rrf_k + ROW_NUMBER() OVER (ORDER BY distance))"
+            keyword_score = ":keyword_weight / (:rrf_k + ROW_NUMBER() OVER (ORDER BY score DESC))"
+        elif fusion == OCEANBASE_HYBRID_SEARCH_FUSION_WEIGHTED:
+            vector_score = ":vector_weight * similarity"
+            keyword_score = ":keyword_weight * score / MAX(score) OVER ()"
+        else:
+            raise ValueError(f"Unsupported hybrid search fusion: {fusion}")
+
+        ef_search = kwargs.get("ef_search", self._hnsw_ef_search)
+        if ef_search != self._hnsw_ef_search:
+            self._client.set_ob_hnsw_ef_search(ef_search)
+            self._hnsw_ef_search = ef_search
+
+        params: dict[str, Any] = {
+            "query": kwargs.get("full_text_query", query),
+            "query_vector": "[" + ",".join(str(float(v)) for v in query_vector) + "]",
+            "top_k": top_k,
+            "rrf_k": self._config.hybrid_search_rrf_k,
+            "vector_weight": float(kwargs.get("vector_weight", 1.0)),
+            "keyword_weight": float(kwargs.get("keyword_weight", 1.0)),
+        }
+        similarity_filter = ""
+        if fusion == OCEANBASE_HYBRID_SEARCH_FUSION_RRF and score_threshold:
+            similarity_filter = f"WHERE 1 - distance / {math.sqrt(2)} >= :score_threshold"
+            params["score_threshold"] = score_threshold
+        vector_filter = ""
+        text_filter = ""
+        document_ids_filter = kwargs.get("document_ids_filter")
+        if document_ids_filter:
+            document_id = self._metadata_filter_sql("document_id")
+            vector_filter = f"WHERE {document_id} IN :document_ids"
+            text_filter = f"AND {document_id} IN :document_ids"
+            params["document_ids"] = list(document_ids_filter)
+            params["metadata_path"] = "$.document_id"
+
+        hybrid_sql = f"""WITH vector_hits AS (
+            SELECT id, distance, 1 - distance / {math.sqrt(2)} AS similarity
+            FROM (
+                SELECT id, l2_distance(vector, :query_vector) AS distance
+                FROM `{self._collection_name}`
+                {vector_filter}
+                ORDER BY l2_distance(vector, :query_vector) APPROXIMATE
+                LIMIT :top_k
+            ) ann
+            {similarity_filter}
+        ), text_hits AS (
+            SELECT id, MATCH (text) AGAINST (:query) AS score
+            FROM `{self._collection_name}`
+            WHERE MATCH (text) AGAINST (:query) > 0
+            {text_filter}
+            ORDER BY score DESC
+            LIMIT :top_k
+        ), fused AS (
+            SELECT id, SUM(fusion_score) AS fusion_score, MAX(similarity) AS similarity, MAX(relevance) AS relevance
+            FROM (
+                SELECT id, {vector_score} AS fusion_score, similarity, NULL AS relevance FROM vector_hits
+                UNION ALL
+                SELECT id, {keyword_score} AS fusion_score, NULL AS similarity, score AS relevance FROM text_hits
+            ) hits
+            GROUP BY id
+        )
+        SELECT c.text, c.metadata, fused.fusion_score, fused.similarity, fused.relevance
+        FROM fused JOIN `{self._collection_name}` c ON c.id = fused.id
+        ORDER BY fused.fusion_score DESC
+        LIMIT :top_k"""
+        statement = text(hybrid_sql)
+        if document_ids_filter:
+            statement = statement.bindparams(bindparam("document_ids", expanding=True))
+
+        try:
+            with self._client.engine.connect() as conn:
+                rows = conn.execute(statement, params).fetchall()
+        except Exception as e:
+            raise Exception("Failed to run hybrid search. ", e)
+
+        docs = []
+        for _text, metadata, fusion_score, similarity, relevance in rows:
+            metadata = json.loads(metadata) if isinstance(metadata, str) else metadata or {}
+            if fusion == OCEANBASE_HYBRID_SEARCH_FUSION_WEIGHTED:
+                if fusion_score < score_threshold:
+                    continue
+                metadata["score"] = float(fusion_score)
+            else:
+                metadata["score"] = float(similarity if similarity is not None else relevance)
+            metadata["fusion_score"] = float(fusion_score)
+            docs.append(Document(page_content=_text, metadata=metadata))
+        return docs
+
     def search_by_vector(self, query_vector: list[float], **kwargs: Any) -> list[Document]:
         document_ids_filter = kwargs.get("document_ids_filter")
         _where_clause = None
         if document_ids_filter:
-            document_ids = ", ".join(f"'{id}'" for id in document_ids_filter)
-            where_clause = f"metadata->>'$.document_id' in ({document_ids})"
-            from sqlalchemy import text
-
-            _where_clause = [text(where_clause)]
+            # ann_search inlines bound values with literal_binds, so the filter is built as an expression
+            # and its values are escaped by the dialect instead of being concatenated into the SQL
+            document_id: ColumnElement[Any]
+            if self._has_metadata_columns():
+                document_id = column("document_id")
+            else:
+                document_id = func.json_unquote(func.json_extract(column("metadata"), "$.document_id"))
+            _where_clause = [document_id.in_(list(document_ids_filter))]
         ef_search = kwargs.get("ef_search", self._hnsw_ef_search)
         if ef_search != self._hnsw_ef_search:
             self._client.set_ob_hnsw_ef_search(ef_search)
             self._hnsw_ef_search = ef_search
         topk = kwargs.get("top_k", 10)
+        self._reflect_collection()
         try:
             cur = self._client.ann_search(
                 table_name=self._collection_name,
@@ -279,6 +563,8 @@ class OceanBaseVector(BaseVector):
 
     def delete(self) -> None:
         self._client.drop_table_if_exist(self._collection_name)
+        _collections_with_metadata_columns.discard(self._collection_name)
+        self._metadata_columns_exist = None
 
 
 class OceanBaseVectorFactory(AbstractVectorFactory):
@@ -304,5 +590,11 @@ class OceanBaseVectorFactory(AbstractVectorFactory):
                 password=(dify_config.OCEANBASE_VECTOR_PASSWORD or ""),
                 database=dify_config.OCEANBASE_VECTOR_DATABASE or "",
                 enable_hybrid_search=dify_config.OCEANBASE_ENABLE_HYBRID_SEARCH or False,
+                hybrid_search_rrf_k=dify_config.OCEANBASE_HYBRID_SEARCH_RRF_K,
+                batch_size=dify_config.OCEANBASE_VECTOR_BATCH_SIZE,
+                insert_workers=dify_config.OCEANBASE_VECTOR_INSERT_WORKERS,
+                pool_size=dify_config.OCEANBASE_VECTOR_POOL_SIZE,
+                max_overflow=dify_config.OCEANBASE_VECTOR_MAX_OVERFLOW,
+                pool_recycle=dify_config.OCEANBASE_VECTOR_POOL_RECYCLE,
             ),
         )
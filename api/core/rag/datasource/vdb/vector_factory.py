@@ -215,6 +215,13 @@ class Vector:
     def search_by_full_text(self, query: str, **kwargs: Any) -> list[Document]:
         return self._vector_processor.search_by_full_text(query, **kwargs)
 
+    def supports_hybrid_search(self) -> bool:
+        return self._vector_processor.supports_hybrid_search()
+
+    def search_by_hybrid(self, query: str, **kwargs: Any) -> list[Document]:
+        query_vector = self._embeddings.embed_query(query)
+        return self._vector_processor.search_by_hybrid(query, query_vector, **kwargs)
+
     def delete(self) -> None:
         self._vector_processor.delete()
         # delete collection redis cache
@@ -1,9 +1,11 @@
 import base64
 import logging
+import uuid
 from typing import Any, Optional, cast
 
 import numpy as np
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.postgresql import insert
 
 from configs import dify_config
 from core.entities.embedding_type import EmbeddingInputType
@@ -20,6 +22,9 @@ logger = logging.getLogger(__name__)
 
 
 class CacheEmbedding(Embeddings):
+    # hashes per lookup query and rows per insert statement when caching document embeddings
+    CACHE_BATCH_SIZE = 500
+
     def __init__(self, model_instance: ModelInstance, user: Optional[str] = None) -> None:
         self._model_instance = model_instance
         self._user = user
@@ -28,23 +33,20 @@ class CacheEmbedding(Embeddings):
         """Embed search docs in batches of 10."""
         # use doc embedding cache or store if not exists
         text_embeddings: list[Any] = [None for _ in range(len(texts))]
-        embedding_queue_indices = []
+        # identical texts share a hash, so each unique text is looked up and embedded only once
+        hash_indices: dict[str, list[int]] = {}
         for i, text in enumerate(texts):
-            hash = helper.generate_text_hash(text)
-            embedding = (
-                db.session.query(Embedding)
-                .filter_by(
-                    model_name=self._model_instance.model, hash=hash, provider_name=self._model_instance.provider
-                )
-                .first()
-            )
-            if embedding:
-                text_embeddings[i] = embedding.get_embedding()
-            else:
-                embedding_queue_indices.append(i)
-        if embedding_queue_indices:
-            embedding_queue_texts = [texts[i] for i in embedding_queue_indices]
-            embedding_queue_embeddings = []
+            hash_indices.setdefault(helper.generate_text_hash(text), []).append(i)
+
+        cached_embeddings = self._get_cached_embeddings(list(hash_indices))
+        for hash, embedding in cached_embeddings.items():
+            for i in hash_indices[hash]:
+                text_embeddings[i] = embedding
+
+        embedding_queue_hashes = [hash for hash in hash_indices if hash not in cached_embeddings]
+        if embedding_queue_hashes:
+            embedding_queue_texts = [texts[hash_indices[hash][0]] for hash in embedding_queue_hashes]
+            embedding_queue_embeddings: dict[str, list[float]] = {}
             try:
                 model_type_instance = cast(TextEmbeddingModel, self._model_instance.model_type_instance)
                 model_schema = model_type_instance.get_model_schema(
@@ -57,12 +59,13 @@ class CacheEmbedding(Embeddings):
                 )
                 for i in range(0, len(embedding_queue_texts), max_chunks):
                     batch_texts = embedding_queue_texts[i : i + max_chunks]
+                    batch_hashes = embedding_queue_hashes[i : i + max_chunks]
 
                     embedding_result = self._model_instance.invoke_text_embedding(
                         texts=batch_texts, user=self._user, input_type=EmbeddingInputType.DOCUMENT
                     )
 
-                    for vector in embedding_result.embeddings:
+                    for hash, vector in zip(batch_hashes, embedding_result.embeddings):
                         try:
                             # FIXME: type ignore for numpy here
                             normalized_embedding = (vector / np.linalg.norm(vector)).tolist()  # type: ignore
@@ -71,28 +74,14 @@ class CacheEmbedding(Embeddings):
                                 # for issue #11827  float values are not json compliant
                                 logger.warning(f"Normalized embedding is nan: {normalized_embedding}")
                                 continue
-                            embedding_queue_embeddings.append(normalized_embedding)
-                        except IntegrityError:
-                            db.session.rollback()
+                            embedding_queue_embeddings[hash] = normalized_embedding
                         except Exception:
                             logging.exception("Failed transform embedding")
-                cache_embeddings = []
-                try:
-                    for i, n_embedding in zip(embedding_queue_indices, embedding_queue_embeddings):
+
+                for hash, n_embedding in embedding_queue_embeddings.items():
+                    for i in hash_indices[hash]:
                         text_embeddings[i] = n_embedding
-                        hash = helper.generate_text_hash(texts[i])
-                        if hash not in cache_embeddings:
-                            embedding_cache = Embedding(
-                                model_name=self._model_instance.model,
-                                hash=hash,
-                                provider_name=self._model_instance.provider,
-                            )
-                            embedding_cache.set_embedding(n_embedding)
-                            db.session.add(embedding_cache)
-                            cache_embeddings.append(hash)
-                    db.session.commit()
-                except IntegrityError:
-                    db.session.rollback()
+                self._save_embeddings(embedding_queue_embeddings)
             except Exception as ex:
                 db.session.rollback()
                 logger.exception("Failed to embed documents: %s")
@@ -100,6 +89,59 @@ class CacheEmbedding(Embeddings):
 
         return text_embeddings
 
+    def _get_cached_embeddings(self, hashes: list[str]) -> dict[str, list[float]]:
+        """Look up cached embeddings with one `hash IN (...)` query per chunk of hashes."""
+        cached_embeddings: dict[str, list[float]] = {}
+        for i in range(0, len(hashes), self.CACHE_BATCH_SIZE):
+            embeddings = (
+                db.session.query(Embedding)
+                .filter(
+                    Embedding.model_name == self._model_instance.model,
+                    Embedding.provider_name == self._model_instance.provider,
+                    Embedding.hash.in_(hashes[i : i + self.CACHE_BATCH_SIZE]),
+                )
+                .all()
+            )
+            for embedding in embeddings:
+                cached_embeddings[embedding.hash] = embedding.get_embedding()
+        return cached_embeddings
+
+    def _save_embeddings(self, embeddings: dict[str, list[float]]) -> None:
+        """
+        Store new embeddings with multi-row inserts that skip rows already cached,
+        e.g. by a concurrent indexing task embedding the same texts.
+        """
+        if not embeddings:
+            return
+        rows = []
+        for hash, n_embedding in embeddings.items():
+            embedding_cache = Embedding(
+                model_name=self._model_instance.model,
+                hash=hash,
+                provider_name=self._model_instance.provider,
+            )
+            embedding_cache.set_embedding(n_embedding)
+            rows.append(
+                {
+                    "id": str(uuid.uuid4()),
+                    "model_name": embedding_cache.model_name,
+                    "hash": embedding_cache.hash,
+                    "provider_name": embedding_cache.provider_name,
+                    "embedding": embedding_cache.embedding,
+                }
+            )
+        for i in range(0, len(rows), self.CACHE_BATCH_SIZE):
+            batch = rows[i : i + self.CACHE_BATCH_SIZE]
+            if dify_config.SQLALCHEMY_DATABASE_URI_SCHEME == "postgresql":
+                stmt = insert(Embedding).values(batch).on_conflict_do_nothing(index_elements=Embedding.unique_hash())
+            elif "mysql" in dify_config.SQLALCHEMY_DATABASE_URI_SCHEME:
+                # MySQL: INSERT IGNORE，忽略已缓存的 embedding
+                stmt = mysql_insert(Embedding).values(batch).prefix_with("IGNORE")
+            else:
+                raise Exception(f"Invalid SQLALCHEMY_DATABASE_URI_SCHEME: {dify_config.SQLALCHEMY_DATABASE_URI_SCHEME}")
+            db.session.execute(stmt)
+        db.session.commit()
+
     def embed_query(self, text: str) -> list[float]:
         """Embed query text."""
         # use doc embedding cache or store if not exists
@@ -1,4 +1,3 @@
-import math
 from collections import Counter
 from typing import Optional
 
@@ -81,63 +80,50 @@ class WeightRerankRunner(BaseRerankRunner):
                 document.metadata["keywords"] = document_keywords
                 documents_keywords.append(document_keywords)
 
-        # Counter query keywords(TF)
-        query_keyword_counts = Counter(query_keywords)
-
-        # total documents
-        total_documents = len(documents)
-
-        # calculate all documents' keywords IDF
-        all_keywords = set()
-        for document_keywords in documents_keywords:
-            all_keywords.update(document_keywords)
-
-        keyword_idf = {}
-        for keyword in all_keywords:
-            # calculate include query keywords' documents
-            doc_count_containing_keyword = sum(1 for doc_keywords in documents_keywords if keyword in doc_keywords)
-            # IDF
-            keyword_idf[keyword] = math.log((1 + total_documents) / (1 + doc_count_containing_keyword)) + 1
-
-        query_tfidf = {}
-
-        for keyword, count in query_keyword_counts.items():
-            tf = count
-            idf = keyword_idf.get(keyword, 0)
-            query_tfidf[keyword] = tf * idf
-
-        # calculate all documents' TF-IDF
-        documents_tfidf = []
-        for document_keywords in documents_keywords:
-            document_keyword_counts = Counter(document_keywords)
-            document_tfidf = {}
-            for keyword, count in document_keyword_counts.items():
-                tf = count
-                idf = keyword_idf.get(keyword, 0)
-                document_tfidf[keyword] = tf * idf
-            documents_tfidf.append(document_tfidf)
-
-        def cosine_similarity(vec1, vec2):
-            intersection = set(vec1.keys()) & set(vec2.keys())
-            numerator = sum(vec1[x] * vec2[x] for x in intersection)
-
-            sum1 = sum(vec1[x] ** 2 for x in vec1)
-            sum2 = sum(vec2[x] ** 2 for x in vec2)
-            denominator = math.sqrt(sum1) * math.sqrt(sum2)
-
-            if not denominator:
-                return 0.0
-            else:
-                return float(numerator) / denominator
-
-        similarities = []
-        for document_tfidf in documents_tfidf:
-            similarity = cosine_similarity(query_tfidf, document_tfidf)
-            similarities.append(similarity)
+        return self._keyword_similarities(query_keywords, documents_keywords).tolist()
 
-        # for idx, similarity in enumerate(similarities):
-        #     print(f"Document {idx + 1} similarity: {similarity}")
+    @staticmethod
+    def _keyword_similarities(query_keywords, documents_keywords: list) -> np.ndarray:
+        """
+        TF-IDF cosine similarity between the query and every document.
 
+        The document-term matrix is kept in coordinate form (one entry per distinct keyword of a document),
+        so document frequencies, TF-IDF weights, norms and dot products for all documents are each a single
+        NumPy operation over the non-zero entries.
+        """
+        total_documents = len(documents_keywords)
+        if not total_documents:
+            return np.zeros(0)
+
+        vocabulary: dict[str, int] = {}
+        rows: list[int] = []
+        cols: list[int] = []
+        counts: list[int] = []
+        for row, document_keywords in enumerate(documents_keywords):
+            for keyword, count in Counter(document_keywords).items():
+                rows.append(row)
+                cols.append(vocabulary.setdefault(keyword, len(vocabulary)))
+                counts.append(count)
+        row_index = np.asarray(rows, dtype=np.intp)
+        col_index = np.asarray(cols, dtype=np.intp)
+
+        # IDF of every keyword, from the number of documents containing it
+        document_frequency = np.bincount(col_index, minlength=len(vocabulary))
+        idf = np.log((1 + total_documents) / (1 + document_frequency)) + 1
+
+        # query TF-IDF, keywords absent from all documents weigh 0
+        query_tfidf = np.zeros(len(vocabulary))
+        for keyword, count in Counter(query_keywords).items():
+            if keyword in vocabulary:
+                query_tfidf[vocabulary[keyword]] = count * idf[vocabulary[keyword]]
+
+        documents_tfidf = np.asarray(counts, dtype=float) * idf[col_index]
+        numerators = np.bincount(row_index, weights=documents_tfidf * query_tfidf[col_index], minlength=total_documents)
+        documents_norm = np.sqrt(np.bincount(row_index, weights=documents_tfidf**2, minlength=total_documents))
+        denominators = documents_norm * np.linalg.norm(query_tfidf)
+
+        similarities = np.zeros(total_documents)
+        np.divide(numerators, denominators, out=similarities, where=denominators != 0)
         return similarities
 
     def _calculate_cosine(
@@ -150,8 +136,6 @@ class WeightRerankRunner(BaseRerankRunner):
 
         :return:
         """
-        query_vector_scores = []
-
         model_manager = ModelManager()
 
         embedding_model = model_manager.get_model_instance(
@@ -162,24 +146,25 @@ class WeightRerankRunner(BaseRerankRunner):
         )
         cache_embedding = CacheEmbedding(embedding_model)
         query_vector = cache_embedding.embed_query(query)
-        for document in documents:
-            # calculate cosine similarity
-            if document.metadata and "score" in document.metadata:
-                query_vector_scores.append(document.metadata["score"])
-            else:
-                # transform to NumPy
-                vec1 = np.array(query_vector)
-                vec2 = np.array(document.vector)
-
-                # calculate dot product
-                dot_product = np.dot(vec1, vec2)
+        return self._vector_similarities(query_vector, documents).tolist()
 
-                # calculate norm
-                norm_vec1 = np.linalg.norm(vec1)
-                norm_vec2 = np.linalg.norm(vec2)
-
-                # calculate cosine similarity
-                cosine_sim = dot_product / (norm_vec1 * norm_vec2)
-                query_vector_scores.append(cosine_sim)
+    @staticmethod
+    def _vector_similarities(query_vector: list[float], documents: list[Document]) -> np.ndarray:
+        """
+        Cosine similarity between the query and every document, reusing the retrieval score when present.
 
-        return query_vector_scores
+        Document vectors are stacked into one matrix, so all missing scores take a single matrix product.
+        """
+        scores = np.zeros(len(documents))
+        pending = []
+        for i, document in enumerate(documents):
+            if document.metadata and "score" in document.metadata:
+                scores[i] = document.metadata["score"]
+            else:
+                pending.append(i)
+        if pending:
+            query = np.asarray(query_vector, dtype=float)
+            matrix = np.asarray([documents[i].vector for i in pending], dtype=float)
+            # calculate cosine similarity
+            scores[pending] = (matrix @ query) / (np.linalg.norm(matrix, axis=1) * np.linalg.norm(query))
+        return scores
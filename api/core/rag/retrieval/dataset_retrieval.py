@@ -1,9 +1,10 @@
 import json
+import logging
 import math
 import re
-import threading
 from collections import Counter, defaultdict
-from collections.abc import Generator, Mapping
+from collections.abc import Callable, Generator, Mapping
+from functools import partial
 from typing import Any, Optional, Union, cast
 
 from flask import Flask, current_app
@@ -11,6 +12,7 @@ from sqlalchemy import Float, and_, or_, text
 from sqlalchemy import cast as sqlalchemy_cast
 from sqlalchemy.orm import Session
 
+from configs import dify_config
 from core.app.app_config.entities import (
     DatasetEntity,
     DatasetRetrieveConfigEntity,
@@ -39,12 +41,13 @@ from core.rag.datasource.retrieval_service import RetrievalService
 from core.rag.entities.citation_metadata import RetrievalSourceMetadata
 from core.rag.entities.context_entities import DocumentContext
 from core.rag.entities.metadata_entities import Condition, MetadataCondition
-from core.rag.index_processor.constant.index_type import IndexType
 from core.rag.models.document import Document
 from core.rag.rerank.rerank_type import RerankMode
+from core.rag.retrieval.retrieval_executor import RetrievalExecutor
 from core.rag.retrieval.retrieval_methods import RetrievalMethod
 from core.rag.retrieval.router.multi_dataset_function_call_router import FunctionCallMultiDatasetRouter
 from core.rag.retrieval.router.multi_dataset_react_route import ReactMultiDatasetRouter
+from core.rag.retrieval.segment_hit_counter import segment_hit_counter
 from core.rag.retrieval.template_prompts import (
     METADATA_FILTER_ASSISTANT_PROMPT_1,
     METADATA_FILTER_ASSISTANT_PROMPT_2,
@@ -57,10 +60,12 @@ from core.rag.retrieval.template_prompts import (
 from core.tools.utils.dataset_retriever.dataset_retriever_base_tool import DatasetRetrieverBaseTool
 from extensions.ext_database import db
 from libs.json_in_md_parser import parse_and_check_json_markdown
-from models.dataset import ChildChunk, Dataset, DatasetMetadata, DatasetQuery, DocumentSegment
+from models.dataset import Dataset, DatasetMetadata, DatasetQuery
 from models.dataset import Document as DatasetDocument
 from services.external_knowledge_service import ExternalDatasetService
 
+logger = logging.getLogger(__name__)
+
 default_retrieval_model: dict[str, Any] = {
     "search_method": RetrievalMethod.SEMANTIC_SEARCH.value,
     "reranking_enable": False,
@@ -421,7 +426,6 @@ class DatasetRetrieval:
     ):
         if not available_datasets:
             return []
-        threads = []
         all_documents: list[Document] = []
         dataset_ids = [dataset.id for dataset in available_datasets]
         index_type_check = all(
@@ -455,6 +459,8 @@ class DatasetRetrieval:
                     ].embedding_model_provider
                     weights["vector_setting"]["embedding_model_name"] = available_datasets[0].embedding_model
 
+        retriever_tasks: list[Callable[[], None]] = []
+        retrieved_datasets: list[tuple[str, list[Document]]] = []
         for dataset in available_datasets:
             index_type = dataset.indexing_technique
             document_ids_filter = None
@@ -467,22 +473,31 @@ class DatasetRetrieval:
                         document_ids_filter = document_ids
                     else:
                         continue
-            retrieval_thread = threading.Thread(
-                target=self._retriever,
-                kwargs={
-                    "flask_app": current_app._get_current_object(),  # type: ignore
-                    "dataset_id": dataset.id,
-                    "query": query,
-                    "top_k": top_k,
-                    "all_documents": all_documents,
-                    "document_ids_filter": document_ids_filter,
-                    "metadata_condition": metadata_condition,
-                },
+            # every dataset collects into its own list, so one finishing after the timeout changes nothing
+            documents: list[Document] = []
+            retrieved_datasets.append((dataset.id, documents))
+            retriever_tasks.append(
+                partial(
+                    self._retriever,
+                    flask_app=current_app._get_current_object(),  # type: ignore
+                    dataset_id=dataset.id,
+                    query=query,
+                    top_k=top_k,
+                    all_documents=documents,
+                    document_ids_filter=document_ids_filter,
+                    metadata_condition=metadata_condition,
+                )
             )
-            threads.append(retrieval_thread)
-            retrieval_thread.start()
-        for thread in threads:
-            thread.join()
+        timed_out = RetrievalExecutor.get_instance().run_all(
+            retriever_tasks,
+            timeout=dify_config.RETRIEVAL_TIMEOUT,
+            max_fan_out=dify_config.RETRIEVAL_SERVICE_EXECUTORS,
+        )
+        for index, (dataset_id, documents) in enumerate(retrieved_datasets):
+            if index in timed_out:
+                logger.warning("Retrieval from dataset %s timed out", dataset_id)
+            else:
+                all_documents.extend(documents)
 
         with measure_time() as timer:
             if reranking_enable:
@@ -511,50 +526,8 @@ class DatasetRetrieval:
         self, documents: list[Document], message_id: Optional[str] = None, timer: Optional[dict] = None
     ) -> None:
         """Handle retrieval end."""
-        dify_documents = [document for document in documents if document.provider == "dify"]
-        for document in dify_documents:
-            if document.metadata is not None:
-                dataset_document = (
-                    db.session.query(DatasetDocument)
-                    .filter(DatasetDocument.id == document.metadata["document_id"])
-                    .first()
-                )
-                if dataset_document:
-                    if dataset_document.doc_form == IndexType.PARENT_CHILD_INDEX:
-                        child_chunk = (
-                            db.session.query(ChildChunk)
-                            .filter(
-                                ChildChunk.index_node_id == document.metadata["doc_id"],
-                                ChildChunk.dataset_id == dataset_document.dataset_id,
-                                ChildChunk.document_id == dataset_document.id,
-                            )
-                            .first()
-                        )
-                        if child_chunk:
-                            segment = (
-                                db.session.query(DocumentSegment)
-                                .filter(DocumentSegment.id == child_chunk.segment_id)
-                                .update(
-                                    {DocumentSegment.hit_count: DocumentSegment.hit_count + 1},
-                                    synchronize_session=False,
-                                )
-                            )
-                            db.session.commit()
-                    else:
-                        query = db.session.query(DocumentSegment).filter(
-                            DocumentSegment.index_node_id == document.metadata["doc_id"]
-                        )
-
-                        # if 'dataset_id' in document.metadata:
-                        if "dataset_id" in document.metadata:
-                            query = query.filter(DocumentSegment.dataset_id == document.metadata["dataset_id"])
-
-                        # add hit count to document segment
-                        query.update(
-                            {DocumentSegment.hit_count: DocumentSegment.hit_count + 1}, synchronize_session=False
-                        )
-
-                    db.session.commit()
+        # hit counts are written in batches by a timer thread, off the request path
+        segment_hit_counter.add(documents)
 
         # get tracing instance
         trace_manager: TraceQueueManager | None = (
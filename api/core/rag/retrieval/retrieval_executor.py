@@ -0,0 +1,152 @@
+import logging
+import os
+import threading
+import time
+from collections.abc import Callable, Sequence
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Optional
+
+from opentelemetry.metrics import get_meter
+
+from configs import dify_config
+
+logger = logging.getLogger(__name__)
+
+# no-op until a meter provider is configured by ext_otel
+_meter = get_meter("retrieval_executor")
+_queue_depth = _meter.create_up_down_counter(
+    "retrieval.executor.queue_depth",
+    description="Number of retrieval tasks waiting for a thread of the shared retrieval executor",
+    unit="{task}",
+)
+_active_tasks = _meter.create_up_down_counter(
+    "retrieval.executor.active",
+    description="Number of retrieval tasks running on the shared retrieval executor",
+    unit="{task}",
+)
+_timed_out_tasks = _meter.create_counter(
+    "retrieval.executor.timeouts",
+    description="Number of retrieval tasks left out of a retrieval because its timeout expired",
+    unit="{task}",
+)
+
+
+class RetrievalExecutor:
+    """
+    Process-wide, bounded thread pool shared by multi-dataset retrieval and RetrievalService.
+
+    A retrieval worker that fans out again (a dataset retriever running several search methods) runs
+    any of its subtasks that no thread has picked up yet itself, so nested fan-out keeps whatever
+    parallelism the pool has spare but can never deadlock it.
+    """
+
+    _instance: Optional["RetrievalExecutor"] = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, max_workers: int):
+        self._pid = os.getpid()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="retrieval")
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._active = 0
+
+    @classmethod
+    def get_instance(cls) -> "RetrievalExecutor":
+        instance = cls._instance
+        # threads do not survive a fork, so a pool created before it is unusable in the child
+        if instance is None or instance._pid != os.getpid():
+            with cls._instance_lock:
+                instance = cls._instance
+                if instance is None or instance._pid != os.getpid():
+                    instance = cls(dify_config.RETRIEVAL_EXECUTOR_MAX_WORKERS)
+                    cls._instance = instance
+        return instance
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queued
+
+    @property
+    def active_count(self) -> int:
+        return self._active
+
+    def run_all(
+        self,
+        tasks: Sequence[Callable[[], Any]],
+        timeout: Optional[float] = None,
+        max_fan_out: Optional[int] = None,
+    ) -> list[int]:
+        """
+        Run the tasks on the shared pool and wait for them.
+
+        :param tasks: callables to run, exceptions they raise are logged
+        :param timeout: seconds after which unfinished tasks are given up on
+        :param max_fan_out: maximum number of these tasks queued or running at once
+        :return: indexes of the tasks that did not finish before the timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        max_fan_out = max_fan_out or len(tasks)
+        pending = list(range(len(tasks)))
+        in_flight: dict[Future, int] = {}
+        is_worker = getattr(self._local, "is_worker", False)
+
+        while pending or in_flight:
+            while pending and len(in_flight) < max_fan_out:
+                index = pending.pop(0)
+                in_flight[self._submit(tasks[index])] = index
+
+            if is_worker:
+                stolen = next((future for future in reversed(list(in_flight)) if future.cancel()), None)
+                if stolen is not None:
+                    self._dequeue()
+                    self._run_task(tasks[in_flight.pop(stolen)])
+                    continue
+
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                break
+            done, _ = wait(in_flight, timeout=remaining, return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                in_flight.pop(future)
+
+        timed_out = sorted(pending + list(in_flight.values()))
+        for future in in_flight:
+            if future.cancel():
+                self._dequeue()
+        if timed_out:
+            _timed_out_tasks.add(len(timed_out))
+        return timed_out
+
+    def _submit(self, task: Callable[[], Any]) -> Future:
+        with self._lock:
+            self._queued += 1
+        _queue_depth.add(1)
+        return self._executor.submit(self._run_worker_task, task)
+
+    def _dequeue(self) -> None:
+        with self._lock:
+            self._queued -= 1
+        _queue_depth.add(-1)
+
+    def _run_worker_task(self, task: Callable[[], Any]) -> None:
+        self._dequeue()
+        self._local.is_worker = True
+        with self._lock:
+            self._active += 1
+        _active_tasks.add(1)
+        try:
+            self._run_task(task)
+        finally:
+            with self._lock:
+                self._active -= 1
+            _active_tasks.add(-1)
+
+    @staticmethod
+    def _run_task(task: Callable[[], Any]) -> None:
+        try:
+            task()
+        except Exception:
+            logger.exception("Retrieval task failed")
@@ -0,0 +1,153 @@
+import logging
+import threading
+from collections import Counter, defaultdict
+from typing import Optional
+
+from flask import Flask, current_app
+from sqlalchemy import case, select, update
+
+from configs import dify_config
+from core.rag.index_processor.constant.index_type import IndexType
+from core.rag.models.document import Document
+from extensions.ext_database import db
+from models.dataset import ChildChunk, DocumentSegment
+from models.dataset import Document as DatasetDocument
+
+logger = logging.getLogger(__name__)
+
+
+class SegmentHitCounter:
+    """
+    Accumulates hit counts of retrieved segments in memory and writes them from a timer thread.
+
+    Hits are keyed by (dataset id, document id, index node id) as found in the retrieved documents. A flush
+    resolves all of them to segment ids with one query per table and applies the increments with batched
+    `UPDATE ... SET hit_count = hit_count + CASE id ... END` statements, committed per batch in segment id
+    order so concurrent flushes lock rows in the same order. Hits a flush fails to write are counted again
+    by the next one.
+    """
+
+    def __init__(self, interval: float, batch_size: int):
+        self._interval = interval
+        self._batch_size = batch_size
+        self._lock = threading.Lock()
+        self._hits: Counter[tuple[str, str, str]] = Counter()
+        self._timer: Optional[threading.Timer] = None
+        self._flask_app: Optional[Flask] = None
+
+    def add(self, documents: list[Document]) -> None:
+        with self._lock:
+            for document in documents:
+                if document.provider != "dify" or document.metadata is None:
+                    continue
+                metadata = document.metadata
+                self._hits[(metadata.get("dataset_id", ""), metadata["document_id"], metadata["doc_id"])] += 1
+            if not self._hits:
+                return
+            self._flask_app = current_app._get_current_object()  # type: ignore
+            self._schedule()
+
+    def _schedule(self) -> None:
+        # must be called with self._lock held
+        if self._timer is None or not self._timer.is_alive():
+            self._timer = threading.Timer(self._interval, self.flush)
+            self._timer.name = "segment_hit_counter_timer"
+            # not a daemon, so hits counted before shutdown are still written
+            self._timer.daemon = False
+            self._timer.start()
+
+    def flush(self) -> None:
+        with self._lock:
+            hits, self._hits = self._hits, Counter()
+            flask_app = self._flask_app
+        if not hits or flask_app is None:
+            return
+        try:
+            with flask_app.app_context():
+                unwritten = self._write(hits)
+        except Exception:
+            logger.exception("Failed to write hit counts of %d retrieved segments, retrying them later", len(hits))
+            unwritten = hits
+        if unwritten:
+            with self._lock:
+                self._hits.update(unwritten)
+                self._schedule()
+
+    def _write(self, hits: Counter[tuple[str, str, str]]) -> Counter[tuple[str, str, str]]:
+        """
+        Write the hit counts, returning the hits of the batches that failed.
+        """
+        document_ids = {document_id for _, document_id, _ in hits}
+        documents = {
+            row.id: row
+            for row in db.session.execute(
+                select(DatasetDocument.id, DatasetDocument.dataset_id, DatasetDocument.doc_form).where(
+                    DatasetDocument.id.in_(document_ids)
+                )
+            )
+        }
+
+        # child chunks count towards their parent segment, other documents match segments by index node id
+        child_hits: dict[tuple[str, str], list[tuple[str, str, str]]] = defaultdict(list)
+        segment_hits: dict[tuple[str, str], list[tuple[str, str, str]]] = defaultdict(list)
+        for key in hits:
+            dataset_id, document_id, index_node_id = key
+            document = documents.get(document_id)
+            if document is None:
+                continue
+            if document.doc_form == IndexType.PARENT_CHILD_INDEX:
+                child_hits[(document_id, index_node_id)].append(key)
+            else:
+                segment_hits[(dataset_id or document.dataset_id, index_node_id)].append(key)
+
+        increments: Counter[str] = Counter()
+        # hits counted towards each segment, to retry them if its batch fails
+        segment_keys: dict[str, set[tuple[str, str, str]]] = defaultdict(set)
+        if child_hits:
+            rows = db.session.execute(
+                select(ChildChunk.document_id, ChildChunk.index_node_id, ChildChunk.segment_id).where(
+                    ChildChunk.document_id.in_({document_id for document_id, _ in child_hits}),
+                    ChildChunk.index_node_id.in_({index_node_id for _, index_node_id in child_hits}),
+                )
+            )
+            for row in rows:
+                child_keys = child_hits.get((row.document_id, row.index_node_id))
+                if child_keys:
+                    increments[row.segment_id] += sum(hits[key] for key in child_keys)
+                    segment_keys[row.segment_id].update(child_keys)
+        if segment_hits:
+            rows = db.session.execute(
+                select(DocumentSegment.id, DocumentSegment.dataset_id, DocumentSegment.index_node_id).where(
+                    DocumentSegment.dataset_id.in_({dataset_id for dataset_id, _ in segment_hits}),
+                    DocumentSegment.index_node_id.in_({index_node_id for _, index_node_id in segment_hits}),
+                )
+            )
+            for row in rows:
+                segment_hit_keys = segment_hits.get((row.dataset_id, row.index_node_id))
+                if segment_hit_keys:
+                    increments[row.id] += sum(hits[key] for key in segment_hit_keys)
+                    segment_keys[row.id].update(segment_hit_keys)
+
+        segment_ids = sorted(increments)
+        for i in range(0, len(segment_ids), self._batch_size):
+            batch = {segment_id: increments[segment_id] for segment_id in segment_ids[i : i + self._batch_size]}
+            try:
+                db.session.execute(
+                    update(DocumentSegment)
+                    .where(DocumentSegment.id.in_(batch))
+                    .values(hit_count=DocumentSegment.hit_count + case(batch, value=DocumentSegment.id, else_=0))
+                    .execution_options(synchronize_session=False)
+                )
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                unwritten_keys = {key for segment_id in segment_ids[i:] for key in segment_keys[segment_id]}
+                logger.exception("Failed to write hit counts of %d segments, retrying them later", len(segment_ids) - i)
+                return Counter({key: hits[key] for key in unwritten_keys})
+        return Counter()
+
+
+segment_hit_counter = SegmentHitCounter(
+    interval=dify_config.SEGMENT_HIT_COUNT_FLUSH_INTERVAL,
+    batch_size=dify_config.SEGMENT_HIT_COUNT_BATCH_SIZE,
+)
@@ -0,0 +1,227 @@
+"""
+Write-behind implementation of the WorkflowNodeExecutionRepository.
+"""
+
+import atexit
+import logging
+import os
+import threading
+import time
+from collections.abc import Sequence
+from typing import Any, Optional
+
+from opentelemetry.metrics import get_meter
+from sqlalchemy import inspect
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.orm import sessionmaker
+
+from configs import dify_config
+from core.repositories.sqlalchemy_workflow_node_execution_repository import SQLAlchemyWorkflowNodeExecutionRepository
+from core.workflow.entities.workflow_node_execution import WorkflowNodeExecution
+from core.workflow.repositories.workflow_node_execution_repository import OrderConfig
+from models import WorkflowNodeExecutionModel
+
+logger = logging.getLogger(__name__)
+
+# no-op until a meter provider is configured by ext_otel
+_meter = get_meter("workflow_node_execution_writer")
+_queue_depth = _meter.create_up_down_counter(
+    "workflow_node_execution.writer.queue_depth",
+    description="Number of node executions buffered by the write-behind repository and not yet written",
+    unit="{execution}",
+)
+_flush_duration = _meter.create_histogram(
+    "workflow_node_execution.writer.flush.duration",
+    description="Duration of one flush of buffered node executions",
+    unit="s",
+)
+_flushed_rows = _meter.create_counter(
+    "workflow_node_execution.writer.rows_written",
+    description="Number of node executions written by the write-behind repository",
+    unit="{execution}",
+)
+_dropped_rows = _meter.create_counter(
+    "workflow_node_execution.writer.rows_dropped",
+    description="Number of node executions dropped by the write-behind repository after repeated write failures",
+    unit="{execution}",
+)
+
+
+class WorkflowNodeExecutionWriter:
+    """
+    Process-wide background writer of node executions.
+
+    Buffered rows are keyed by id, so a node started and finished within one interval is written once.
+    Rows are written with multi-row upserts (`INSERT ... ON DUPLICATE KEY UPDATE` on MySQL,
+    `INSERT ... ON CONFLICT DO UPDATE` on PostgreSQL), one transaction per flush. Flushes are
+    serialized, so a later save of a row is never overwritten by an earlier one.
+
+    If a flush fails, its rows are written one by one, so a single bad row cannot hold back the others.
+    Rows that still fail are retried by the next flushes and dropped after `max_attempts` failed writes.
+    """
+
+    def __init__(self, interval: float, batch_size: int, max_attempts: int):
+        self._interval = interval
+        self._batch_size = batch_size
+        self._max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        # id -> (session factory, row)
+        self._pending: dict[str, tuple[sessionmaker, dict[str, Any]]] = {}
+        # id -> number of failed writes of the row
+        self._failed_attempts: dict[str, int] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._columns = [(attr.key, attr.columns[0].name) for attr in inspect(WorkflowNodeExecutionModel).column_attrs]
+        atexit.register(self.flush)
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._pending)
+
+    def add(self, session_factory: sessionmaker, db_model: WorkflowNodeExecutionModel) -> None:
+        row = {name: getattr(db_model, key) for key, name in self._columns}
+        with self._lock:
+            self._ensure_thread()
+            if row["id"] not in self._pending:
+                _queue_depth.add(1)
+            self._pending[row["id"]] = (session_factory, row)
+            full = len(self._pending) >= self._batch_size
+        if full:
+            self._wakeup.set()
+
+    def flush(self) -> None:
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if not pending:
+                return
+            _queue_depth.add(-len(pending))
+
+            # one transaction per database, repositories built from the same engine share it
+            groups: dict[Any, tuple[sessionmaker, list[dict[str, Any]]]] = {}
+            for session_factory, row in pending.values():
+                bind = session_factory.kw.get("bind") or session_factory
+                groups.setdefault(bind, (session_factory, []))[1].append(row)
+
+            for session_factory, rows in groups.values():
+                try:
+                    self._write(session_factory, rows)
+                except Exception:
+                    logger.exception("Failed to write %d node executions, writing them one by one", len(rows))
+                    for row in rows:
+                        self._write_row(session_factory, row)
+                else:
+                    for row in rows:
+                        self._failed_attempts.pop(row["id"], None)
+
+    def _write_row(self, session_factory: sessionmaker, row: dict[str, Any]) -> None:
+        try:
+            self._write(session_factory, [row])
+        except Exception:
+            attempts = self._failed_attempts.get(row["id"], 0) + 1
+            if attempts < self._max_attempts:
+                self._failed_attempts[row["id"]] = attempts
+                logger.warning("Failed to write node execution %s, retrying with the next flush", row["id"])
+                self._requeue(session_factory, row)
+            else:
+                self._failed_attempts.pop(row["id"], None)
+                logger.exception("Dropping node execution %s after %d failed writes", row["id"], attempts)
+                _dropped_rows.add(1)
+        else:
+            self._failed_attempts.pop(row["id"], None)
+
+    def _write(self, session_factory: sessionmaker, rows: list[dict[str, Any]]) -> None:
+        start = time.perf_counter()
+        update_columns = [name for _, name in self._columns if name != "id"]
+        with session_factory() as session:
+            dialect = session.get_bind().dialect.name
+            for i in range(0, len(rows), self._batch_size):
+                batch = rows[i : i + self._batch_size]
+                if dialect == "postgresql":
+                    pg_stmt = postgresql_insert(WorkflowNodeExecutionModel).values(batch)
+                    stmt = pg_stmt.on_conflict_do_update(
+                        index_elements=["id"], set_={name: pg_stmt.excluded[name] for name in update_columns}
+                    )
+                elif dialect == "mysql":
+                    mysql_stmt = mysql_insert(WorkflowNodeExecutionModel).values(batch)
+                    stmt = mysql_stmt.on_duplicate_key_update(
+                        {name: mysql_stmt.inserted[name] for name in update_columns}
+                    )
+                else:
+                    raise ValueError(f"Unsupported database dialect for node execution upserts: {dialect}")
+                session.execute(stmt)
+            session.commit()
+        _flush_duration.record(time.perf_counter() - start)
+        _flushed_rows.add(len(rows))
+
+    def _requeue(self, session_factory: sessionmaker, row: dict[str, Any]) -> None:
+        with self._lock:
+            # a row saved again since is newer and replaces the failed one
+            if row["id"] not in self._pending:
+                self._pending[row["id"]] = (session_factory, row)
+                _queue_depth.add(1)
+
+    def _ensure_thread(self) -> None:
+        # threads do not survive a fork, so the child starts its own writer
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        if self._pid is not None and self._pid != os.getpid():
+            self._pending.clear()
+            self._failed_attempts.clear()
+        self._pid = os.getpid()
+        self._thread = threading.Thread(target=self._run, name="workflow_node_execution_writer", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait(self._interval)
+            self._wakeup.clear()
+            self.flush()
+
+
+node_execution_writer = WorkflowNodeExecutionWriter(
+    interval=dify_config.WORKFLOW_NODE_EXECUTION_FLUSH_INTERVAL,
+    batch_size=dify_config.WORKFLOW_NODE_EXECUTION_FLUSH_BATCH_SIZE,
+    max_attempts=dify_config.WORKFLOW_NODE_EXECUTION_FLUSH_MAX_ATTEMPTS,
+)
+
+
+class WriteBehindWorkflowNodeExecutionRepository(SQLAlchemyWorkflowNodeExecutionRepository):
+    """
+    SQLAlchemy WorkflowNodeExecutionRepository that writes node executions from a background thread.
+
+    `save` only buffers the execution, so node starts, retries and completions no longer cost a
+    transaction each on the streaming thread. Buffered executions are written every
+    WORKFLOW_NODE_EXECUTION_FLUSH_INTERVAL seconds, when WORKFLOW_NODE_EXECUTION_FLUSH_BATCH_SIZE of
+    them are pending, when the workflow finishes (`flush`), before reads and at interpreter exit.
+    """
+
+    def save(self, execution: WorkflowNodeExecution) -> None:
+        """
+        Buffer a NodeExecution domain entity to be written by the background writer.
+
+        Args:
+            execution: The NodeExecution domain entity to persist
+        """
+        db_model = self.to_db_model(execution)
+        node_execution_writer.add(self._session_factory, db_model)
+
+        if db_model.node_execution_id:
+            self._node_execution_cache[db_model.node_execution_id] = db_model
+
+    def flush(self) -> None:
+        """
+        Write all buffered node executions.
+        """
+        node_execution_writer.flush()
+
+    def get_db_models_by_workflow_run(
+        self,
+        workflow_run_id: str,
+        order_config: Optional[OrderConfig] = None,
+    ) -> Sequence[WorkflowNodeExecutionModel]:
+        self.flush()
+        return super().get_db_models_by_workflow_run(workflow_run_id, order_config)
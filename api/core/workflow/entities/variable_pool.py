@@ -1,9 +1,9 @@
 import re
 from collections import defaultdict
 from collections.abc import Mapping, Sequence
-from typing import Annotated, Any, Union, cast
+from typing import Annotated, Any, Optional, Union, cast
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr, SerializerFunctionWrapHandler, field_serializer
 
 from core.file import File, FileAttribute, file_manager
 from core.variables import Segment, SegmentGroup, Variable
@@ -46,6 +46,12 @@ class VariablePool(BaseModel):
         default_factory=list,
     )
 
+    # An overlay pool created by `create_overlay` only holds its own writes and reads through to its parent.
+    # Node ids and (node id, key hash) pairs removed from an overlay hide the parent's variables.
+    _parent: Optional["VariablePool"] = PrivateAttr(default=None)
+    _removed_nodes: set[str] = PrivateAttr(default_factory=set)
+    _removed_keys: set[tuple[str, int]] = PrivateAttr(default_factory=set)
+
     def model_post_init(self, context: Any, /) -> None:
         # Create a mapping from field names to SystemVariableKey enum values
         self._add_system_variables(self.system_variables)
@@ -88,6 +94,7 @@ class VariablePool(BaseModel):
         # Based on the definition of `VariableUnion`,
         # `list[Variable]` can be safely used as `list[VariableUnion]` since they are compatible.
         self.variable_dictionary[key][hash_key] = cast(VariableUnion, variable)
+        self._removed_keys.discard((key, hash_key))
 
     @classmethod
     def _selector_to_keys(cls, selector: Sequence[str]) -> tuple[str, int]:
@@ -95,11 +102,18 @@ class VariablePool(BaseModel):
 
     def _has(self, selector: Sequence[str]) -> bool:
         key, hash_key = self._selector_to_keys(selector)
-        if key not in self.variable_dictionary:
-            return False
-        if hash_key not in self.variable_dictionary[key]:
-            return False
-        return True
+        return self._lookup(key, hash_key) is not None
+
+    def _lookup(self, key: str, hash_key: int) -> VariableUnion | None:
+        pool: VariablePool | None = self
+        while pool is not None:
+            variables = pool.variable_dictionary.get(key)
+            if variables is not None and hash_key in variables:
+                return variables[hash_key]
+            if key in pool._removed_nodes or (key, hash_key) in pool._removed_keys:
+                return None
+            pool = pool._parent
+        return None
 
     def get(self, selector: Sequence[str], /) -> Segment | None:
         """
@@ -118,7 +132,7 @@ class VariablePool(BaseModel):
             return None
 
         key, hash_key = self._selector_to_keys(selector)
-        value: Segment | None = self.variable_dictionary[key].get(hash_key)
+        value: Segment | None = self._lookup(key, hash_key)
 
         if value is None:
             selector, attr = selector[:-1], selector[-1]
@@ -150,9 +164,13 @@ class VariablePool(BaseModel):
             return
         if len(selector) == 1:
             self.variable_dictionary[selector[0]] = {}
+            if self._parent is not None:
+                self._removed_nodes.add(selector[0])
             return
         key, hash_key = self._selector_to_keys(selector)
         self.variable_dictionary[key].pop(hash_key, None)
+        if self._parent is not None:
+            self._removed_keys.add((key, hash_key))
 
     def convert_template(self, template: str, /):
         parts = VARIABLE_PATTERN.split(template)
@@ -182,6 +200,44 @@ class VariablePool(BaseModel):
                 continue
             self.add(selector, value)  # type: ignore
 
+    def create_overlay(self) -> "VariablePool":
+        """
+        Create a copy-on-write child of this variable pool.
+
+        The child references this pool read-only and only stores its own writes and removals, so branches
+        such as parallel iterations get an isolated pool without copying every upstream node output.
+        Variables added to this pool later are visible to the child unless the child has overridden them.
+
+        Returns:
+            VariablePool: The overlay pool.
+        """
+        overlay = self.model_copy(update={"variable_dictionary": defaultdict(dict)})
+        overlay._parent = self
+        overlay._removed_nodes = set()
+        overlay._removed_keys = set()
+        return overlay
+
+    def _merged_variable_dictionary(self) -> defaultdict[str, dict[int, VariableUnion]]:
+        if self._parent is None:
+            return self.variable_dictionary
+        merged: defaultdict[str, dict[int, VariableUnion]] = defaultdict(dict)
+        for key, variables in self._parent._merged_variable_dictionary().items():
+            if key in self._removed_nodes:
+                continue
+            merged[key] = {
+                hash_key: variable
+                for hash_key, variable in variables.items()
+                if (key, hash_key) not in self._removed_keys
+            }
+        for key, variables in self.variable_dictionary.items():
+            merged[key].update(variables)
+        return merged
+
+    @field_serializer("variable_dictionary", mode="wrap")
+    def _serialize_variable_dictionary(self, value: Any, handler: SerializerFunctionWrapHandler) -> Any:
+        # an overlay serializes as the flattened pool, so it loads back without its parent
+        return handler(self._merged_variable_dictionary())
+
     @classmethod
     def empty(cls) -> "VariablePool":
         """Create an empty variable pool."""
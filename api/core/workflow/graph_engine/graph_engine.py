@@ -3,9 +3,9 @@ import logging
 import queue
 import time
 import uuid
-from collections.abc import Generator, Mapping
-from concurrent.futures import ThreadPoolExecutor, wait
-from copy import copy, deepcopy
+from collections.abc import Generator, Iterable, Mapping
+from concurrent.futures import Future, wait
+from copy import copy
 from datetime import UTC, datetime
 from typing import Any, Optional, cast
 
@@ -42,6 +42,7 @@ from core.workflow.graph_engine.entities.graph import Graph, GraphEdge
 from core.workflow.graph_engine.entities.graph_init_params import GraphInitParams
 from core.workflow.graph_engine.entities.graph_runtime_state import GraphRuntimeState
 from core.workflow.graph_engine.entities.runtime_route_state import RouteNodeState
+from core.workflow.graph_engine.workflow_thread_pool import WorkflowTaskQueue, WorkflowThreadPool
 from core.workflow.nodes import NodeType
 from core.workflow.nodes.agent.agent_node import AgentNode
 from core.workflow.nodes.agent.entities import AgentNodeData
@@ -59,24 +60,39 @@ from models.workflow import WorkflowType
 logger = logging.getLogger(__name__)
 
 
-class GraphEngineThreadPool(ThreadPoolExecutor):
+class GraphEngineThreadPool:
+    """
+    Task queue of one workflow run or parallel iteration on the process-wide WorkflowThreadPool.
+
+    At most `max_workers` of its tasks run at once.
+    """
+
     def __init__(
         self,
-        max_workers=None,
-        thread_name_prefix="",
-        initializer=None,
-        initargs=(),
-        max_submit_count=dify_config.MAX_SUBMIT_COUNT,
+        max_workers: Optional[int] = None,
+        max_submit_count: int = dify_config.MAX_SUBMIT_COUNT,
     ) -> None:
-        super().__init__(max_workers, thread_name_prefix, initializer, initargs)
+        self.queue = WorkflowTaskQueue(max_active=max_workers or dify_config.WORKFLOW_RUN_MAX_PARALLELISM)
         self.max_submit_count = max_submit_count
         self.submit_count = 0
 
-    def submit(self, fn, /, *args, **kwargs):
+    def submit(self, fn, /, *args, **kwargs) -> Future:
         self.submit_count += 1
         self.check_is_full()
 
-        return super().submit(fn, *args, **kwargs)
+        return WorkflowThreadPool.get_instance().submit(self.queue, fn, *args, **kwargs)
+
+    def run_queued(self, futures: Iterable[Future]) -> bool:
+        """
+        Run one of the given tasks not started yet in the calling thread if it is a worker, see WorkflowThreadPool.
+        """
+        return WorkflowThreadPool.get_instance().run_queued(futures)
+
+    def wait(self, futures: Iterable[Future]) -> None:
+        futures = list(futures)
+        while self.run_queued(futures):
+            pass
+        wait(futures)
 
     def task_done_callback(self, future):
         self.submit_count -= 1
@@ -107,7 +123,6 @@ class GraphEngine:
         thread_pool_id: Optional[str] = None,
     ) -> None:
         thread_pool_max_submit_count = dify_config.MAX_SUBMIT_COUNT
-        thread_pool_max_workers = 10
 
         # init thread pool
         if thread_pool_id:
@@ -119,7 +134,7 @@ class GraphEngine:
             self.is_main_thread_pool = False
         else:
             self.thread_pool = GraphEngineThreadPool(
-                max_workers=thread_pool_max_workers, max_submit_count=thread_pool_max_submit_count
+                max_workers=dify_config.WORKFLOW_RUN_MAX_PARALLELISM, max_submit_count=thread_pool_max_submit_count
             )
             self.thread_pool_id = str(uuid.uuid4())
             self.is_main_thread_pool = True
@@ -503,6 +518,9 @@ class GraphEngine:
         succeeded_count = 0
         while True:
             try:
+                # a worker waiting for its branches runs those still queued itself
+                if q.empty() and self.thread_pool.run_queued(futures):
+                    continue
                 event = q.get(timeout=1)
                 if event is None:
                     break
@@ -521,7 +539,7 @@ class GraphEngine:
                 continue
 
         # wait all threads
-        wait(futures)
+        self.thread_pool.wait(futures)
 
         # get final node id
         final_node_id = parallel.end_to_node_id
@@ -878,11 +896,11 @@ class GraphEngine:
     def create_copy(self):
         """
         create a graph engine copy
-        :return: graph engine with a new variable pool and initialized total tokens
+        :return: graph engine with a copy-on-write overlay of the variable pool and initialized total tokens
         """
         new_instance = copy(self)
         new_instance.graph_runtime_state = copy(self.graph_runtime_state)
-        new_instance.graph_runtime_state.variable_pool = deepcopy(self.graph_runtime_state.variable_pool)
+        new_instance.graph_runtime_state.variable_pool = self.graph_runtime_state.variable_pool.create_overlay()
         new_instance.graph_runtime_state.total_tokens = 0
         return new_instance
 
@@ -0,0 +1,186 @@
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from collections.abc import Callable, Iterable
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from opentelemetry.metrics import get_meter
+
+from configs import dify_config
+
+# no-op until a meter provider is configured by ext_otel
+_meter = get_meter("workflow_thread_pool")
+_queue_depth = _meter.create_up_down_counter(
+    "workflow.thread_pool.queue_depth",
+    description="Number of workflow tasks waiting for a thread of the shared workflow thread pool",
+    unit="{task}",
+)
+_active_tasks = _meter.create_up_down_counter(
+    "workflow.thread_pool.active",
+    description="Number of workflow tasks running on the shared workflow thread pool",
+    unit="{task}",
+)
+_queue_wait = _meter.create_histogram(
+    "workflow.thread_pool.queue_wait",
+    description="Time a workflow task waited in its queue before it started running",
+    unit="s",
+)
+
+
+class WorkflowTaskQueue:
+    """
+    Tasks of one workflow run (or one parallel iteration) on the WorkflowThreadPool.
+    """
+
+    def __init__(self, max_active: int):
+        self.max_active = max_active
+        self.active = 0
+        self.tasks: deque[_WorkItem] = deque()
+
+
+@dataclass(eq=False)
+class _WorkItem:
+    queue: WorkflowTaskQueue
+    fn: Callable[..., Any]
+    args: tuple[Any, ...]
+    kwargs: dict[str, Any]
+    future: Future = field(default_factory=Future)
+    enqueued_at: float = field(default_factory=time.perf_counter)
+
+
+class WorkflowThreadPool:
+    """
+    Process-wide, bounded thread pool running the parallel branches and parallel iterations of all workflow runs.
+
+    Each run submits to its own WorkflowTaskQueue. Workers take tasks round-robin across the queues, so a run
+    with a wide fan-out cannot starve the others, and never run more than `max_active` tasks of one queue at
+    once. A worker waiting for tasks it submitted runs the ones no worker has started yet itself
+    (`run_queued`), so nested parallelism cannot deadlock the pool.
+    """
+
+    _instance: Optional["WorkflowThreadPool"] = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, max_workers: int):
+        self._pid = os.getpid()
+        self._max_workers = max_workers
+        self._condition = threading.Condition()
+        self._local = threading.local()
+        # queues with waiting tasks, in the order workers visit them
+        self._queues: OrderedDict[WorkflowTaskQueue, None] = OrderedDict()
+        self._queued_items: dict[Future, _WorkItem] = {}
+        self._threads: list[threading.Thread] = []
+        self._idle = 0
+        self._active = 0
+
+    @classmethod
+    def get_instance(cls) -> "WorkflowThreadPool":
+        instance = cls._instance
+        # threads do not survive a fork, so a pool created before it is unusable in the child
+        if instance is None or instance._pid != os.getpid():
+            with cls._instance_lock:
+                instance = cls._instance
+                if instance is None or instance._pid != os.getpid():
+                    instance = cls(dify_config.WORKFLOW_THREAD_POOL_MAX_WORKERS)
+                    cls._instance = instance
+        return instance
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._queued_items)
+
+    @property
+    def active_count(self) -> int:
+        return self._active
+
+    def submit(self, queue: WorkflowTaskQueue, fn: Callable[..., Any], /, *args: Any, **kwargs: Any) -> Future:
+        item = _WorkItem(queue=queue, fn=fn, args=args, kwargs=kwargs)
+        with self._condition:
+            queue.tasks.append(item)
+            self._queues[queue] = None
+            self._queued_items[item.future] = item
+            if self._idle < len(self._queued_items) and len(self._threads) < self._max_workers:
+                thread = threading.Thread(
+                    target=self._work, name=f"workflow_thread_pool_{len(self._threads)}", daemon=True
+                )
+                self._threads.append(thread)
+                thread.start()
+            self._condition.notify()
+        _queue_depth.add(1)
+        return item.future
+
+    def run_queued(self, futures: Iterable[Future]) -> bool:
+        """
+        Run one of the given tasks that no worker has started yet in the calling thread.
+
+        Only workers of this pool do so, other threads just wait for the workers.
+
+        :param futures: futures returned by `submit`
+        :return: whether a task was run
+        """
+        if not getattr(self._local, "is_worker", False):
+            return False
+        with self._condition:
+            item = next((self._queued_items[f] for f in futures if f in self._queued_items), None)
+            if item is None:
+                return False
+            item.queue.tasks.remove(item)
+            self._take(item)
+        self._run(item)
+        return True
+
+    def _take(self, item: _WorkItem) -> None:
+        del self._queued_items[item.future]
+        item.queue.active += 1
+        if not item.queue.tasks:
+            self._queues.pop(item.queue, None)
+
+    def _next_item(self) -> Optional[_WorkItem]:
+        queue = next((q for q in self._queues if q.active < q.max_active), None)
+        if queue is None:
+            return None
+        item = queue.tasks.popleft()
+        self._take(item)
+        if queue.tasks:
+            self._queues.move_to_end(queue)
+        return item
+
+    def _work(self) -> None:
+        self._local.is_worker = True
+        while True:
+            with self._condition:
+                item = self._next_item()
+                while item is None:
+                    self._idle += 1
+                    self._condition.wait()
+                    self._idle -= 1
+                    item = self._next_item()
+            self._run(item)
+
+    def _run(self, item: _WorkItem) -> None:
+        _queue_wait.record(time.perf_counter() - item.enqueued_at)
+        _queue_depth.add(-1)
+        try:
+            if not item.future.set_running_or_notify_cancel():
+                return
+            with self._condition:
+                self._active += 1
+            _active_tasks.add(1)
+            try:
+                result = item.fn(*item.args, **item.kwargs)
+            except BaseException as e:
+                item.future.set_exception(e)
+            else:
+                item.future.set_result(result)
+            finally:
+                with self._condition:
+                    self._active -= 1
+                _active_tasks.add(-1)
+        finally:
+            with self._condition:
+                item.queue.active -= 1
+                # the queue may have been at its quota
+                self._condition.notify()
@@ -3,7 +3,7 @@ import logging
 import time
 import uuid
 from collections.abc import Generator, Mapping, Sequence
-from concurrent.futures import Future, wait
+from concurrent.futures import Future
 from datetime import UTC, datetime
 from queue import Empty, Queue
 from typing import TYPE_CHECKING, Any, Optional, cast
@@ -231,6 +231,9 @@ class IterationNode(BaseNode):
                 succeeded_count = 0
                 while True:
                     try:
+                        # a worker waiting for its iterations runs those still queued itself
+                        if q.empty() and thread_pool.run_queued(futures):
+                            continue
                         event = q.get(timeout=1)
                         if event is None:
                             break
@@ -252,7 +255,7 @@ class IterationNode(BaseNode):
                         continue
 
                 # wait all threads
-                wait(futures)
+                thread_pool.wait(futures)
             else:
                 for _ in range(len(iterator_list_value)):
                     yield from self._run_single_iter(
@@ -97,6 +97,7 @@ class WorkflowCycleManager:
             total_steps=total_steps,
         )
 
+        self._flush_node_executions()
         self._add_trace_task_if_needed(trace_manager, workflow_execution, conversation_id, external_trace_id)
 
         self._workflow_execution_repository.save(workflow_execution)
@@ -125,6 +126,7 @@ class WorkflowCycleManager:
             exceptions_count=exceptions_count,
         )
 
+        self._flush_node_executions()
         self._add_trace_task_if_needed(trace_manager, execution, conversation_id, external_trace_id)
 
         self._workflow_execution_repository.save(execution)
@@ -157,6 +159,7 @@ class WorkflowCycleManager:
         )
 
         self._fail_running_node_executions(workflow_execution.id_, error_message, now)
+        self._flush_node_executions()
         self._add_trace_task_if_needed(trace_manager, workflow_execution, conversation_id, external_trace_id)
 
         self._workflow_execution_repository.save(workflow_execution)
@@ -281,6 +284,12 @@ class WorkflowCycleManager:
             self._node_execution_cache[execution.node_execution_id] = execution
         return execution
 
+    def _flush_node_executions(self) -> None:
+        """Write node executions buffered by the repository before the run is reported finished."""
+        flush = getattr(self._workflow_node_execution_repository, "flush", None)
+        if callable(flush):
+            flush()
+
     def _get_node_execution_from_cache(self, node_execution_id: str) -> WorkflowNodeExecution:
         """Get node execution from cache or raise error if not found."""
         domain_execution = self._node_execution_cache.get(node_execution_id)
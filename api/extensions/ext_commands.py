@@ -3,6 +3,7 @@ from dify_app import DifyApp
 
 def init_app(app: DifyApp):
     from commands import (
+        add_oceanbase_metadata_index,
         add_qdrant_index,
         clear_free_plan_tenant_expired_logs,
         clear_orphaned_file_records,
@@ -30,6 +31,7 @@ def init_app(app: DifyApp):
         vdb_migrate,
         convert_to_agent_apps,
         add_qdrant_index,
+        add_oceanbase_metadata_index,
         create_tenant,
         upgrade_db,
         fix_app_site_missing,
@@ -1,16 +1,37 @@
 import logging
+import random
 import threading
 import time
+import uuid
 from datetime import datetime, timedelta
-from typing import Optional, Mapping
+from typing import Any, Optional, Mapping
 
-from sqlalchemy import func, or_
+from cachetools import TLRUCache
+from opentelemetry.metrics import get_meter
+from sqlalchemy import Connection, Engine, bindparam, func
 
 from models.engine import db
 from models.base import Base
 
 logger = logging.getLogger(__name__)
 
+# lock retry jitter, SystemRandom keeps workers forked from one parent from sharing a sequence
+_jitter = random.SystemRandom()
+
+# no-op until a meter provider is configured by ext_otel
+_meter = get_meter("mysql_cache")
+_sweep_rows_purged = _meter.create_counter(
+    "mysql_cache.sweep.rows_purged",
+    description="Number of expired rows deleted by the MySQL cache expiry sweeper, by table",
+    unit="{row}",
+)
+_sweep_batch_duration = _meter.create_histogram(
+    "mysql_cache.sweep.batch.duration",
+    description="Duration of one batched DELETE of the MySQL cache expiry sweeper, by table",
+    unit="s",
+)
+
+
 class Cache(Base):
     __tablename__ = "caches"
     __table_args__ = (
@@ -26,15 +47,208 @@ class Cache(Base):
     created_at = db.Column(db.DateTime, nullable=False, server_default=func.current_timestamp())
 
 
+class CacheInvalidation(Base):
+    """Append-only log of written cache keys, polled by every process to evict stale local entries"""
+
+    __tablename__ = "cache_invalidations"
+    __table_args__ = (
+        db.PrimaryKeyConstraint("id", name="cache_invalidations_pkey"),
+        db.Index("cache_invalidations_created_at_idx", "created_at"),
+    )
+
+    id = db.Column(db.BigInteger, primary_key=True, autoincrement=True)
+    cache_key = db.Column(db.String(255), nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, server_default=func.current_timestamp())
+
+
+class CacheSortedSet(Base):
+    """One row per sorted-set member, so ZADD / ZREMRANGEBYSCORE / ZCOUNT are indexed statements"""
+
+    __tablename__ = "cache_sorted_sets"
+    __table_args__ = (
+        db.PrimaryKeyConstraint("id", name="cache_sorted_sets_pkey"),
+        db.UniqueConstraint("cache_key", "member", name="cache_sorted_sets_key_member_idx"),
+        db.Index("cache_sorted_sets_key_score_idx", "cache_key", "score"),
+        db.Index("cache_sorted_sets_expire_time_idx", "expire_time"),
+    )
+
+    id = db.Column(db.BigInteger, primary_key=True, autoincrement=True)
+    cache_key = db.Column(db.String(255), nullable=False)
+    member = db.Column(db.String(255), nullable=False)
+    score = db.Column(db.Float(precision=53), nullable=False)
+    expire_time = db.Column(db.DateTime, nullable=True)
+
+
+class CacheHash(Base):
+    """One row per hash field, so HSET / HDEL / HLEN touch single indexed rows instead of a whole blob"""
+
+    __tablename__ = "cache_hashes"
+    __table_args__ = (
+        db.PrimaryKeyConstraint("id", name="cache_hashes_pkey"),
+        db.UniqueConstraint("cache_key", "field", name="cache_hashes_key_field_idx"),
+        db.Index("cache_hashes_expire_time_idx", "expire_time"),
+    )
+
+    id = db.Column(db.BigInteger, primary_key=True, autoincrement=True)
+    cache_key = db.Column(db.String(255), nullable=False)
+    field = db.Column(db.String(255), nullable=False)
+    value = db.Column(db.LargeBinary, nullable=False)
+    expire_time = db.Column(db.DateTime, nullable=True)
+
+
+_MISSING = object()
+
+
+def _encode_value(value) -> bytes:
+    return value if isinstance(value, bytes) else str(value).encode('utf-8')
+
+
+def _encode_member(member) -> str:
+    return member.decode('utf-8') if isinstance(member, bytes) else str(member)
+
+
+def _score_range_condition(min: int | float | str, max: int | float | str) -> tuple[str, dict[str, Any]]:
+    """
+    Translate a redis score range into an SQL condition on `score`.
+
+    Supports `-inf` / `+inf` and the `(` prefix for exclusive bounds, like ZRANGEBYSCORE.
+    """
+    conditions = []
+    params: dict[str, Any] = {}
+    for bound, operator, param in ((min, '>', 'min_score'), (max, '<', 'max_score')):
+        if isinstance(bound, bytes):
+            bound = bound.decode('utf-8')
+        exclusive = False
+        if isinstance(bound, str) and bound.startswith('('):
+            exclusive = True
+            bound = bound[1:]
+        value = float(bound)
+        if value in (float('inf'), float('-inf')):
+            if (value > 0) == (operator == '>'):
+                # lower bound of +inf / upper bound of -inf matches nothing
+                conditions.append('1 = 0')
+            continue
+        conditions.append(f"score {operator}{'' if exclusive else '='} :{param}")
+        params[param] = value
+    return ' AND '.join(conditions) or '1 = 1', params
+
+
+def _expire_time_from(ex: None | int | timedelta) -> Optional[datetime]:
+    if not ex:
+        return None
+    return datetime.now() + (ex if isinstance(ex, timedelta) else timedelta(seconds=ex))
+
+
+class MysqlLocalCache:
+    """
+    Bounded, thread-safe in-process LRU layer in front of the `caches` table.
+
+    Every entry lives until the earliest of its own `expire_time` and `ttl` seconds after it was
+    loaded, so a key is never served locally past its MySQL expiry and stale entries written by
+    other processes are bounded even if an invalidation is missed. Misses are cached as well
+    (as `None`), which is what makes hot existence checks free.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._cache: TLRUCache = TLRUCache(
+            maxsize=maxsize,
+            ttu=lambda _key, entry, _now: entry[1],
+            timer=time.monotonic,
+        )
+
+    def get(self, name: str) -> Any:
+        """Return the cached value (possibly `None`), or `_MISSING` if the key is not held locally"""
+        with self._lock:
+            entry = self._cache.get(name)
+        return _MISSING if entry is None else entry[0]
+
+    def put(self, name: str, value: Optional[bytes], expire_time: Optional[datetime] = None) -> None:
+        ttl = self._ttl
+        if expire_time is not None:
+            ttl = min(ttl, (expire_time - datetime.now()).total_seconds())
+            if ttl <= 0:
+                self.evict(name)
+                return
+        with self._lock:
+            self._cache[name] = (value, time.monotonic() + ttl)
+
+    def evict(self, *names: str) -> None:
+        with self._lock:
+            for name in names:
+                self._cache.pop(name, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._cache.expire()
+            return len(self._cache)
+
+
 class MysqlRedisClient:
-    def __init__(self, meta_db=None):
+    """
+    Redis-compatible cache backed by MySQL tables, used when CACHE_SCHEME is mysql.
+
+    All statements run as SQLAlchemy Core on a dedicated engine, each on its own short pooled
+    connection, so cache traffic never flushes, commits or rolls back the request-scoped
+    `db.session` and can be sized independently of the ORM pool.
+    """
+
+    # invalidation rows older than this are pruned by the cleanup thread
+    INVALIDATION_RETENTION = timedelta(hours=1)
+    # more pending invalidations than this in one poll and the whole local layer is dropped instead
+    INVALIDATION_POLL_BATCH = 1000
+    # maximum number of rows / keys sent in one multi-row statement, keeps packets well below max_allowed_packet
+    BULK_CHUNK_SIZE = 500
+    # lease held by the single process that sweeps expired rows for the whole cluster
+    SWEEPER_LOCK_NAME = "mysql_cache_sweeper"
+    # (table, expiry column) pairs purged by the sweeper
+    SWEPT_TABLES = (
+        ("caches", "expire_time"),
+        ("cache_sorted_sets", "expire_time"),
+        ("cache_hashes", "expire_time"),
+    )
+
+    def __init__(
+        self,
+        meta_db=None,
+        engine: Optional[Engine] = None,
+        local_cache_max_size: int = 0,
+        local_cache_ttl: float = 5.0,
+        invalidation_poll_interval: float = 1.0,
+        sweep_interval: float = 300,
+        sweep_batch_size: int = 1000,
+        sweep_batch_pause: float = 0.1,
+    ):
         self.db = meta_db or db
+        # dedicated cache engine, the metadata database engine is used when none is given
+        self._engine = engine
         self._app = None  # Store Flask app reference
 
+        # optional L1 layer, disabled when local_cache_max_size is 0
+        self._local_cache = MysqlLocalCache(local_cache_max_size, local_cache_ttl) if local_cache_max_size else None
+        self._invalidation_poll_interval = invalidation_poll_interval
+        self._invalidation_lock = threading.Lock()
+        self._last_invalidation_id: Optional[int] = None
+        self._next_invalidation_poll = 0.0
+
+        self._sweep_interval = sweep_interval
+        self._sweep_batch_size = sweep_batch_size
+        self._sweep_batch_pause = sweep_batch_pause
+
         self._cleanup_thread = None
         self._stop_cleanup = False
+        self._stop_cleanup_event = threading.Event()
         # 不在初始化时启动清理线程，等待set_app()调用后再启动
 
+    @property
+    def engine(self) -> Engine:
+        return self._engine if self._engine is not None else self.db.engine
+
     def set_app(self, app):
         """Set Flask app reference for cleanup thread"""
         self._app = app
@@ -49,6 +263,7 @@ class MysqlRedisClient:
         """Start background thread for cleaning expired cache entries"""
         if not self.cleanup_thread_is_alive():
             self._stop_cleanup = False
+            self._stop_cleanup_event.clear()
             self._cleanup_thread = threading.Thread(
                 target=self._cleanup_expired_cache,
                 daemon=True,
@@ -58,35 +273,62 @@ class MysqlRedisClient:
             logger.info("Started background cache cleanup thread")
 
     def _cleanup_expired_cache(self):
-        """Background thread function to clean expired cache entries every 5 minutes"""
+        """
+        Background thread function that sweeps expired cache entries every sweep interval.
+
+        Every process runs this thread, but only the one holding the sweeper lease sweeps.
+        The lease outlives the sweep by design, so the processes take turns and
+        the tables are swept once per interval cluster-wide instead of once per process.
+        """
 
         while not self._stop_cleanup and self.db:
             try:
                 # Use Flask app context if available
                 if self._app:
                     with self._app.app_context():
-                        self.cleanup_expired()
+                        self._sweep_if_leader()
                 else:
                     # Fallback without app context
-                    self.cleanup_expired()
+                    self._sweep_if_leader()
             except Exception as e:
                 logger.warning(f"Error during background cache cleanup: {e}")
 
-            time.sleep(300)
+            self._stop_cleanup_event.wait(self._sweep_interval)
 
         logger.info("Cache cleanup thread stopped")
 
-    def cleanup_expired(self) -> int:
-        """Manually clean expired cache entries and return the number of deleted records"""
+    def _sweep_if_leader(self) -> int:
+        lease = MysqlLock(self.engine, self.SWEEPER_LOCK_NAME, timeout=self._sweep_interval)
+        if not lease.acquire(blocking=False):
+            return 0
+        return self.cleanup_expired(lease=lease)
+
+    def cleanup_expired(self, lease: Optional['MysqlLock'] = None) -> int:
+        """
+        Manually clean expired cache entries and return the number of deleted records.
+
+        Rows are deleted in bounded batches with a pause in between, so a large backlog never
+        holds long locks on the cache tables. When a sweeper `lease` is given it is renewed after
+        every batch, and the sweep stops early once the lease is lost to another process.
+        """
         if not self.db:
             return 0
 
         try:
-            expired_count = self.db.session.query(Cache).filter(
-                Cache.expire_time.isnot(None),
-                Cache.expire_time < datetime.now()
-            ).delete()
-            self.db.session.commit()
+            now = datetime.now()
+            started = time.perf_counter()
+            expired_count = 0
+            interrupted = False
+            for table, column in self.SWEPT_TABLES:
+                purged, interrupted = self._sweep_table(table, column, now, lease)
+                expired_count += purged
+                if interrupted:
+                    break
+            if not interrupted:
+                self._sweep_table("cache_invalidations", "created_at", now - self.INVALIDATION_RETENTION, lease)
+            logger.info(
+                "MySQL cache sweep purged %d expired rows in %.3fs", expired_count, time.perf_counter() - started
+            )
             return expired_count
         except Exception as e:
             err_str = str(e)
@@ -94,34 +336,184 @@ class MysqlRedisClient:
             if "1146" in err_str and "doesn't exist" in err_str:
                 return 0
             logger.warning(f"Error during manual cache cleanup: {err_str}")
-            try:
-                self.db.session.rollback()
-            except Exception as rollback_error:
-                logger.warning(f"Error during rollback: {rollback_error}")
             return 0
 
+    def _sweep_table(
+        self, table: str, column: str, before: datetime, lease: Optional['MysqlLock']
+    ) -> tuple[int, bool]:
+        """
+        Delete rows of `table` whose `column` is older than `before`, one `LIMIT` batch per transaction.
+
+        Returns the number of deleted rows and whether the sweep was interrupted by a lost lease or a stop.
+        """
+        sql = db.text(
+            f"DELETE FROM {table} WHERE {column} IS NOT NULL AND {column} < :before ORDER BY {column} LIMIT :limit"
+        )
+        purged = 0
+        while True:
+            started = time.perf_counter()
+            with self.engine.begin() as conn:
+                deleted = conn.execute(sql, {'before': before, 'limit': self._sweep_batch_size}).rowcount
+            _sweep_batch_duration.record(time.perf_counter() - started, {'table': table})
+            _sweep_rows_purged.add(deleted, {'table': table})
+            purged += deleted
+            if deleted < self._sweep_batch_size:
+                return purged, False
+            if lease is not None and not lease.extend(self._sweep_interval, replace_ttl=True):
+                logger.info("MySQL cache sweeper lost its lease, stopping the sweep at %s", table)
+                return purged, True
+            if self._stop_cleanup_event.wait(self._sweep_batch_pause):
+                return purged, True
+
     def stop_cleanup(self, sync: bool = True):
         """Stop the background cleanup thread"""
         self._stop_cleanup = True
+        self._stop_cleanup_event.set()
         if self._cleanup_thread and self._cleanup_thread.is_alive():
             if sync:
                 self._cleanup_thread.join(timeout=5)
             logger.info("Cache cleanup thread stopped")
 
-    def pipeline(self) -> 'MysqlRedisClient':
-        return self
+    def _invalidate(self, conn: Connection, *names: str) -> None:
+        """
+        Evict keys from the local layer and queue an invalidation row for the other processes.
+
+        Must run in the transaction that writes the keys, so that the invalidation becomes
+        visible atomically with the write. The row is written even if this process has no local
+        layer, as other processes may have one.
+        """
+        if not names:
+            return
+        if self._local_cache is not None:
+            self._local_cache.evict(*names)
+        conn.execute(
+            db.text("INSERT INTO cache_invalidations (cache_key) VALUES (:cache_key)"),
+            [{'cache_key': name} for name in names]
+        )
+
+    def _poll_invalidations(self) -> None:
+        """Evict keys written by other processes since the last poll, at most once per poll interval"""
+        if self._local_cache is None or time.monotonic() < self._next_invalidation_poll:
+            return
+        # only one thread polls, the others keep serving from the local layer meanwhile
+        if not self._invalidation_lock.acquire(blocking=False):
+            return
+        try:
+            self._next_invalidation_poll = time.monotonic() + self._invalidation_poll_interval
+            with self.engine.connect() as conn:
+                if self._last_invalidation_id is None:
+                    last_id = conn.execute(db.text("SELECT MAX(id) FROM cache_invalidations")).scalar()
+                    self._local_cache.clear()
+                    self._last_invalidation_id = last_id or 0
+                    return
+
+                rows = conn.execute(
+                    db.text(
+                        "SELECT id, cache_key FROM cache_invalidations WHERE id > :last_id ORDER BY id LIMIT :limit"
+                    ),
+                    {'last_id': self._last_invalidation_id, 'limit': self.INVALIDATION_POLL_BATCH}
+                ).all()
+            if not rows:
+                return
+            if len(rows) >= self.INVALIDATION_POLL_BATCH:
+                # too far behind, dropping everything is cheaper than catching up
+                self._local_cache.clear()
+                self._last_invalidation_id = None
+                return
+            self._local_cache.evict(*{row.cache_key for row in rows})
+            self._last_invalidation_id = rows[-1].id
+        except Exception as e:
+            logger.warning("MySQLRedisClient._poll_invalidations got exception: " + str(e))
+            # can no longer tell what is stale, start over from a clean local layer
+            self._local_cache.clear()
+            self._last_invalidation_id = None
+        finally:
+            self._invalidation_lock.release()
+
+    def _bulk_upsert(self, conn: Connection, rows: list[tuple[str, bytes, Optional[datetime]]]) -> None:
+        """Write `(name, value, expire_time)` rows with multi-row upserts, later rows win"""
+        for start in range(0, len(rows), self.BULK_CHUNK_SIZE):
+            chunk = rows[start:start + self.BULK_CHUNK_SIZE]
+            params: dict[str, Any] = {}
+            placeholders = []
+            for i, (name, value, expire_time) in enumerate(chunk):
+                placeholders.append(f"(:cache_key_{i}, :cache_value_{i}, :expire_time_{i})")
+                params[f'cache_key_{i}'] = name
+                params[f'cache_value_{i}'] = value
+                params[f'expire_time_{i}'] = expire_time
+            sql = f"""
+            INSERT INTO caches (cache_key, cache_value, expire_time)
+            VALUES {", ".join(placeholders)}
+            ON DUPLICATE KEY UPDATE
+            cache_value = VALUES(cache_value),
+            expire_time = VALUES(expire_time)
+            """
+            conn.execute(db.text(sql), params)
+
+    def _bulk_select(self, conn: Connection, names) -> dict[str, tuple[bytes, Optional[datetime]]]:
+        """Load the live `(value, expire_time)` of every existing key in `names` with `IN` queries"""
+        sql = db.text(
+            "SELECT cache_key, cache_value, expire_time FROM caches "
+            "WHERE cache_key IN :names AND (expire_time IS NULL OR expire_time > :now)"
+        ).bindparams(bindparam('names', expanding=True))
+        names = list(dict.fromkeys(names))
+        found = {}
+        for start in range(0, len(names), self.BULK_CHUNK_SIZE):
+            rows = conn.execute(sql, {'names': names[start:start + self.BULK_CHUNK_SIZE], 'now': datetime.now()})
+            for row in rows:
+                found[row.cache_key] = (row.cache_value, row.expire_time)
+        return found
+
+    def _bulk_delete(self, conn: Connection, names) -> int:
+        """
+        Delete every key in `names` with `IN` statements and return the number of removed string keys.
+
+        Sorted sets and hashes under the same names are removed too.
+        """
+        sql = db.text("DELETE FROM caches WHERE cache_key IN :names").bindparams(bindparam('names', expanding=True))
+        sorted_set_sql = db.text(
+            "DELETE FROM cache_sorted_sets WHERE cache_key IN :names"
+        ).bindparams(bindparam('names', expanding=True))
+        hash_sql = db.text(
+            "DELETE FROM cache_hashes WHERE cache_key IN :names"
+        ).bindparams(bindparam('names', expanding=True))
+        names = list(dict.fromkeys(names))
+        deleted = 0
+        for start in range(0, len(names), self.BULK_CHUNK_SIZE):
+            chunk = names[start:start + self.BULK_CHUNK_SIZE]
+            deleted += conn.execute(sql, {'names': chunk}).rowcount
+            conn.execute(sorted_set_sql, {'names': chunk})
+            conn.execute(hash_sql, {'names': chunk})
+        return deleted
+
+    def pipeline(self, transaction: bool = True, shard_hint=None) -> 'MysqlPipeline':
+        return MysqlPipeline(self)
 
     def get(self, name: str) -> Optional[bytes]:
         if not self.db:
             return None
+
+        if self._local_cache is not None:
+            self._poll_invalidations()
+            value: Optional[bytes] = self._local_cache.get(name)
+            if value is not _MISSING:
+                return value
+
         try:
-            cache_item = self.db.session.query(Cache).filter(
-                Cache.cache_key == name,
-                or_(
-                    Cache.expire_time.is_(None),
-                    Cache.expire_time > datetime.now()
-                )
-            ).first()
+            with self.engine.connect() as conn:
+                cache_item = conn.execute(
+                    db.text(
+                        "SELECT cache_value, expire_time FROM caches "
+                        "WHERE cache_key = :cache_key AND (expire_time IS NULL OR expire_time > :now)"
+                    ),
+                    {'cache_key': name, 'now': datetime.now()}
+                ).first()
+
+            if self._local_cache is not None:
+                if cache_item:
+                    self._local_cache.put(name, cache_item.cache_value, cache_item.expire_time)
+                else:
+                    self._local_cache.put(name, None)
 
             return cache_item.cache_value if cache_item else None
         except Exception as e:
@@ -149,18 +541,20 @@ class MysqlRedisClient:
             cache_value = VALUES(cache_value), 
             expire_time = VALUES(expire_time)
             """
-            self.db.session.execute(
-                db.text(sql),
-                {
-                    'cache_key': name,
-                    'cache_value': value,
-                    'expire_time': expire_time
-                }
-            )
-            self.db.session.commit()
+            with self.engine.begin() as conn:
+                conn.execute(
+                    db.text(sql),
+                    {
+                        'cache_key': name,
+                        'cache_value': value,
+                        'expire_time': expire_time
+                    }
+                )
+                self._invalidate(conn, name)
+            if self._local_cache is not None:
+                self._local_cache.put(name, value, expire_time)
         except Exception as e:
             logger.warning("MySQLRedisClient.set " + str(name) + " got exception: " + str(e))
-            self.db.session.rollback()
 
     def setex(self, name: str, time: int | timedelta, value) -> None:
         if not self.db:
@@ -181,18 +575,68 @@ class MysqlRedisClient:
             cache_value = VALUES(cache_value), 
             expire_time = VALUES(expire_time)
             """
-            self.db.session.execute(
-                db.text(sql),
-                {
-                    'cache_key': name,
-                    'cache_value': value,
-                    'expire_time': expire_time
-                }
-            )
-            self.db.session.commit()
+            with self.engine.begin() as conn:
+                conn.execute(
+                    db.text(sql),
+                    {
+                        'cache_key': name,
+                        'cache_value': value,
+                        'expire_time': expire_time
+                    }
+                )
+                self._invalidate(conn, name)
+            if self._local_cache is not None:
+                self._local_cache.put(name, value, expire_time)
         except Exception as e:
             logger.warning("MySQLRedisClient.setex " + str(name) + " got exception: " + str(e))
-            self.db.session.rollback()
+
+    def mget(self, keys, *args) -> list[Optional[bytes]]:
+        names = [keys] if isinstance(keys, str) else list(keys)
+        names.extend(args)
+        if not self.db or not names:
+            return [None] * len(names)
+
+        values: dict[str, Optional[bytes]] = {}
+        if self._local_cache is not None:
+            self._poll_invalidations()
+            for name in names:
+                value = self._local_cache.get(name)
+                if value is not _MISSING:
+                    values[name] = value
+
+        try:
+            misses = [name for name in names if name not in values]
+            if misses:
+                with self.engine.connect() as conn:
+                    found = self._bulk_select(conn, misses)
+                for name in misses:
+                    value, expire_time = found.get(name, (None, None))
+                    values[name] = value
+                    if self._local_cache is not None:
+                        self._local_cache.put(name, value, expire_time)
+            return [values[name] for name in names]
+        except Exception as e:
+            logger.warning("MySQLRedisClient.mget " + str(names) + " got exception: " + str(e))
+            return [None] * len(names)
+
+    def mset(self, mapping: Mapping) -> bool:
+        if not self.db or not mapping:
+            return False
+
+        rows: list[tuple[str, bytes, Optional[datetime]]] = [
+            (name, _encode_value(value), None) for name, value in mapping.items()
+        ]
+        try:
+            with self.engine.begin() as conn:
+                self._bulk_upsert(conn, rows)
+                self._invalidate(conn, *mapping.keys())
+            if self._local_cache is not None:
+                for name, value, _ in rows:
+                    self._local_cache.put(name, value)
+            return True
+        except Exception as e:
+            logger.warning("MySQLRedisClient.mset " + str(list(mapping.keys())) + " got exception: " + str(e))
+            return False
 
     def setnx(self, name: str, value) -> None:
         if not self.db:
@@ -207,61 +651,75 @@ class MysqlRedisClient:
             INSERT IGNORE INTO caches (cache_key, cache_value, expire_time) 
             VALUES (:cache_key, :cache_value, :expire_time)
             """
-            self.db.session.execute(
-                db.text(sql),
-                {
-                    'cache_key': name,
-                    'cache_value': value,
-                    'expire_time': None
-                }
-            )
-            self.db.session.commit()
+            with self.engine.begin() as conn:
+                conn.execute(
+                    db.text(sql),
+                    {
+                        'cache_key': name,
+                        'cache_value': value,
+                        'expire_time': None
+                    }
+                )
+                self._invalidate(conn, name)
         except Exception as e:
             logger.warning("MySQLRedisClient.setnx " + str(name) + " got exception: " + str(e))
-            self.db.session.rollback()
 
     def delete(self, *names: str) -> None:
         if not self.db or not names:
             return
 
         try:
-            self.db.session.query(Cache).filter(Cache.cache_key.in_(names)).delete(synchronize_session=False)
-            self.db.session.commit()
+            with self.engine.begin() as conn:
+                self._bulk_delete(conn, names)
+                self._invalidate(conn, *names)
+            if self._local_cache is not None:
+                for name in names:
+                    self._local_cache.put(name, None)
         except Exception as e:
             logger.warning("MySQLRedisClient.delete " + str(names) + " got exception: " + str(e))
-            self.db.session.rollback()
 
     def incr(self, name: str, amount: int = 1) -> bytes:
         if not self.db:
             return b'0'
 
         try:
-            # 使用事务确保原子性，避免并发问题
-            with self.db.session.begin():
-                # 1. 获取当前值（在事务中）
-                current_item = self.db.session.query(Cache).filter(Cache.cache_key == name).first()
-                current_value = 0
-                if current_item:
-                    try:
-                        current_value = int(current_item.cache_value.decode('utf-8'))
-                    except (ValueError, UnicodeDecodeError):
-                        current_value = 0
-                
-                new_value = current_value + amount
-                
-                # 2. 原子更新（在同一个事务中）
-                if current_item:
-                    current_item.cache_value = str(new_value).encode('utf-8')
+            # 单条语句原子自增：更新分支通过 LAST_INSERT_ID(expr) 把新值带回客户端，无需先读后写
+            # 已过期的计数器按不存在处理，从 0 开始累加
+            sql = """
+            INSERT INTO caches (cache_key, cache_value, expire_time)
+            VALUES (:cache_key, :cache_value, NULL)
+            ON DUPLICATE KEY UPDATE
+            cache_value = LAST_INSERT_ID(
+                IF(expire_time IS NOT NULL AND expire_time <= :now, 0, CAST(cache_value AS SIGNED)) + :amount
+            ),
+            expire_time = IF(expire_time IS NOT NULL AND expire_time <= :now, NULL, expire_time)
+            """
+            with self.engine.begin() as conn:
+                result = conn.execute(
+                    db.text(sql),
+                    {
+                        'cache_key': name,
+                        'cache_value': str(amount).encode('utf-8'),
+                        'amount': amount,
+                        'now': datetime.now()
+                    }
+                )
+                if result.rowcount == 2:
+                    # 更新了已有行，lastrowid 即 LAST_INSERT_ID(expr) 的值（无符号，负数需要还原）
+                    new_value = result.lastrowid
+                    if new_value >= 2**63:
+                        new_value -= 2**64
+                elif amount != 0:
+                    # 插入了新行
+                    new_value = amount
                 else:
-                    cache_item = Cache()
-                    cache_item.cache_key = name
-                    cache_item.cache_value = str(new_value).encode('utf-8')
-                    cache_item.expire_time = None
-                    self.db.session.add(cache_item)
-                
-                # 3. 事务自动提交，返回结果
-                return str(new_value).encode('utf-8')
-                
+                    # incr(name, 0) 命中已有行时值未变化，受影响行数无法区分插入与更新，直接读取
+                    new_value = conn.execute(
+                        db.text("SELECT CAST(cache_value AS SIGNED) FROM caches WHERE cache_key = :cache_key"),
+                        {'cache_key': name}
+                    ).scalar() or 0
+                self._invalidate(conn, name)
+            return str(new_value).encode('utf-8')
         except Exception as e:
             logger.warning("MySQLRedisClient.incr " + str(name) + " got exception: " + str(e))
             return b'0'
@@ -274,261 +732,643 @@ class MysqlRedisClient:
         expire_time = datetime.now() + expire
 
         try:
-            # 使用 UPDATE 语句避免竞态条件
+            with self.engine.begin() as conn:
+                self._expire(conn, name, expire_time)
+                self._invalidate(conn, name)
+        except Exception as e:
+            logger.warning("MySQLRedisClient.expire " + str(name) + " got exception: " + str(e))
+
+    def _expire(self, conn: Connection, name: str, expire_time: Optional[datetime]) -> bool:
+        # 使用 UPDATE 语句避免竞态条件
+        result = conn.execute(
+            db.text("UPDATE caches SET expire_time = :expire_time WHERE cache_key = :cache_key"),
+            {
+                'cache_key': name,
+                'expire_time': expire_time
+            }
+        )
+        # 有序集合的过期时间记录在每个成员行上
+        sorted_set_result = conn.execute(
+            db.text("UPDATE cache_sorted_sets SET expire_time = :expire_time WHERE cache_key = :cache_key"),
+            {
+                'cache_key': name,
+                'expire_time': expire_time
+            }
+        )
+        # 哈希的过期时间同样记录在每个字段行上
+        hash_result = conn.execute(
+            db.text("UPDATE cache_hashes SET expire_time = :expire_time WHERE cache_key = :cache_key"),
+            {
+                'cache_key': name,
+                'expire_time': expire_time
+            }
+        )
+        return result.rowcount > 0 or sorted_set_result.rowcount > 0 or hash_result.rowcount > 0
+
+    def getdel(self, name: str) -> Optional[bytes]:
+        if not self.db:
+            return None
+
+        try:
+            # MySQL 没有 DELETE ... RETURNING，在同一事务内加锁读取后删除，保证只有一个调用方拿到值
+            with self.engine.begin() as conn:
+                cache_item = conn.execute(
+                    db.text(
+                        "SELECT cache_value, expire_time FROM caches WHERE cache_key = :cache_key FOR UPDATE"
+                    ),
+                    {'cache_key': name}
+                ).first()
+                if cache_item is None:
+                    return None
+                conn.execute(db.text("DELETE FROM caches WHERE cache_key = :cache_key"), {'cache_key': name})
+                self._invalidate(conn, name)
+            if self._local_cache is not None:
+                self._local_cache.put(name, None)
+            if cache_item.expire_time is not None and cache_item.expire_time <= datetime.now():
+                return None
+            value: Optional[bytes] = cache_item.cache_value
+            return value
+        except Exception as e:
+            logger.warning("MySQLRedisClient.getdel " + str(name) + " got exception: " + str(e))
+            return None
+
+    def exists(self, *names: str) -> int:
+        if not self.db or not names:
+            return 0
+
+        try:
+            # 字符串、有序集合、哈希共用一个键空间，一条 UNION 语句查出仍然有效的键
+            sql = db.text(
+                """
+                SELECT cache_key FROM caches
+                WHERE cache_key IN :names AND (expire_time IS NULL OR expire_time > :now)
+                UNION
+                SELECT cache_key FROM cache_sorted_sets
+                WHERE cache_key IN :names AND (expire_time IS NULL OR expire_time > :now)
+                UNION
+                SELECT cache_key FROM cache_hashes
+                WHERE cache_key IN :names AND (expire_time IS NULL OR expire_time > :now)
+                """
+            ).bindparams(bindparam('names', expanding=True))
+            with self.engine.connect() as conn:
+                found = set(conn.execute(sql, {'names': list(set(names)), 'now': datetime.now()}).scalars())
+            # redis counts a key given several times once per occurrence
+            return sum(1 for name in names if name in found)
+        except Exception as e:
+            logger.warning("MySQLRedisClient.exists " + str(names) + " got exception: " + str(e))
+            return 0
+
+    def ttl(self, name: str) -> int:
+        """Remaining time to live in seconds, -1 if the key has no expiry and -2 if it does not exist"""
+        if not self.db:
+            return -2
+
+        try:
             sql = """
-            UPDATE caches 
-            SET expire_time = :expire_time 
-            WHERE cache_key = :cache_key
+            (SELECT expire_time FROM caches
+             WHERE cache_key = :cache_key AND (expire_time IS NULL OR expire_time > :now) LIMIT 1)
+            UNION ALL
+            (SELECT expire_time FROM cache_sorted_sets
+             WHERE cache_key = :cache_key AND (expire_time IS NULL OR expire_time > :now) LIMIT 1)
+            UNION ALL
+            (SELECT expire_time FROM cache_hashes
+             WHERE cache_key = :cache_key AND (expire_time IS NULL OR expire_time > :now) LIMIT 1)
             """
-            result = self.db.session.execute(
-                db.text(sql),
-                {
-                    'cache_key': name,
-                    'expire_time': expire_time
-                }
-            )
-            self.db.session.commit()
+            now = datetime.now()
+            with self.engine.connect() as conn:
+                row = conn.execute(db.text(sql), {'cache_key': name, 'now': now}).first()
+            if row is None:
+                return -2
+            expire_time: Optional[datetime] = row.expire_time
+            if expire_time is None:
+                return -1
+            return max(round((expire_time - now).total_seconds()), 0)
         except Exception as e:
-            logger.warning("MySQLRedisClient.expire " + str(name) + " got exception: " + str(e))
-            self.db.session.rollback()
+            logger.warning("MySQLRedisClient.ttl " + str(name) + " got exception: " + str(e))
+            return -2
+
+    def hset(
+        self,
+        name: str,
+        key: Optional[str] = None,
+        value=None,
+        mapping: Optional[Mapping] = None,
+    ) -> int:
+        """Set hash fields and return the number of fields that were added"""
+        if not self.db:
+            return 0
+        if key is None and not mapping:
+            raise ValueError("'hset' with no key value pairs")
 
-    def zadd(self, name: str, mapping: Mapping) -> None:
+        items = dict(mapping or {})
+        if key is not None:
+            items[key] = value
+        try:
+            # 每个字段一行，(cache_key, field) 唯一；已过期的哈希按不存在处理，重新写入时清除过期时间
+            params: dict[str, Any] = {'cache_key': name, 'now': datetime.now()}
+            placeholders = []
+            for i, (field, field_value) in enumerate(items.items()):
+                placeholders.append(f"(:cache_key, :field_{i}, :value_{i})")
+                params[f'field_{i}'] = _encode_member(field)
+                params[f'value_{i}'] = _encode_value(field_value)
+            sql = f"""
+            INSERT INTO cache_hashes (cache_key, field, value)
+            VALUES {", ".join(placeholders)}
+            ON DUPLICATE KEY UPDATE
+            value = VALUES(value),
+            expire_time = IF(expire_time IS NOT NULL AND expire_time <= :now, NULL, expire_time)
+            """
+            with self.engine.begin() as conn:
+                affected = conn.execute(db.text(sql), params).rowcount
+            # 影响行数：新插入计 1，更新已有字段计 2（值未变化的字段也计 1，会被算作新增）
+            return max(len(items) - max(affected - len(items), 0), 0)
+        except Exception as e:
+            logger.warning("MySQLRedisClient.hset " + str(name) + " got exception: " + str(e))
+            return 0
+
+    def hget(self, name: str, key: str) -> Optional[bytes]:
         if not self.db:
-            return
+            return None
 
         try:
-            import json
+            with self.engine.connect() as conn:
+                return conn.execute(
+                    db.text(
+                        "SELECT value FROM cache_hashes WHERE cache_key = :cache_key AND field = :field "
+                        "AND (expire_time IS NULL OR expire_time > :now)"
+                    ),
+                    {'cache_key': name, 'field': _encode_member(key), 'now': datetime.now()}
+                ).scalar()
+        except Exception as e:
+            logger.warning("MySQLRedisClient.hget " + str(name) + " got exception: " + str(e))
+            return None
 
-            # 使用事务确保原子性，避免并发问题
-            with self.db.session.begin():
-                # 1. 在事务中获取现有数据
-                cache_item = self.db.session.query(Cache).filter(Cache.cache_key == name).first()
-                
-                if cache_item:
-                    try:
-                        existing_data = json.loads(cache_item.cache_value.decode('utf-8'))
-                        if not isinstance(existing_data, dict):
-                            existing_data = {}
-                    except (json.JSONDecodeError, UnicodeDecodeError):
-                        existing_data = {}
-                    
-                    existing_data.update(mapping)
-                    cache_item.cache_value = json.dumps(existing_data).encode('utf-8')
-                else:
-                    cache_item = Cache()
-                    cache_item.cache_key = name
-                    cache_item.cache_value = json.dumps(dict(mapping)).encode('utf-8')
-                    cache_item.expire_time = None
-                    self.db.session.add(cache_item)
-                
-                # 2. 事务自动提交
-                
+    def hgetall(self, name: str) -> dict[bytes, bytes]:
+        if not self.db:
+            return {}
+
+        try:
+            with self.engine.connect() as conn:
+                rows = conn.execute(
+                    db.text(
+                        "SELECT field, value FROM cache_hashes WHERE cache_key = :cache_key "
+                        "AND (expire_time IS NULL OR expire_time > :now)"
+                    ),
+                    {'cache_key': name, 'now': datetime.now()}
+                ).all()
+            return {row.field.encode('utf-8'): row.value for row in rows}
+        except Exception as e:
+            logger.warning("MySQLRedisClient.hgetall " + str(name) + " got exception: " + str(e))
+            return {}
+
+    def hlen(self, name: str) -> int:
+        if not self.db:
+            return 0
+
+        try:
+            with self.engine.connect() as conn:
+                return conn.execute(
+                    db.text(
+                        "SELECT COUNT(*) FROM cache_hashes WHERE cache_key = :cache_key "
+                        "AND (expire_time IS NULL OR expire_time > :now)"
+                    ),
+                    {'cache_key': name, 'now': datetime.now()}
+                ).scalar() or 0
+        except Exception as e:
+            logger.warning("MySQLRedisClient.hlen " + str(name) + " got exception: " + str(e))
+            return 0
+
+    def hdel(self, name: str, *keys) -> int:
+        if not self.db or not keys:
+            return 0
+
+        try:
+            sql = db.text(
+                "DELETE FROM cache_hashes WHERE cache_key = :cache_key AND field IN :fields "
+                "AND (expire_time IS NULL OR expire_time > :now)"
+            ).bindparams(bindparam('fields', expanding=True))
+            with self.engine.begin() as conn:
+                return conn.execute(
+                    sql,
+                    {'cache_key': name, 'fields': list({_encode_member(key) for key in keys}), 'now': datetime.now()}
+                ).rowcount
+        except Exception as e:
+            logger.warning("MySQLRedisClient.hdel " + str(name) + " got exception: " + str(e))
+            return 0
+
+    def zadd(self, name: str, mapping: Mapping) -> None:
+        if not self.db or not mapping:
+            return
+
+        try:
+            # 每个成员一行，(cache_key, member) 唯一，重复添加只更新分数；
+            # 过期时间存在每个成员上，新成员继承键当前未过期的过期时间，已过期的成员按新成员处理
+            params: dict[str, Any] = {'cache_key': name, 'now': datetime.now()}
+            placeholders = []
+            for i, (member, score) in enumerate(mapping.items()):
+                placeholders.append(f"(:cache_key, :member_{i}, :score_{i}, :expire_time)")
+                params[f'member_{i}'] = _encode_member(member)
+                params[f'score_{i}'] = float(score)
+            sql = f"""
+            INSERT INTO cache_sorted_sets (cache_key, member, score, expire_time)
+            VALUES {", ".join(placeholders)}
+            ON DUPLICATE KEY UPDATE
+            score = VALUES(score),
+            expire_time = IF(expire_time IS NOT NULL AND expire_time <= :now, VALUES(expire_time), expire_time)
+            """
+            with self.engine.begin() as conn:
+                params['expire_time'] = conn.execute(
+                    db.text(
+                        "SELECT MAX(expire_time) FROM cache_sorted_sets "
+                        "WHERE cache_key = :cache_key AND expire_time > :now"
+                    ),
+                    params
+                ).scalar()
+                conn.execute(db.text(sql), params)
         except Exception as e:
             logger.warning("MySQLRedisClient.zadd " + str(name) + " got exception: " + str(e))
 
-    def zremrangebyscore(self, name: str, min: int | float | str, max: int | float | str):
+    def zremrangebyscore(self, name: str, min: int | float | str, max: int | float | str) -> int:
         if not self.db:
             return 0
 
         try:
-            import json
-
-            # 使用事务确保原子性，避免并发问题
-            with self.db.session.begin():
-                # 1. 在事务中获取现有数据
-                cache_item = self.db.session.query(Cache).filter(Cache.cache_key == name).first()
-                if not cache_item:
-                    return 0
-
-                try:
-                    existing_data = json.loads(cache_item.cache_value.decode('utf-8'))
-                    if not isinstance(existing_data, dict):
-                        return 0
-                except (json.JSONDecodeError, UnicodeDecodeError):
-                    return 0
-
-                min_score = float(min) if min != '-inf' else float('-inf')
-                max_score = float(max) if max != '+inf' else float('inf')
-
-                members_to_remove = []
-                for member, score in existing_data.items():
-                    try:
-                        score_float = float(score)
-                        if min_score <= score_float <= max_score:
-                            members_to_remove.append(member)
-                    except (ValueError, TypeError):
-                        continue
-
-                for member in members_to_remove:
-                    del existing_data[member]
-
-                cache_item.cache_value = json.dumps(existing_data).encode('utf-8')
-                
-                # 2. 事务自动提交，返回结果
-                return len(members_to_remove)
-                
+            condition, params = _score_range_condition(min, max)
+            params['cache_key'] = name
+            with self.engine.begin() as conn:
+                return conn.execute(
+                    db.text(f"DELETE FROM cache_sorted_sets WHERE cache_key = :cache_key AND {condition}"),
+                    params
+                ).rowcount
         except Exception as e:
             logger.warning("MySQLRedisClient.zremrangebyscore " + str(name) + " got exception: " + str(e))
             return 0
 
     def zcard(self, name: str) -> int:
+        return self.zcount(name, '-inf', '+inf')
+
+    def zcount(self, name: str, min: int | float | str, max: int | float | str) -> int:
         if not self.db:
             return 0
 
         try:
-            import json
+            condition, params = _score_range_condition(min, max)
+            params['cache_key'] = name
+            params['now'] = datetime.now()
+            sql = f"""
+            SELECT COUNT(*) FROM cache_sorted_sets
+            WHERE cache_key = :cache_key AND {condition}
+            AND (expire_time IS NULL OR expire_time > :now)
+            """
+            with self.engine.connect() as conn:
+                return conn.execute(db.text(sql), params).scalar() or 0
+        except Exception as e:
+            logger.warning("MySQLRedisClient.zcount " + str(name) + " got exception: " + str(e))
+            return 0
 
-            cache_item = self.db.session.query(Cache).filter(Cache.cache_key == name).first()
-            if not cache_item:
-                return 0
+    def zrangebyscore(
+        self,
+        name: str,
+        min: int | float | str,
+        max: int | float | str,
+        start: Optional[int] = None,
+        num: Optional[int] = None,
+        withscores: bool = False,
+    ) -> list:
+        if not self.db:
+            return []
+        if (start is None) != (num is None):
+            raise ValueError("``start`` and ``num`` must both be specified")
 
-            try:
-                existing_data = json.loads(cache_item.cache_value.decode('utf-8'))
-                if not isinstance(existing_data, dict):
-                    return 0
-                return len(existing_data)
-            except (json.JSONDecodeError, UnicodeDecodeError):
-                return 0
+        try:
+            condition, params = _score_range_condition(min, max)
+            params['cache_key'] = name
+            params['now'] = datetime.now()
+            sql = f"""
+            SELECT member, score FROM cache_sorted_sets
+            WHERE cache_key = :cache_key AND {condition}
+            AND (expire_time IS NULL OR expire_time > :now)
+            ORDER BY score, member
+            """
+            if start is not None:
+                sql += " LIMIT :num OFFSET :start"
+                # redis treats a negative count as "all remaining members"
+                params['num'] = num if num is not None and num >= 0 else 2**63 - 1
+                params['start'] = start
+            with self.engine.connect() as conn:
+                rows = conn.execute(db.text(sql), params).all()
+            if withscores:
+                return [(row.member.encode('utf-8'), row.score) for row in rows]
+            return [row.member.encode('utf-8') for row in rows]
         except Exception as e:
-            logger.warning("MySQLRedisClient.zcard " + str(name) + " got exception: " + str(e))
-            return 0
+            logger.warning("MySQLRedisClient.zrangebyscore " + str(name) + " got exception: " + str(e))
+            return []
+
+    def lock(
+        self,
+        name: str,
+        timeout: Optional[float] = None,
+        sleep: float = 0.05,
+        blocking_timeout: Optional[float] = None,
+    ) -> 'MysqlLock':
+        return MysqlLock(self.engine, name, timeout, sleep=sleep, blocking_timeout=blocking_timeout)
+
+
+class MysqlPipeline:
+    """
+    Buffers commands and flushes them in one transaction on `execute`.
+
+    Consecutive commands of the same kind are merged into a single multi-row statement
+    (`INSERT ... ON DUPLICATE KEY UPDATE`, `SELECT ... IN`, `DELETE ... IN`), so touching N keys
+    costs one round trip per run of commands instead of one transaction per key. Commands keep
+    their order, and `execute` returns one result per queued command like redis-py.
+    """
+
+    _KINDS = {
+        'get': 'select',
+        'mget': 'select',
+        'set': 'upsert',
+        'setex': 'upsert',
+        'mset': 'upsert',
+        'delete': 'delete',
+        'expire': 'expire',
+    }
+
+    def __init__(self, client: MysqlRedisClient):
+        self._client = client
+        self._commands: list[tuple[str, Any]] = []
+
+    def __enter__(self) -> 'MysqlPipeline':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.reset()
+
+    def __len__(self) -> int:
+        return len(self._commands)
+
+    def reset(self) -> None:
+        self._commands = []
 
-    def lock(self, name: str, timeout: Optional[float] = None) -> 'MysqlLock':
-        return MysqlLock(self.db, name, timeout)
+    def get(self, name: str) -> 'MysqlPipeline':
+        self._commands.append(('get', [name]))
+        return self
+
+    def mget(self, keys, *args) -> 'MysqlPipeline':
+        names = [keys] if isinstance(keys, str) else list(keys)
+        names.extend(args)
+        self._commands.append(('mget', names))
+        return self
+
+    def set(self, name: str, value, ex: None | int | timedelta = None) -> 'MysqlPipeline':
+        self._commands.append(('set', [(name, _encode_value(value), _expire_time_from(ex))]))
+        return self
+
+    def setex(self, name: str, time: int | timedelta, value) -> 'MysqlPipeline':
+        self._commands.append(('setex', [(name, _encode_value(value), _expire_time_from(time))]))
+        return self
+
+    def mset(self, mapping: Mapping) -> 'MysqlPipeline':
+        self._commands.append(('mset', [(name, _encode_value(value), None) for name, value in mapping.items()]))
+        return self
+
+    def delete(self, *names: str) -> 'MysqlPipeline':
+        self._commands.append(('delete', list(names)))
+        return self
+
+    def expire(self, name: str, time: int | timedelta) -> 'MysqlPipeline':
+        self._commands.append(('expire', [(name, _expire_time_from(time))]))
+        return self
+
+    @classmethod
+    def _runs(cls, commands: list[tuple[str, Any]]) -> list[tuple[str, list[tuple[str, Any]]]]:
+        """Group consecutive commands of the same kind"""
+        runs: list[tuple[str, list[tuple[str, Any]]]] = []
+        for command in commands:
+            kind = cls._KINDS[command[0]]
+            if runs and runs[-1][0] == kind:
+                runs[-1][1].append(command)
+            else:
+                runs.append((kind, [command]))
+        return runs
+
+    def execute(self, raise_on_error: bool = True) -> list:
+        commands, self._commands = self._commands, []
+        if not commands:
+            return []
+        client = self._client
+        if not client.db:
+            return [None] * len(commands)
+
+        results: list = []
+        # last known state of every key touched, applied to the local layer once committed
+        final: dict[str, Any] = {}
+        written: list[str] = []
+        try:
+            with client.engine.begin() as conn:
+                for kind, run in self._runs(commands):
+                    if kind == 'upsert':
+                        rows = [row for _, args in run for row in args]
+                        client._bulk_upsert(conn, rows)
+                        for name, value, expire_time in rows:
+                            final[name] = (value, expire_time)
+                            written.append(name)
+                        results.extend(True for _ in run)
+                    elif kind == 'select':
+                        found = client._bulk_select(conn, (name for _, names in run for name in names))
+                        for op, names in run:
+                            values = [found.get(name, (None, None))[0] for name in names]
+                            results.append(values[0] if op == 'get' else values)
+                            for name in names:
+                                final[name] = found.get(name, (None, None))
+                    elif kind == 'delete':
+                        names = [name for _, args in run for name in args]
+                        existing = set(client._bulk_select(conn, names)) if len(run) > 1 else None
+                        deleted = client._bulk_delete(conn, names)
+                        if existing is None:
+                            results.append(deleted)
+                        else:
+                            for _, args in run:
+                                results.append(len(existing.intersection(args)))
+                                existing.difference_update(args)
+                        for name in names:
+                            final[name] = (None, None)
+                            written.append(name)
+                    else:
+                        for _, args in run:
+                            name, expire_time = args[0]
+                            results.append(client._expire(conn, name, expire_time))
+                            final[name] = _MISSING
+                            written.append(name)
+
+                client._invalidate(conn, *dict.fromkeys(written))
+        except Exception as e:
+            logger.warning("MysqlPipeline.execute " + str(len(commands)) + " commands got exception: " + str(e))
+            if raise_on_error:
+                raise
+            return [None] * len(commands)
+
+        if client._local_cache is not None:
+            for name, state in final.items():
+                if state is _MISSING:
+                    client._local_cache.evict(name)
+                else:
+                    client._local_cache.put(name, *state)
+        return results
 
 
 class MysqlLock:
-    def __init__(self, db, name: str, timeout: Optional[float] = None):
-        self.db = db
+    """
+    Distributed lock stored as a row in the `caches` table.
+
+    Each lock instance owns a random token written as the row value, so ownership checks on
+    `release` / `extend` are a single conditional statement. Acquisition is one `INSERT IGNORE`
+    in the uncontended case; a lock whose expire_time has passed is taken over in the same
+    transaction. Blocking waits back off exponentially with full jitter so that contending
+    workers do not retry in lock-step.
+    """
+
+    # default lifetime of a lock created without timeout, so a crashed owner cannot block forever
+    DEFAULT_TTL = 300
+    # upper bound of a single backoff sleep in seconds
+    MAX_SLEEP = 1.0
+
+    def __init__(
+        self,
+        engine: Engine,
+        name: str,
+        timeout: Optional[float] = None,
+        sleep: float = 0.05,
+        blocking_timeout: Optional[float] = None,
+    ):
+        self.engine = engine
         self.name = name
         self.timeout = timeout
-        self._locked = False
+        self.sleep = sleep
+        self.blocking_timeout = blocking_timeout
+        self._key = f"lock_{name}"
+        self._token: Optional[bytes] = None
 
-    def acquire(self, blocking: bool = True) -> bool:
+    @property
+    def _locked(self) -> bool:
+        return self._token is not None
+
+    def acquire(self, blocking: bool = True, blocking_timeout: Optional[float] = None) -> bool:
         if self._locked:
             return True
 
         if not blocking:
             return self._try_acquire()
-        assert self.timeout is not None, "timeout must be set when acquiring a lock in blocking mode"
-        import time
-        start_time = time.time()
+        if blocking_timeout is None:
+            blocking_timeout = self.blocking_timeout if self.blocking_timeout is not None else self.timeout
+        assert blocking_timeout is not None, "timeout must be set when acquiring a lock in blocking mode"
+
+        deadline = time.monotonic() + blocking_timeout
+        attempt = 0
         while True:
             if self._try_acquire():
                 return True
-            elapsed = time.time() - start_time
-            if elapsed >= self.timeout:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
                 return False
-            time.sleep(0.5)
+            # full jitter: sleep uniformly in [0, min(MAX_SLEEP, sleep * 2^attempt)]
+            backoff = min(self.MAX_SLEEP, self.sleep * (2**attempt))
+            time.sleep(min(remaining, _jitter.uniform(0, backoff)))
+            attempt += 1
 
-    def _try_acquire(self) -> bool:
-        if not self.db:
-            return False
+    def _expire_time(self) -> datetime:
+        return datetime.now() + timedelta(seconds=self.timeout or self.DEFAULT_TTL)
 
+    def _try_acquire(self) -> bool:
+        token = uuid.uuid4().hex.encode('utf-8')
+        params = {
+            'cache_key': self._key,
+            'cache_value': token,
+            'expire_time': self._expire_time(),
+        }
+        insert_sql = db.text(
+            "INSERT IGNORE INTO caches (cache_key, cache_value, expire_time) "
+            "VALUES (:cache_key, :cache_value, :expire_time)"
+        )
         try:
-            import json
-            import time
-            import os
-            import threading
-
-            lock_key = f"lock_{self.name}"
-            current_time = time.time()
-            process_id = os.getpid()
-            thread_id = threading.get_ident()
-            lock_value = {
-                "process_id": process_id,
-                "thread_id": thread_id,
-                "timestamp": current_time
-            }
+            with self.engine.begin() as conn:
+                acquired = conn.execute(insert_sql, params).rowcount > 0
+                if not acquired:
+                    # 持有者已过期（进程崩溃等）时在同一事务内接管，不依赖后台清理线程
+                    taken_over = conn.execute(
+                        db.text(
+                            "DELETE FROM caches WHERE cache_key = :cache_key "
+                            "AND expire_time IS NOT NULL AND expire_time < :now"
+                        ),
+                        {'cache_key': self._key, 'now': datetime.now()}
+                    ).rowcount > 0
+                    if taken_over:
+                        acquired = conn.execute(insert_sql, params).rowcount > 0
+        except Exception as e:
+            logger.warning("MysqlLock._try_acquire " + str(self.name) + " got exception: " + str(e))
+            return False
 
-            # 先尝试清理过期的同名锁，避免等待后台清理线程
-            try:
-                self.db.session.query(Cache).filter(
-                    Cache.cache_key == lock_key,
-                    Cache.expire_time.isnot(None),
-                    Cache.expire_time < datetime.now()
-                ).delete()
-                self.db.session.commit()
-            except Exception:
-                try:
-                    self.db.session.rollback()
-                except Exception:
-                    pass
+        if acquired:
+            self._token = token
+        return acquired
 
-            try:
-                # 设置锁的过期时间，防止死锁
-                if self.timeout:
-                    lock_expire_time = datetime.now() + timedelta(seconds=self.timeout)
-                else:
-                    lock_expire_time = datetime.now() + timedelta(seconds=300)  # 默认5分钟
+    def extend(self, additional_time: float, replace_ttl: bool = False) -> bool:
+        """Push back the expiry of a held lock, returns False if the lock is no longer owned"""
+        if not self._locked:
+            return False
 
-                sql = """
-                INSERT INTO caches (cache_key, cache_value, expire_time)
-                VALUES (:cache_key, :cache_value, :expire_time)
-                """
-                result = self.db.session.execute(
-                    db.text(sql),
-                    {
-                        'cache_key': lock_key,
-                        'cache_value': json.dumps(lock_value).encode('utf-8'),
-                        'expire_time': lock_expire_time
-                    }
-                )
-                self.db.session.commit()
+        params: dict[str, Any]
+        if replace_ttl:
+            expire_sql = "expire_time = :expire_time"
+            params = {'expire_time': datetime.now() + timedelta(seconds=additional_time)}
+        else:
+            expire_sql = "expire_time = DATE_ADD(expire_time, INTERVAL :microseconds MICROSECOND)"
+            params = {'microseconds': int(additional_time * 1_000_000)}
+        params.update({'cache_key': self._key, 'cache_value': self._token})
+        try:
+            with self.engine.begin() as conn:
+                return conn.execute(
+                    db.text(
+                        f"UPDATE caches SET {expire_sql} "
+                        "WHERE cache_key = :cache_key AND cache_value = :cache_value"
+                    ),
+                    params
+                ).rowcount > 0
+        except Exception as e:
+            logger.warning("MysqlLock.extend " + str(self.name) + " got exception: " + str(e))
+            return False
 
-                if result.rowcount > 0:
-                    self._locked = True
-                    return True
-                else:
-                    return False
-            except Exception as e:
-                try:
-                    self.db.session.rollback()
-                except Exception:
-                    pass
-                logger.debug(f"Lock insert failed for {lock_key}: {e}")
-                return False
+    def owned(self) -> bool:
+        if not self._locked:
+            return False
 
+        try:
+            with self.engine.connect() as conn:
+                return conn.execute(
+                    db.text(
+                        "SELECT 1 FROM caches WHERE cache_key = :cache_key AND cache_value = :cache_value "
+                        "AND (expire_time IS NULL OR expire_time > :now)"
+                    ),
+                    {'cache_key': self._key, 'cache_value': self._token, 'now': datetime.now()}
+                ).first() is not None
         except Exception as e:
-            logger.warning("MysqlLock._try_acquire " + str(self.name) + " got exception: " + str(e))
-            try:
-                self.db.session.rollback()
-            except Exception:
-                pass
+            logger.warning("MysqlLock.owned " + str(self.name) + " got exception: " + str(e))
             return False
 
     def release(self) -> None:
         if not self._locked:
             return
 
+        token, self._token = self._token, None
         try:
-            import json
-            import time
-            import os
-            import threading
-
-            lock_key = f"lock_{self.name}"
-            process_id = os.getpid()
-            thread_id = threading.get_ident()
-
-            cache_item = self.db.session.query(Cache).filter(Cache.cache_key == lock_key).first()
-            if cache_item:
-                try:
-                    lock_data = json.loads(cache_item.cache_value.decode('utf-8'))
-                    if (lock_data.get("process_id") == process_id and
-                        lock_data.get("thread_id") == thread_id):
-                        self.db.session.delete(cache_item)
-                        self.db.session.commit()
-                except (json.JSONDecodeError, UnicodeDecodeError):
-                    pass
-
-            self._locked = False
+            # 仅删除自己持有的锁，令牌匹配即所有权校验，无需先查询
+            with self.engine.begin() as conn:
+                conn.execute(
+                    db.text("DELETE FROM caches WHERE cache_key = :cache_key AND cache_value = :cache_value"),
+                    {'cache_key': self._key, 'cache_value': token}
+                )
         except Exception as e:
             logger.warning("MysqlLock.release " + str(self.name) + " got exception: " + str(e))
-            try:
-                self.db.session.rollback()
-            except Exception:
-                pass
 
     def __enter__(self):
         if not self.acquire():
@@ -575,7 +1415,11 @@ def main():
             # Test 2: Pipeline functionality
             print("Test 2: Pipeline functionality")
             pipeline = client.pipeline()
-            assert pipeline is client
+            pipeline.set("pipeline_a", "1").setex("pipeline_b", 60, "2").get("pipeline_a")
+            pipeline.delete("pipeline_a").mget(["pipeline_a", "pipeline_b"])
+            assert pipeline.execute() == [True, True, b"1", 1, [None, b"2"]]
+            assert client.mset({"mset_a": "1", "mset_b": 2}) is True
+            assert client.mget("mset_a", "mset_b", "mset_c") == [b"1", b"2", None]
             print("✓ Pipeline test passed")
 
             # Test 3: Get non-existent key
@@ -605,6 +1449,9 @@ def main():
             client.delete("new_counter")
             result = client.incr("new_counter", 10)
             assert result == b"10"
+            assert client.incr("new_counter", 5) == b"15"
+            assert client.incr("new_counter", -20) == b"-5"
+            assert client.incr("new_counter", 0) == b"-5"
             print("✓ Incr test passed")
 
             # Test 7: Zadd update
@@ -615,6 +1462,12 @@ def main():
             client.zadd("test_set", mapping2)
             card = client.zcard("test_set")
             assert card == 4
+            assert client.zcount("test_set", 2, "(4") == 2
+            assert client.zrangebyscore("test_set", "-inf", 2) == [b"member1", b"member2"]
+            members = client.zrangebyscore("test_set", 3, "+inf", withscores=True)
+            assert members == [(b"member3", 3.0), (b"member4", 4.0)]
+            assert client.zremrangebyscore("test_set", "-inf", 2) == 2
+            assert client.zcard("test_set") == 2
             print("✓ Zadd update test passed")
 
             # Test 8: Background cleanup thread
@@ -652,13 +1505,62 @@ def main():
             lock.release()
             assert new_lock.acquire(blocking=True) == True
             new_lock.release()
+            # ownership token
+            lock = client.lock(lock_name, timeout=1)
+            assert lock.acquire(blocking=False) == True
+            assert lock.owned() == True
+            assert lock.extend(10) == True
+            time.sleep(1.5)
+            new_lock = client.lock(lock_name, timeout=1)
+            assert new_lock.acquire(blocking=False) == False
+            lock.release()
+            assert new_lock.acquire(blocking=False) == True
+            assert lock.extend(10) == False
+            new_lock.release()
             print("✓ Lock blocking functionality test passed")
 
+            # Test 11: Local cache layer
+            print("Test 11: Local cache layer")
+            local_client = MysqlRedisClient(test_db, local_cache_max_size=128, invalidation_poll_interval=0.1)
+            other_client = MysqlRedisClient(test_db, local_cache_max_size=128, invalidation_poll_interval=0.1)
+            local_client.set("local_test", "v1")
+            assert local_client.get("local_test") == b"v1"
+            # a write from another process is seen once the invalidation is polled
+            other_client.set("local_test", "v2")
+            time.sleep(0.2)
+            assert local_client.get("local_test") == b"v2"
+            other_client.delete("local_test")
+            time.sleep(0.2)
+            assert local_client.get("local_test") is None
+            print("✓ Local cache layer test passed")
+
+            # Test 12: Hash, exists, ttl and getdel
+            print("Test 12: Hash, exists, ttl and getdel")
+            client.delete("hash_test", "getdel_test")
+            assert client.hset("hash_test", "a", "1") == 1
+            assert client.hset("hash_test", mapping={"b": "2", "c": "3"}) == 2
+            assert client.hlen("hash_test") == 3
+            assert client.hget("hash_test", "a") == b"1"
+            assert client.hdel("hash_test", "a", "missing") == 1
+            assert client.hgetall("hash_test") == {b"b": b"2", b"c": b"3"}
+            assert client.ttl("hash_test") == -1
+            client.expire("hash_test", 60)
+            assert 58 <= client.ttl("hash_test") <= 60
+            assert client.exists("hash_test", "test_set", "nonexistent_key") == 2
+            assert client.ttl("nonexistent_key") == -2
+            client.set("getdel_test", "once")
+            assert client.getdel("getdel_test") == b"once"
+            assert client.getdel("getdel_test") is None
+            print("✓ Hash, exists, ttl and getdel test passed")
+
             print("\n🎉 All MysqlRedisClient tests passed successfully!")
 
         finally:
             try:
                 client.db.session.query(Cache).delete()
+                client.db.session.query(CacheInvalidation).delete()
+                client.db.session.query(CacheSortedSet).delete()
+                client.db.session.query(CacheHash).delete()
                 client.db.session.commit()
                 print("✓ Test data cleanup completed")
             except Exception as e:
@@ -4,6 +4,7 @@ from collections.abc import Callable
 from typing import Any, Union
 
 import redis
+import sqlalchemy
 from redis import RedisError
 from redis.cache import CacheConfig
 from redis.cluster import ClusterNode, RedisCluster
@@ -59,7 +60,25 @@ def init_app(app: DifyApp):
     if "mysql" in dify_config.SQLALCHEMY_DATABASE_URI_SCHEME and dify_config.CACHE_SCHEME == "mysql":
         from extensions.ext_mysql_redis import MysqlRedisClient
 
-        mysql_redis_client = MysqlRedisClient()
+        # dedicated pool, so cache statements never share a connection or transaction with db.session
+        cache_engine = sqlalchemy.create_engine(
+            dify_config.MYSQL_CACHE_DATABASE_URI or dify_config.SQLALCHEMY_DATABASE_URI,
+            pool_size=dify_config.MYSQL_CACHE_POOL_SIZE,
+            max_overflow=dify_config.MYSQL_CACHE_MAX_OVERFLOW,
+            pool_recycle=dify_config.MYSQL_CACHE_POOL_RECYCLE,
+            pool_pre_ping=dify_config.MYSQL_CACHE_POOL_PRE_PING,
+        )
+        mysql_redis_client = MysqlRedisClient(
+            engine=cache_engine,
+            local_cache_max_size=(
+                dify_config.MYSQL_CACHE_LOCAL_MAX_SIZE if dify_config.MYSQL_CACHE_LOCAL_ENABLED else 0
+            ),
+            local_cache_ttl=dify_config.MYSQL_CACHE_LOCAL_TTL,
+            invalidation_poll_interval=dify_config.MYSQL_CACHE_INVALIDATION_POLL_INTERVAL,
+            sweep_interval=dify_config.MYSQL_CACHE_SWEEP_INTERVAL,
+            sweep_batch_size=dify_config.MYSQL_CACHE_SWEEP_BATCH_SIZE,
+            sweep_batch_pause=dify_config.MYSQL_CACHE_SWEEP_BATCH_PAUSE,
+        )
         mysql_redis_client.set_app(app)  # Set Flask app reference
         redis_client.initialize(mysql_redis_client)
         app.extensions["redis"] = redis_client
@@ -907,6 +907,9 @@ class DatasetKeywordTable(Base):
             return None
         if self.data_source_type == "database":
             return json.loads(self.keyword_table, cls=SetDecoder) if self.keyword_table else None
+        elif self.data_source_type == "inverted_index":
+            # keywords live in dataset_keywords rows, there is no table blob to decode
+            return None
         else:
             file_key = "keyword_files/" + dataset.tenant_id + "/" + self.dataset_id + ".txt"
             try:
@@ -919,6 +922,27 @@ class DatasetKeywordTable(Base):
                 return None
 
 
+class DatasetKeyword(Base):
+    """One `keyword -> index node` row of a dataset's jieba inverted index."""
+
+    __tablename__ = "dataset_keywords"
+    __table_args__ = (
+        db.PrimaryKeyConstraint("id", name="dataset_keyword_pkey"),
+        db.UniqueConstraint("dataset_id", "keyword", "index_node_id", name="dataset_keyword_keyword_node_idx"),
+        db.Index("dataset_keyword_node_idx", "dataset_id", "index_node_id"),
+    )
+
+    id = mapped_column(StringUUID, primary_key=True, **uuid_default())
+    dataset_id = mapped_column(StringUUID, nullable=False)
+    keyword = mapped_column(db.String(255), nullable=False)
+    index_node_id = mapped_column(db.String(255), nullable=False)
+    created_at = mapped_column(db.DateTime, nullable=False, server_default=func.current_timestamp())
+
+    @staticmethod
+    def unique_keys() -> list[str]:
+        return ["dataset_id", "keyword", "index_node_id"]
+
+
 class Embedding(Base):
     __tablename__ = "embeddings"
     __table_args__ = (
@@ -940,6 +964,10 @@ class Embedding(Base):
     def get_embedding(self) -> list[float]:
         return cast(list[float], pickle.loads(self.embedding))  # noqa: S301
 
+    @staticmethod
+    def unique_hash() -> list[str]:
+        return ["model_name", "hash", "provider_name"]
+
 
 class DatasetCollectionBinding(Base):
     __tablename__ = "dataset_collection_bindings"
@@ -0,0 +1,34 @@
+from unittest.mock import patch
+
+from core.app.apps.stop_flag_watcher import StopFlagWatcher
+
+
+def test_poll_checks_all_watched_flags_with_one_lookup():
+    watcher = StopFlagWatcher(interval=60, max_watch_time=60)
+    with patch.object(StopFlagWatcher, "_ensure_thread"):
+        first = watcher.watch("generate_task_stopped:1")
+        second = watcher.watch("generate_task_stopped:2")
+
+    with patch("core.app.apps.stop_flag_watcher.redis_client") as redis_client:
+        redis_client.mget.return_value = [None, b"1"]
+        watcher.poll()
+        redis_client.mget.assert_called_once_with(["generate_task_stopped:1", "generate_task_stopped:2"])
+
+        redis_client.mget.reset_mock()
+        redis_client.mget.return_value = [None]
+        watcher.poll()
+        # a stopped task is no longer polled
+        redis_client.mget.assert_called_once_with(["generate_task_stopped:1"])
+
+    assert not first.is_set()
+    assert second.is_set()
+
+
+def test_unwatched_and_expired_flags_are_not_polled():
+    watcher = StopFlagWatcher(interval=60, max_watch_time=0)
+    with patch.object(StopFlagWatcher, "_ensure_thread"):
+        watcher.watch("generate_task_stopped:1")
+
+    with patch("core.app.apps.stop_flag_watcher.redis_client") as redis_client:
+        watcher.poll()
+        redis_client.mget.assert_not_called()
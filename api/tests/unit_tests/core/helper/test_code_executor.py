@@ -0,0 +1,48 @@
+from unittest.mock import MagicMock, patch
+
+from core.helper.code_executor.code_executor import CodeExecutionError, CodeExecutor, CodeLanguage
+
+
+def _sandbox_response(stdout: str = "", error: str = "") -> MagicMock:
+    response = MagicMock()
+    response.status_code = 200
+    response.json.return_value = {"code": 0, "message": "success", "data": {"stdout": stdout, "error": error}}
+    return response
+
+
+@patch("httpx.Client.post")
+def test_execute_code_reuses_the_sandbox_client(mock_post):
+    mock_post.return_value = _sandbox_response(stdout="hello")
+
+    assert CodeExecutor.execute_code(CodeLanguage.PYTHON3, "", "print('hello')") == "hello"
+    client = CodeExecutor._get_client()
+    assert CodeExecutor.execute_code(CodeLanguage.PYTHON3, "", "print('hello')") == "hello"
+
+    assert CodeExecutor._get_client() is client
+    assert mock_post.call_count == 2
+
+
+def test_execute_workflow_code_template_batch_keeps_order_and_errors():
+    def execute_code(language, preload, code):
+        if "fail" in code:
+            raise CodeExecutionError("failed")
+        return code
+
+    with (
+        patch.object(CodeExecutor, "execute_code", side_effect=execute_code),
+        patch(
+            "core.helper.code_executor.jinja2.jinja2_transformer.Jinja2TemplateTransformer.transform_response",
+            side_effect=lambda response: {"result": response},
+        ),
+        patch(
+            "core.helper.code_executor.jinja2.jinja2_transformer.Jinja2TemplateTransformer.transform_caller",
+            side_effect=lambda code, inputs: (inputs["value"], ""),
+        ),
+    ):
+        results = CodeExecutor.execute_workflow_code_template_batch(
+            CodeLanguage.JINJA2, "{{ value }}", [{"value": "a"}, {"value": "fail"}, {"value": "c"}]
+        )
+
+    assert results[0] == {"result": "a"}
+    assert isinstance(results[1], CodeExecutionError)
+    assert results[2] == {"result": "c"}
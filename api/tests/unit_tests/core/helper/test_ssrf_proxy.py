@@ -1,9 +1,18 @@
+import asyncio
 import secrets
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
+import httpx
 import pytest
 
-from core.helper.ssrf_proxy import SSRF_DEFAULT_MAX_RETRIES, STATUS_FORCELIST, make_request
+from core.helper.ssrf_proxy import (
+    SSRF_DEFAULT_MAX_RETRIES,
+    STATUS_FORCELIST,
+    _get_async_client,
+    _get_client,
+    make_request,
+    make_request_async,
+)
 
 
 @patch("httpx.Client.request")
@@ -50,3 +59,39 @@ def test_retry_logic_success(mock_request):
     assert response.status_code == 200
     assert mock_request.call_count == SSRF_DEFAULT_MAX_RETRIES + 1
     assert mock_request.call_args_list[0][1].get("method") == "GET"
+
+
+def test_clients_are_reused_per_ssl_verify():
+    assert _get_client(ssl_verify=True) is _get_client(ssl_verify=True)
+    assert _get_client(ssl_verify=True) is not _get_client(ssl_verify=False)
+
+
+def test_pooled_client_does_not_keep_response_cookies():
+    client = _get_client(ssl_verify=True)
+    response = httpx.Response(
+        200, headers={"set-cookie": "session=secret; Path=/"}, request=httpx.Request("GET", "http://example.com")
+    )
+
+    client.cookies.extract_cookies(response)
+
+    assert not client.cookies
+
+
+@patch("httpx.AsyncClient.request")
+def test_async_retry_logic_success(mock_request):
+    mock_response_500 = MagicMock()
+    mock_response_500.status_code = 500
+    mock_response_200 = MagicMock()
+    mock_response_200.status_code = 200
+    mock_request.side_effect = [mock_response_500, mock_response_200]
+
+    async def request_twice():
+        response = await make_request_async("GET", "http://example.com", max_retries=1)
+        return response, _get_async_client(ssl_verify=True) is _get_async_client(ssl_verify=True)
+
+    with patch("asyncio.sleep", new=AsyncMock()):
+        response, client_reused = asyncio.run(request_twice())
+
+    assert response.status_code == 200
+    assert mock_request.call_count == 2
+    assert client_reused
@@ -0,0 +1,34 @@
+import pytest
+
+from core.plugin.impl.base import _endpoint, _get_session
+
+
+def test_get_session_is_shared():
+    assert _get_session() is _get_session()
+
+
+@pytest.mark.parametrize(
+    ("path", "endpoint"),
+    [
+        ("plugin/tenant-1/dispatch/llm/invoke", "plugin/{tenant_id}/dispatch/llm/invoke"),
+        ("plugin/tenant-1/asset/3f2504e0-4f89-11d3-9a0c-0305e82c3301", "plugin/{tenant_id}/asset/{id}"),
+        ("plugin/tenant-1/asset/icon.svg", "plugin/{tenant_id}/asset/{id}"),
+        ("plugin/tenant-1/management/install/tasks", "plugin/{tenant_id}/management/install/tasks"),
+        (
+            "plugin/tenant-1/management/install/tasks/delete_all",
+            "plugin/{tenant_id}/management/install/tasks/delete_all",
+        ),
+        ("plugin/tenant-1/management/install/tasks/task-1", "plugin/{tenant_id}/management/install/tasks/{task_id}"),
+        (
+            "plugin/tenant-1/management/install/tasks/task-1/delete",
+            "plugin/{tenant_id}/management/install/tasks/{task_id}/delete",
+        ),
+        (
+            "plugin/tenant-1/management/install/tasks/task-1/delete/langgenius/openai:0.0.1@abc",
+            "plugin/{tenant_id}/management/install/tasks/{task_id}/delete/{identifier}",
+        ),
+        ("plugin/tenant-1/unknown/3f2504e0-4f89-11d3-9a0c-0305e82c3301", "plugin/{tenant_id}/unknown/{id}"),
+    ],
+)
+def test_endpoint_replaces_path_parameters(path: str, endpoint: str):
+    assert _endpoint(path) == endpoint
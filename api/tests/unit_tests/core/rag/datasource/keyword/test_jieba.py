@@ -0,0 +1,101 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from core.rag.datasource.keyword.jieba.jieba import Jieba
+from core.rag.datasource.keyword.jieba.jieba_keyword_index import JiebaKeywordIndex
+
+MODULE = "core.rag.datasource.keyword.jieba.jieba"
+
+
+@pytest.fixture(autouse=True)
+def keyword_tables_cache():
+    Jieba.keyword_tables_cache.clear()
+    yield Jieba.keyword_tables_cache
+    Jieba.keyword_tables_cache.clear()
+
+
+@pytest.fixture
+def redis_client():
+    values: dict[str, str] = {}
+    with patch(f"{MODULE}.redis_client") as redis_client:
+        redis_client.get.side_effect = values.get
+        redis_client.set.side_effect = values.__setitem__
+        redis_client.setnx.side_effect = values.setdefault
+        yield redis_client
+
+
+def _dataset(data_source_type: str = "database") -> MagicMock:
+    dataset = MagicMock()
+    dataset.id = "dataset-1"
+    dataset.tenant_id = "tenant-1"
+    dataset.dataset_keyword_table.data_source_type = data_source_type
+    return dataset
+
+
+def test_save_keyword_table_is_rejected_for_the_inverted_index():
+    jieba = Jieba(_dataset(JiebaKeywordIndex.DATA_SOURCE_TYPE))
+
+    with (
+        patch(f"{MODULE}.db") as db,
+        patch(f"{MODULE}.storage") as storage,
+        patch(f"{MODULE}.redis_client") as redis_client,
+    ):
+        with pytest.raises(ValueError, match="not used by the inverted index"):
+            jieba._save_dataset_keyword_table({"dify": {"node-1"}})
+
+    db.session.commit.assert_not_called()
+    storage.save.assert_not_called()
+    redis_client.set.assert_not_called()
+
+
+def _segment(index_node_id: str) -> MagicMock:
+    segment = MagicMock()
+    segment.index_node_id = index_node_id
+    segment.content = f"content of {index_node_id}"
+    segment.document_id = "document-1"
+    segment.dataset_id = "dataset-1"
+    return segment
+
+
+def test_cached_keyword_table_is_reused_for_the_same_version(redis_client):
+    jieba = Jieba(_dataset())
+
+    with patch.object(Jieba, "_get_dataset_keyword_table", return_value={"dify": {"node-1"}}) as load:
+        first = jieba._get_cached_dataset_keyword_table()
+        second = Jieba(_dataset())._get_cached_dataset_keyword_table()
+
+    assert first == second == {"dify": {"node-1"}}
+    load.assert_called_once()
+
+
+def test_saving_the_keyword_table_invalidates_the_cached_one(redis_client):
+    jieba = Jieba(_dataset())
+
+    with patch.object(Jieba, "_get_dataset_keyword_table", return_value={"dify": {"node-1"}}):
+        assert jieba._get_cached_dataset_keyword_table() == {"dify": {"node-1"}}
+
+    with patch(f"{MODULE}.db"):
+        jieba._save_dataset_keyword_table({"rag": {"node-2"}})
+
+    with patch.object(Jieba, "_get_dataset_keyword_table", return_value={"rag": {"node-2"}}) as load:
+        assert jieba._get_cached_dataset_keyword_table() == {"rag": {"node-2"}}
+    load.assert_called_once()
+
+
+def test_search_returns_segments_in_keyword_hit_order(redis_client):
+    jieba = Jieba(_dataset())
+    keyword_table = {"dify": {"node-1", "node-2"}, "rag": {"node-2"}}
+
+    with (
+        patch.object(Jieba, "_get_dataset_keyword_table", return_value=keyword_table),
+        patch(f"{MODULE}.JiebaKeywordTableHandler") as handler_cls,
+        patch(f"{MODULE}.db") as db,
+    ):
+        handler_cls.return_value.extract_keywords.return_value = {"dify", "rag"}
+        # the database returns segments in arbitrary order
+        db.session.query.return_value.filter.return_value.all.return_value = [_segment("node-1"), _segment("node-2")]
+        documents = jieba.search("what is dify rag", top_k=2)
+
+    assert [document.metadata["doc_id"] for document in documents] == ["node-2", "node-1"]
+    assert documents[0].page_content == "content of node-2"
@@ -0,0 +1,91 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+from sqlalchemy.dialects import mysql, postgresql
+
+from core.rag.datasource.keyword.jieba.jieba_keyword_index import JiebaKeywordIndex
+
+MODULE = "core.rag.datasource.keyword.jieba.jieba_keyword_index"
+
+
+@pytest.fixture
+def db():
+    with patch(f"{MODULE}.db") as db:
+        yield db
+
+
+def _use_database(scheme: str):
+    return patch(f"{MODULE}.dify_config.SQLALCHEMY_DATABASE_URI_SCHEME", scheme)
+
+
+def _statements(db) -> list:
+    return [call.args[0] for call in db.session.execute.call_args_list]
+
+
+def test_add_skips_duplicate_empty_and_oversized_keywords(db):
+    with _use_database("postgresql"):
+        JiebaKeywordIndex("dataset-1").add({"node-1": ["dify", "dify", "", "x" * 256], "node-2": ["rag"]})
+
+    (stmt,) = _statements(db)
+    sql = str(stmt.compile(dialect=postgresql.dialect()))
+    assert "INSERT INTO dataset_keywords" in sql
+    assert "ON CONFLICT (dataset_id, keyword, index_node_id) DO NOTHING" in sql
+    rows = stmt.compile(dialect=postgresql.dialect()).params
+    assert sorted(v for key, v in rows.items() if key.startswith("keyword")) == ["dify", "rag"]
+    assert all(v == "dataset-1" for key, v in rows.items() if key.startswith("dataset_id"))
+    db.session.commit.assert_called_once()
+
+
+def test_add_uses_insert_ignore_on_mysql(db):
+    with _use_database("mysql"):
+        JiebaKeywordIndex("dataset-1").add({"node-1": ["dify"]})
+
+    (stmt,) = _statements(db)
+    assert str(stmt.compile(dialect=mysql.dialect())).startswith("INSERT IGNORE INTO dataset_keywords")
+
+
+def test_add_inserts_in_batches(db):
+    with _use_database("postgresql"), patch.object(JiebaKeywordIndex, "BATCH_SIZE", 2):
+        JiebaKeywordIndex("dataset-1").add({f"node-{i}": ["dify"] for i in range(5)})
+
+    assert db.session.execute.call_count == 3
+    db.session.commit.assert_called_once()
+
+
+def test_add_rejects_unknown_database(db):
+    with _use_database("sqlite"), pytest.raises(Exception, match="Invalid SQLALCHEMY_DATABASE_URI_SCHEME"):
+        JiebaKeywordIndex("dataset-1").add({"node-1": ["dify"]})
+
+
+def test_delete_removes_the_rows_of_the_given_nodes_in_batches(db):
+    with patch.object(JiebaKeywordIndex, "BATCH_SIZE", 2):
+        JiebaKeywordIndex("dataset-1").delete(["node-1", "node-2", "node-3"])
+
+    statements = _statements(db)
+    assert len(statements) == 2
+    params = [stmt.compile(dialect=mysql.dialect()).params for stmt in statements]
+    assert [p["index_node_id_1"] for p in params] == [["node-1", "node-2"], ["node-3"]]
+    assert all(p["dataset_id_1"] == "dataset-1" for p in params)
+    assert str(statements[0].compile(dialect=mysql.dialect())).startswith("DELETE FROM dataset_keywords")
+    db.session.commit.assert_called_once()
+
+
+def test_search_ranks_nodes_by_keyword_hits(db):
+    db.session.execute.return_value = [MagicMock(index_node_id="node-2"), MagicMock(index_node_id="node-1")]
+
+    result = JiebaKeywordIndex("dataset-1").search(["dify", "rag", "dify"], k=2)
+
+    assert result == ["node-2", "node-1"]
+    (stmt,) = _statements(db)
+    compiled = stmt.compile(dialect=mysql.dialect())
+    sql = str(compiled)
+    assert "FROM dataset_keywords" in sql
+    assert "GROUP BY dataset_keywords.index_node_id" in sql
+    assert "ORDER BY hits DESC, dataset_keywords.index_node_id" in sql
+    assert sorted(compiled.params["keyword_1"]) == ["dify", "rag"]
+    assert compiled.params["param_1"] == 2
+
+
+def test_search_without_keywords_does_not_query(db):
+    assert JiebaKeywordIndex("dataset-1").search([]) == []
+    db.session.execute.assert_not_called()
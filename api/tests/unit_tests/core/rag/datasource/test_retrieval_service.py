@@ -0,0 +1,72 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+from flask import Flask
+
+from core.rag.datasource.retrieval_service import RetrievalService
+from core.rag.models.document import Document
+from core.rag.retrieval.retrieval_methods import RetrievalMethod
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    with app.app_context():
+        yield app
+
+
+@pytest.fixture
+def dataset():
+    dataset = MagicMock()
+    dataset.id = "dataset-1"
+    dataset.tenant_id = "tenant-1"
+    dataset.index_struct_dict = None
+    return dataset
+
+
+def _retrieve(retrieval_method: str):
+    return RetrievalService.retrieve(
+        retrieval_method=retrieval_method, dataset_id="dataset-1", query="what is dify", top_k=4
+    )
+
+
+def test_branches_share_the_dataset_and_vector_of_one_retrieval(app, dataset):
+    vector = MagicMock()
+    vector.search_by_vector.return_value = [Document(page_content="semantic", metadata={"doc_id": "1"})]
+    vector.search_by_full_text.return_value = [Document(page_content="full text", metadata={"doc_id": "2"})]
+
+    with (
+        patch.object(RetrievalService, "_get_dataset", return_value=dataset) as get_dataset,
+        patch("core.rag.datasource.retrieval_service.Vector", return_value=vector) as vector_cls,
+        patch("core.rag.datasource.retrieval_service.DataPostProcessor") as post_processor_cls,
+    ):
+        post_processor_cls.return_value.invoke.side_effect = lambda documents, **kwargs: documents
+        documents = _retrieve(RetrievalMethod.HYBRID_SEARCH.value)
+
+    assert sorted(document.page_content for document in documents) == ["full text", "semantic"]
+    get_dataset.assert_called_once_with("dataset-1")
+    vector_cls.assert_called_once_with(dataset=dataset)
+    vector.search_by_vector.assert_called_once()
+    vector.search_by_full_text.assert_called_once()
+
+
+def test_retrievals_do_not_reuse_objects_of_earlier_retrievals(app, dataset):
+    with (
+        patch.object(RetrievalService, "_get_dataset", return_value=dataset) as get_dataset,
+        patch("core.rag.datasource.retrieval_service.Vector") as vector_cls,
+    ):
+        vector_cls.return_value.search_by_vector.return_value = []
+        _retrieve(RetrievalMethod.SEMANTIC_SEARCH.value)
+        _retrieve(RetrievalMethod.SEMANTIC_SEARCH.value)
+
+    assert get_dataset.call_count == 2
+    assert vector_cls.call_count == 2
+
+
+def test_vector_setup_error_is_raised(app, dataset):
+    with (
+        patch.object(RetrievalService, "_get_dataset", return_value=dataset),
+        patch("core.rag.datasource.retrieval_service.Vector", side_effect=RuntimeError("embedding model missing")),
+    ):
+        with pytest.raises(ValueError, match="embedding model missing"):
+            _retrieve(RetrievalMethod.SEMANTIC_SEARCH.value)
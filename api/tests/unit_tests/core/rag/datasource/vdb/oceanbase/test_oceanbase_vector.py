@@ -0,0 +1,216 @@
+import math
+from unittest.mock import MagicMock, patch
+
+import pytest
+from sqlalchemy.dialects import mysql
+
+from core.rag.datasource.vdb.oceanbase import oceanbase_vector
+from core.rag.datasource.vdb.oceanbase.oceanbase_vector import OceanBaseVector, OceanBaseVectorConfig
+from core.rag.models.document import Document
+
+
+def _config(**kwargs) -> OceanBaseVectorConfig:
+    values = {"host": "127.0.0.1", "port": 2881, "user": "root", "password": "difyai123456", "database": "test"}
+    return OceanBaseVectorConfig(**(values | kwargs))
+
+
+@pytest.fixture
+def mock_client_cls():
+    with patch("core.rag.datasource.vdb.oceanbase.oceanbase_vector.ObVecClient") as client_cls:
+        yield client_cls
+    oceanbase_vector._reset_clients_after_fork()
+    oceanbase_vector._collections_with_metadata_columns.clear()
+
+
+@pytest.fixture
+def mock_client(mock_client_cls):
+    return mock_client_cls.return_value
+
+
+def _documents(count: int) -> list[Document]:
+    return [
+        Document(page_content=f"text {i}", metadata={"doc_id": f"id-{i}", "document_id": "doc"}) for i in range(count)
+    ]
+
+
+def test_add_texts_writes_in_batches(mock_client):
+    vector = OceanBaseVector("collection", _config(batch_size=2))
+
+    vector.add_texts(_documents(5), [[0.1, 0.2]] * 5)
+
+    batches = [call.kwargs["data"] for call in mock_client.upsert.call_args_list]
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    assert [row["id"] for batch in batches for row in batch] == [f"id-{i}" for i in range(5)]
+    assert all(call.kwargs["table_name"] == "collection" for call in mock_client.upsert.call_args_list)
+    mock_client.insert.assert_not_called()
+
+
+def test_add_texts_writes_batches_in_parallel(mock_client):
+    vector = OceanBaseVector("collection", _config(batch_size=3, insert_workers=4))
+
+    vector.add_texts(_documents(10), [[0.1, 0.2]] * 10)
+
+    batches = [call.kwargs["data"] for call in mock_client.upsert.call_args_list]
+    assert sorted(len(batch) for batch in batches) == [1, 3, 3, 3]
+    assert sorted(row["id"] for batch in batches for row in batch) == sorted(f"id-{i}" for i in range(10))
+
+
+def test_add_texts_propagates_batch_failure(mock_client):
+    mock_client.upsert.side_effect = [None, RuntimeError("boom")]
+    vector = OceanBaseVector("collection", _config(batch_size=1, insert_workers=2))
+
+    with pytest.raises(RuntimeError):
+        vector.add_texts(_documents(2), [[0.1, 0.2]] * 2)
+
+
+def _compile(clause) -> str:
+    return str(clause.compile(dialect=mysql.dialect(), compile_kwargs={"literal_binds": True}))
+
+
+@pytest.mark.parametrize(
+    ("missing", "expected"),
+    [
+        ([], "document_id IN ('a', 'b''c')"),
+        (["document_id", "doc_id", "dataset_id"], "json_unquote(json_extract(metadata, '$.document_id')) IN"),
+    ],
+)
+def test_search_by_vector_filters_on_document_id(mock_client, missing, expected):
+    mock_client.ann_search.return_value = []
+    vector = OceanBaseVector("collection", _config())
+
+    with patch.object(OceanBaseVector, "_missing_metadata_columns", return_value=missing):
+        vector.search_by_vector([0.1, 0.2], document_ids_filter=["a", "b'c"])
+
+    (where_clause,) = mock_client.ann_search.call_args.kwargs["where_clause"]
+    assert expected in _compile(where_clause)
+
+
+def test_delete_by_metadata_field_uses_bound_parameters(mock_client):
+    conn = mock_client.engine.begin.return_value.__enter__.return_value
+    vector = OceanBaseVector("collection", _config())
+
+    with patch.object(OceanBaseVector, "_missing_metadata_columns", return_value=[]):
+        vector.delete_by_metadata_field("document_id", "x' OR '1'='1")
+        vector.delete_by_metadata_field("source", "upload")
+
+    indexed, json_path = conn.execute.call_args_list
+    assert str(indexed.args[0]) == "DELETE FROM `collection` WHERE `document_id` = :value"
+    assert indexed.args[1]["value"] == "x' OR '1'='1"
+    assert ":metadata_path" in str(json_path.args[0])
+    assert json_path.args[1] == {"value": "upload", "metadata_path": "$.source"}
+
+
+def test_add_metadata_columns_alters_only_missing_columns(mock_client):
+    mock_client.check_table_exists.return_value = True
+    vector = OceanBaseVector("collection", _config())
+
+    with (
+        patch.object(oceanbase_vector, "redis_client", MagicMock()),
+        patch.object(OceanBaseVector, "_missing_metadata_columns", return_value=["dataset_id"]) as missing,
+    ):
+        assert vector.add_metadata_columns() is True
+        statement = mock_client.perform_raw_text_sql.call_args.args[0]
+        assert "ADD COLUMN `dataset_id` VARCHAR(255) GENERATED ALWAYS AS" in statement
+        assert "ADD INDEX `idx_dataset_id` (`dataset_id`)" in statement
+
+        # the collection is now remembered as upgraded, no further lookups are needed
+        assert OceanBaseVector("collection", _config())._has_metadata_columns()
+        assert missing.call_count == 1
+
+
+def _hybrid_vector(mock_client, rows) -> tuple[OceanBaseVector, MagicMock]:
+    mock_client.perform_raw_text_sql.return_value.fetchone.return_value = ["OceanBase_CE 4.3.5.1 (r1) (Built)"]
+    conn = mock_client.engine.connect.return_value.__enter__.return_value
+    conn.execute.return_value.fetchall.return_value = rows
+    return OceanBaseVector("collection", _config(enable_hybrid_search=True)), conn
+
+
+def test_search_by_hybrid_fuses_with_rrf_in_one_query(mock_client):
+    vector, conn = _hybrid_vector(mock_client, [("text", '{"doc_id": "a"}', 0.03, 0.9, 2.5)])
+
+    documents = vector.search_by_hybrid("query", [0.1, 0.2], top_k=3)
+
+    statement, params = conn.execute.call_args.args
+    conn.execute.assert_called_once()
+    assert "APPROXIMATE" in str(statement)
+    assert "MATCH (text) AGAINST (:query)" in str(statement)
+    assert ":rrf_k + ROW_NUMBER() OVER (ORDER BY distance)" in str(statement)
+    assert params["query_vector"] == "[0.1,0.2]"
+    assert params["rrf_k"] == 60
+    assert params["top_k"] == 3
+    assert "score_threshold" not in params
+    assert documents[0].metadata == {"doc_id": "a", "score": 0.9, "fusion_score": 0.03}
+
+
+def test_search_by_hybrid_rrf_applies_threshold_to_vector_similarity(mock_client):
+    rows = [("vector", '{"doc_id": "a"}', 0.03, 0.8, None), ("full text", '{"doc_id": "b"}', 0.016, None, 2.5)]
+    vector, conn = _hybrid_vector(mock_client, rows)
+
+    documents = vector.search_by_hybrid("query", [0.1, 0.2], top_k=3, score_threshold=0.5)
+
+    statement, params = conn.execute.call_args.args
+    assert f"WHERE 1 - distance / {math.sqrt(2)} >= :score_threshold" in str(statement)
+    assert params["score_threshold"] == 0.5
+    assert [(document.metadata["score"], document.metadata["fusion_score"]) for document in documents] == [
+        (0.8, 0.03),
+        (2.5, 0.016),
+    ]
+
+
+def test_search_by_hybrid_weighted_fusion_applies_threshold_and_filter(mock_client):
+    rows = [("kept", '{"doc_id": "a"}', 0.8, 0.9, 1.0), ("dropped", '{"doc_id": "b"}', 0.2, 0.3, None)]
+    vector, conn = _hybrid_vector(mock_client, rows)
+
+    with patch.object(OceanBaseVector, "_missing_metadata_columns", return_value=[]):
+        documents = vector.search_by_hybrid(
+            "query",
+            [0.1, 0.2],
+            fusion="weighted",
+            vector_weight=0.7,
+            keyword_weight=0.3,
+            score_threshold=0.5,
+            document_ids_filter=["doc-1"],
+        )
+
+    statement, params = conn.execute.call_args.args
+    assert "MAX(score) OVER ()" in str(statement)
+    assert "`document_id` IN" in str(statement)
+    assert params["document_ids"] == ["doc-1"]
+    assert (params["vector_weight"], params["keyword_weight"]) == (0.7, 0.3)
+    assert "score_threshold" not in params
+    assert [document.page_content for document in documents] == ["kept"]
+    assert documents[0].metadata["score"] == documents[0].metadata["fusion_score"] == 0.8
+
+
+def test_search_by_hybrid_requires_hybrid_support(mock_client):
+    vector = OceanBaseVector("collection", _config())
+
+    assert not vector.supports_hybrid_search()
+    with pytest.raises(ValueError):
+        vector.search_by_hybrid("query", [0.1, 0.2])
+
+
+def test_vectors_share_one_client_per_connection_config(mock_client_cls):
+    mock_client = mock_client_cls.return_value
+    mock_client.perform_raw_text_sql.return_value.fetchone.return_value = ["OceanBase_CE 4.3.10.0 (r1) (Built)"]
+
+    first = OceanBaseVector("first", _config(enable_hybrid_search=True))
+    second = OceanBaseVector("second", _config(enable_hybrid_search=True))
+    OceanBaseVector("third", _config(database="other"))
+
+    assert first._client is second._client
+    assert mock_client_cls.call_count == 2
+    assert mock_client_cls.call_args_list[0].kwargs["pool_pre_ping"] is True
+    # the version probe runs once per connection config, 4.3.10 compares as newer than 4.3.5.1
+    mock_client.perform_raw_text_sql.assert_called_once()
+    assert first.supports_hybrid_search()
+    assert second.supports_hybrid_search()
+
+
+def test_failed_version_probe_is_not_cached(mock_client):
+    mock_client.perform_raw_text_sql.side_effect = [RuntimeError("timeout"), MagicMock()]
+    mock_client.perform_raw_text_sql.return_value.fetchone.return_value = ["OceanBase_CE 4.3.5.1 (r1) (Built)"]
+
+    assert not OceanBaseVector("collection", _config(enable_hybrid_search=True)).supports_hybrid_search()
+    mock_client.perform_raw_text_sql.side_effect = None
+    assert OceanBaseVector("collection", _config(enable_hybrid_search=True)).supports_hybrid_search()
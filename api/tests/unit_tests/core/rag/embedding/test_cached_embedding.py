@@ -0,0 +1,78 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+from sqlalchemy.dialects import mysql, postgresql
+
+from core.model_runtime.entities.model_entities import ModelPropertyKey
+from core.rag.embedding.cached_embedding import CacheEmbedding
+from libs import helper
+from models.dataset import Embedding
+
+
+def _model_instance(max_chunks: int = 10) -> MagicMock:
+    model_instance = MagicMock()
+    model_instance.model = "text-embedding"
+    model_instance.provider = "openai"
+    model_instance.model_type_instance.get_model_schema.return_value.model_properties = {
+        ModelPropertyKey.MAX_CHUNKS: max_chunks
+    }
+    model_instance.invoke_text_embedding.side_effect = lambda texts, **kwargs: MagicMock(
+        embeddings=[[float(len(text)), 0.0] for text in texts]
+    )
+    return model_instance
+
+
+def _cached(text: str, embedding: list[float]) -> Embedding:
+    cached = Embedding(model_name="text-embedding", hash=helper.generate_text_hash(text), provider_name="openai")
+    cached.set_embedding(embedding)
+    return cached
+
+
+@pytest.fixture
+def mock_db():
+    with patch("core.rag.embedding.cached_embedding.db") as db:
+        db.session.query.return_value.filter.return_value.all.return_value = []
+        yield db
+
+
+def test_embed_documents_looks_up_hashes_in_chunks(mock_db):
+    mock_db.session.query.return_value.filter.return_value.all.side_effect = [[_cached("a", [0.0, 1.0])], []]
+    model_instance = _model_instance()
+
+    with patch.object(CacheEmbedding, "CACHE_BATCH_SIZE", 2):
+        embeddings = CacheEmbedding(model_instance).embed_documents(["a", "bb", "ccc"])
+
+    assert mock_db.session.query.return_value.filter.call_count == 2
+    assert embeddings == [[0.0, 1.0], [1.0, 0.0], [1.0, 0.0]]
+    model_instance.invoke_text_embedding.assert_called_once()
+    assert model_instance.invoke_text_embedding.call_args.kwargs["texts"] == ["bb", "ccc"]
+
+
+def test_embed_documents_embeds_duplicate_texts_once(mock_db):
+    model_instance = _model_instance(max_chunks=2)
+
+    embeddings = CacheEmbedding(model_instance).embed_documents(["x", "yy", "x", "zzz", "yy"])
+
+    embedded = [text for call in model_instance.invoke_text_embedding.call_args_list for text in call.kwargs["texts"]]
+    assert embedded == ["x", "yy", "zzz"]
+    assert embeddings[0] == embeddings[2] == [1.0, 0.0]
+    assert embeddings[1] == embeddings[4]
+
+
+@pytest.mark.parametrize(
+    ("scheme", "dialect", "expected"),
+    [
+        ("postgresql", postgresql.dialect(), "ON CONFLICT (model_name, hash, provider_name) DO NOTHING"),
+        ("mysql+pymysql", mysql.dialect(), "INSERT IGNORE INTO embeddings"),
+    ],
+)
+def test_embed_documents_stores_new_embeddings_in_one_upsert(mock_db, scheme, dialect, expected):
+    with patch("core.rag.embedding.cached_embedding.dify_config") as config:
+        config.SQLALCHEMY_DATABASE_URI_SCHEME = scheme
+        CacheEmbedding(_model_instance()).embed_documents(["a", "b", "a"])
+
+    mock_db.session.execute.assert_called_once()
+    statement = mock_db.session.execute.call_args.args[0]
+    assert expected in str(statement.compile(dialect=dialect))
+    assert len(statement.compile(dialect=dialect).params) == 10
+    mock_db.session.commit.assert_called_once()
@@ -0,0 +1,80 @@
+import math
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from core.rag.models.document import Document
+from core.rag.rerank.weight_rerank import WeightRerankRunner
+
+
+def _reference_keyword_similarities(query_keywords, documents_keywords) -> list[float]:
+    """The dict-based TF-IDF cosine WeightRerankRunner used before it was vectorized."""
+    total_documents = len(documents_keywords)
+    all_keywords = set()
+    for document_keywords in documents_keywords:
+        all_keywords.update(document_keywords)
+    keyword_idf = {}
+    for keyword in all_keywords:
+        doc_count_containing_keyword = sum(1 for doc_keywords in documents_keywords if keyword in doc_keywords)
+        keyword_idf[keyword] = math.log((1 + total_documents) / (1 + doc_count_containing_keyword)) + 1
+
+    query_tfidf = {keyword: count * keyword_idf.get(keyword, 0) for keyword, count in Counter(query_keywords).items()}
+    documents_tfidf = [
+        {keyword: count * keyword_idf.get(keyword, 0) for keyword, count in Counter(document_keywords).items()}
+        for document_keywords in documents_keywords
+    ]
+
+    def cosine_similarity(vec1, vec2):
+        numerator = sum(vec1[x] * vec2[x] for x in set(vec1) & set(vec2))
+        denominator = math.sqrt(sum(v**2 for v in vec1.values())) * math.sqrt(sum(v**2 for v in vec2.values()))
+        return float(numerator) / denominator if denominator else 0.0
+
+    return [cosine_similarity(query_tfidf, document_tfidf) for document_tfidf in documents_tfidf]
+
+
+def _reference_vector_similarities(query_vector, documents) -> list[float]:
+    scores = []
+    for document in documents:
+        if document.metadata and "score" in document.metadata:
+            scores.append(document.metadata["score"])
+        else:
+            vec1 = np.array(query_vector)
+            vec2 = np.array(document.vector)
+            scores.append(np.dot(vec1, vec2) / (np.linalg.norm(vec1) * np.linalg.norm(vec2)))
+    return scores
+
+
+def _random_keywords(rng: np.random.Generator, documents: int, vocabulary: int = 2000, keywords: int = 10):
+    words = [f"word{i}" for i in range(vocabulary)]
+    return [set(rng.choice(words, keywords, replace=False)) for _ in range(documents)], set(
+        rng.choice(words[:200], 5, replace=False)
+    )
+
+
+def test_keyword_similarities_match_reference():
+    rng = np.random.default_rng(0)
+    documents_keywords, query_keywords = _random_keywords(rng, documents=60, vocabulary=150)
+    documents_keywords.append(set())
+    documents_keywords.append(["repeated", "repeated", "word1"])
+
+    similarities = WeightRerankRunner._keyword_similarities(query_keywords, documents_keywords)
+
+    assert similarities.tolist() == pytest.approx(_reference_keyword_similarities(query_keywords, documents_keywords))
+
+
+def test_keyword_similarities_without_overlap():
+    assert WeightRerankRunner._keyword_similarities({"absent"}, [{"a", "b"}, set()]).tolist() == [0.0, 0.0]
+    assert WeightRerankRunner._keyword_similarities({"a"}, []).tolist() == []
+
+
+def test_vector_similarities_match_reference():
+    rng = np.random.default_rng(0)
+    query_vector = rng.normal(size=16).tolist()
+    documents = [Document(page_content=str(i), vector=rng.normal(size=16).tolist(), metadata={}) for i in range(20)]
+    documents[3].metadata["score"] = 0.42
+
+    similarities = WeightRerankRunner._vector_similarities(query_vector, documents)
+
+    assert similarities.tolist() == pytest.approx(_reference_vector_similarities(query_vector, documents))
+    assert similarities[3] == 0.42
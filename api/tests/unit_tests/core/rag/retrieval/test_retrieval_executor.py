@@ -0,0 +1,70 @@
+import threading
+import time
+
+from core.rag.retrieval.retrieval_executor import RetrievalExecutor
+
+
+def test_run_all_runs_every_task():
+    executor = RetrievalExecutor(max_workers=4)
+    results: list[int] = []
+
+    timed_out = executor.run_all([lambda i=i: results.append(i) for i in range(10)], timeout=5)
+
+    assert timed_out == []
+    assert sorted(results) == list(range(10))
+    assert executor.queue_depth == 0
+    assert executor.active_count == 0
+
+
+def test_run_all_limits_fan_out():
+    executor = RetrievalExecutor(max_workers=8)
+    lock = threading.Lock()
+    running = 0
+    peak = 0
+
+    def task():
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.02)
+        with lock:
+            running -= 1
+
+    assert executor.run_all([task] * 6, timeout=5, max_fan_out=2) == []
+    assert peak <= 2
+
+
+def test_run_all_reports_timed_out_tasks():
+    executor = RetrievalExecutor(max_workers=1)
+    release = threading.Event()
+
+    timed_out = executor.run_all([lambda: None, release.wait, lambda: None], timeout=0.2, max_fan_out=1)
+    release.set()
+
+    assert timed_out == [1, 2]
+
+
+def test_run_all_logs_task_errors_and_continues():
+    executor = RetrievalExecutor(max_workers=2)
+    results: list[str] = []
+
+    def failing():
+        raise ValueError("boom")
+
+    assert executor.run_all([failing, lambda: results.append("ok")], timeout=5) == []
+    assert results == ["ok"]
+
+
+def test_nested_fan_out_does_not_deadlock_a_saturated_pool():
+    executor = RetrievalExecutor(max_workers=2)
+    results: list[tuple[int, int]] = []
+
+    def retriever(i):
+        # each dataset retriever fans out again onto the same, already saturated pool
+        executor.run_all([lambda j=j: results.append((i, j)) for j in range(3)], timeout=5)
+
+    timed_out = executor.run_all([lambda i=i: retriever(i) for i in range(4)], timeout=5)
+
+    assert timed_out == []
+    assert sorted(results) == [(i, j) for i in range(4) for j in range(3)]
@@ -0,0 +1,100 @@
+from collections import Counter
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from flask import Flask
+from sqlalchemy.dialects import mysql
+
+from core.rag.models.document import Document
+from core.rag.retrieval.segment_hit_counter import SegmentHitCounter
+
+
+def _document(doc_id: str, provider: str = "dify") -> Document:
+    return Document(
+        page_content="content",
+        metadata={"doc_id": doc_id, "document_id": "document-1", "dataset_id": "dataset-1"},
+        provider=provider,
+    )
+
+
+def test_hits_are_aggregated_and_written_in_one_flush():
+    counter = SegmentHitCounter(interval=60, batch_size=100)
+    with patch.object(SegmentHitCounter, "_write") as write:
+        counter.add([_document("node-1"), _document("node-2"), _document("node-3", provider="external")])
+        counter.add([_document("node-1")])
+        counter._timer.cancel()
+
+        counter.flush()
+        counter.flush()
+
+    write.assert_called_once_with(
+        Counter({("dataset-1", "document-1", "node-1"): 2, ("dataset-1", "document-1", "node-2"): 1})
+    )
+
+
+def test_add_without_dify_documents_does_not_schedule_a_flush():
+    counter = SegmentHitCounter(interval=60, batch_size=100)
+
+    counter.add([_document("node-1", provider="external")])
+
+    assert counter._timer is None
+
+
+def _hits(*index_node_ids: str) -> Counter[tuple[str, str, str]]:
+    return Counter({("dataset-1", "document-1", index_node_id): 1 for index_node_id in index_node_ids})
+
+
+def _mock_db(db: MagicMock, *index_node_ids: str, fail_on_update: int = 0) -> list:
+    """Resolve node-N to segment-N and record the executed updates, failing the given one (1-based)."""
+    documents = [SimpleNamespace(id="document-1", dataset_id="dataset-1", doc_form="text_model")]
+    segments = [
+        SimpleNamespace(id=node_id.replace("node", "segment"), dataset_id="dataset-1", index_node_id=node_id)
+        for node_id in index_node_ids
+    ]
+    results = iter([documents, segments])
+    updates: list = []
+
+    def execute(stmt):
+        if stmt.is_select:
+            return next(results)
+        updates.append(stmt)
+        if len(updates) == fail_on_update:
+            raise RuntimeError("deadlock found")
+
+    db.session.execute.side_effect = execute
+    return updates
+
+
+def test_write_updates_segments_in_id_order_and_commits_per_batch():
+    counter = SegmentHitCounter(interval=60, batch_size=2)
+    with patch("core.rag.retrieval.segment_hit_counter.db") as db:
+        updates = _mock_db(db, "node-3", "node-1", "node-2")
+
+        assert counter._write(_hits("node-3", "node-1", "node-2")) == Counter()
+
+    batches = [stmt.compile(dialect=mysql.dialect()).params["id_1"] for stmt in updates]
+    assert batches == [["segment-1", "segment-2"], ["segment-3"]]
+    assert db.session.commit.call_count == 2
+
+
+def test_write_returns_the_hits_of_failed_batches():
+    counter = SegmentHitCounter(interval=60, batch_size=1)
+    with patch("core.rag.retrieval.segment_hit_counter.db") as db:
+        _mock_db(db, "node-1", "node-2", "node-3", fail_on_update=2)
+
+        unwritten = counter._write(_hits("node-1", "node-2", "node-3"))
+
+    assert unwritten == _hits("node-2", "node-3")
+    db.session.rollback.assert_called_once()
+    assert db.session.commit.call_count == 1
+
+
+def test_failed_flush_requeues_the_hits():
+    counter = SegmentHitCounter(interval=60, batch_size=100)
+    counter._flask_app = Flask(__name__)
+    counter._hits = _hits("node-1")
+    with patch.object(SegmentHitCounter, "_write", side_effect=RuntimeError("database unavailable")):
+        counter.flush()
+    counter._timer.cancel()
+
+    assert counter._hits == _hits("node-1")
@@ -0,0 +1,79 @@
+import threading
+import time
+from concurrent.futures import wait
+
+import pytest
+
+from core.workflow.graph_engine.workflow_thread_pool import WorkflowTaskQueue, WorkflowThreadPool
+
+
+def test_submit_runs_tasks_and_returns_results():
+    pool = WorkflowThreadPool(max_workers=4)
+    queue = WorkflowTaskQueue(max_active=4)
+
+    futures = [pool.submit(queue, lambda i=i: i * 2) for i in range(10)]
+
+    assert [future.result(timeout=5) for future in futures] == [i * 2 for i in range(10)]
+    assert pool.queue_depth == 0
+    assert pool.active_count == 0
+
+
+def test_submit_propagates_task_errors():
+    pool = WorkflowThreadPool(max_workers=1)
+    queue = WorkflowTaskQueue(max_active=1)
+
+    def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError, match="boom"):
+        pool.submit(queue, fail).result(timeout=5)
+
+
+def test_queue_quota_limits_concurrency():
+    pool = WorkflowThreadPool(max_workers=8)
+    queue = WorkflowTaskQueue(max_active=2)
+    lock = threading.Lock()
+    running = 0
+    peak = 0
+
+    def task():
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.02)
+        with lock:
+            running -= 1
+
+    wait([pool.submit(queue, task) for _ in range(6)], timeout=5)
+    assert peak == 2
+
+
+def test_workers_alternate_between_queues():
+    pool = WorkflowThreadPool(max_workers=1)
+    busy, first, second = WorkflowTaskQueue(1), WorkflowTaskQueue(1), WorkflowTaskQueue(1)
+    release = threading.Event()
+    order: list[str] = []
+
+    blocker = pool.submit(busy, release.wait)
+    futures = [pool.submit(first, order.append, f"first-{i}") for i in range(3)]
+    futures += [pool.submit(second, order.append, f"second-{i}") for i in range(3)]
+    release.set()
+    wait([blocker, *futures], timeout=5)
+
+    assert order == ["first-0", "second-0", "first-1", "second-1", "first-2", "second-2"]
+
+
+def test_nested_submission_does_not_deadlock():
+    pool = WorkflowThreadPool(max_workers=2)
+    queue = WorkflowTaskQueue(max_active=2)
+
+    def parent(depth: int) -> int:
+        if depth == 0:
+            return 1
+        children = [pool.submit(queue, parent, depth - 1) for _ in range(2)]
+        while pool.run_queued(children):
+            pass
+        return sum(child.result(timeout=5) for child in children)
+
+    assert pool.submit(queue, parent, 4).result(timeout=10) == 16
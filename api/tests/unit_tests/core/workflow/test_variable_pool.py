@@ -436,3 +436,51 @@ class TestVariablePoolSerialization:
         loaded = VariablePool.model_validate(pool_dict)
         assert isinstance(loaded.variable_dictionary, defaultdict)
         loaded.add(["non_exist_node", "a"], 1)
+
+
+class TestVariablePoolOverlay:
+    def test_overlay_reads_through_and_keeps_writes_local(self, pool):
+        pool.add(("node_1", "output"), "parent")
+        pool.add(("node_2", "output"), "kept")
+        overlay = pool.create_overlay()
+
+        overlay.add(("node_1", "output"), "child")
+        overlay.add(("iteration", "item"), 1)
+
+        assert overlay.get(("node_1", "output")).value == "child"
+        assert overlay.get(("node_2", "output")).value == "kept"
+        assert overlay.get(("sys", "user_id")).value == "test_user_id"
+        assert pool.get(("node_1", "output")).value == "parent"
+        assert pool.get(("iteration", "item")) is None
+        assert "node_2" not in overlay.variable_dictionary
+
+    def test_overlay_removal_hides_parent_variables(self, pool):
+        pool.add(("node_1", "a"), "a")
+        pool.add(("node_1", "b"), "b")
+        pool.add(("node_2", "a"), "a")
+        overlay = pool.create_overlay()
+
+        overlay.remove(("node_1",))
+        overlay.remove(("node_2", "a"))
+        assert overlay.get(("node_1", "a")) is None
+        assert overlay.get(("node_2", "a")) is None
+
+        overlay.add(("node_1", "a"), "new")
+        assert overlay.get(("node_1", "a")).value == "new"
+        assert overlay.get(("node_1", "b")) is None
+        assert pool.get(("node_1", "b")).value == "b"
+        assert pool.get(("node_2", "a")).value == "a"
+
+    def test_overlay_serializes_flattened(self, pool):
+        pool.add(("node_1", "a"), "a")
+        pool.add(("node_1", "b"), "b")
+        overlay = pool.create_overlay()
+        overlay.remove(("node_1", "b"))
+        overlay.add(("node_2", "a"), 2)
+
+        loaded = VariablePool.model_validate_json(overlay.model_dump_json())
+
+        assert loaded.get(("node_1", "a")).value == "a"
+        assert loaded.get(("node_1", "b")) is None
+        assert loaded.get(("node_2", "a")).value == 2
+        assert loaded.get(("sys", "user_id")).value == "test_user_id"
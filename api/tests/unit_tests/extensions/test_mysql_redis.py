@@ -0,0 +1,386 @@
+import time
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock
+
+import pytest
+
+from extensions.ext_mysql_redis import (
+    _MISSING,
+    MysqlLocalCache,
+    MysqlLock,
+    MysqlPipeline,
+    MysqlRedisClient,
+    _score_range_condition,
+)
+
+
+def test_local_cache_miss():
+    cache = MysqlLocalCache(maxsize=8, ttl=5)
+
+    assert cache.get("missing") is _MISSING
+
+
+def test_local_cache_put_and_get():
+    cache = MysqlLocalCache(maxsize=8, ttl=5)
+    cache.put("key", b"value")
+
+    assert cache.get("key") == b"value"
+
+
+def test_local_cache_caches_negative_lookups():
+    cache = MysqlLocalCache(maxsize=8, ttl=5)
+    cache.put("key", None)
+
+    assert cache.get("key") is None
+
+
+def test_local_cache_honours_ttl():
+    cache = MysqlLocalCache(maxsize=8, ttl=0.05)
+    cache.put("key", b"value")
+    time.sleep(0.1)
+
+    assert cache.get("key") is _MISSING
+
+
+def test_local_cache_honours_expire_time():
+    cache = MysqlLocalCache(maxsize=8, ttl=60)
+    cache.put("key", b"value", datetime.now() + timedelta(seconds=0.05))
+    time.sleep(0.1)
+
+    assert cache.get("key") is _MISSING
+
+
+def test_local_cache_skips_already_expired():
+    cache = MysqlLocalCache(maxsize=8, ttl=60)
+    cache.put("key", b"old")
+    cache.put("key", b"value", datetime.now() - timedelta(seconds=1))
+
+    assert cache.get("key") is _MISSING
+
+
+def test_local_cache_is_bounded():
+    cache = MysqlLocalCache(maxsize=2, ttl=60)
+    cache.put("a", b"1")
+    cache.put("b", b"2")
+    cache.get("a")
+    cache.put("c", b"3")
+
+    assert len(cache) == 2
+    assert cache.get("a") == b"1"
+    assert cache.get("b") is _MISSING
+
+
+def test_local_cache_evict():
+    cache = MysqlLocalCache(maxsize=8, ttl=60)
+    cache.put("a", b"1")
+    cache.put("b", b"2")
+    cache.evict("a", "unknown")
+
+    assert cache.get("a") is _MISSING
+    assert cache.get("b") == b"2"
+
+
+def _mock_client():
+    client = MagicMock()
+    client._local_cache = None
+    return client
+
+
+def _transaction(engine):
+    return engine.begin.return_value
+
+
+def test_pipeline_groups_consecutive_commands():
+    runs = MysqlPipeline._runs(
+        [
+            ("set", [("a", b"1", None)]),
+            ("mset", [("b", b"2", None)]),
+            ("get", ["a"]),
+            ("mget", ["a", "b"]),
+            ("delete", ["a"]),
+            ("setex", [("c", b"3", None)]),
+        ]
+    )
+
+    assert [kind for kind, _ in runs] == ["upsert", "select", "delete", "upsert"]
+    assert [len(commands) for _, commands in runs] == [2, 2, 1, 1]
+
+
+def test_pipeline_execute_batches_statements():
+    client = _mock_client()
+    client._bulk_select.return_value = {"a": (b"1", None)}
+    client._bulk_delete.return_value = 1
+
+    pipeline = MysqlPipeline(client)
+    pipeline.set("a", 1).set("b", "2").get("a").mget(["a", "b"]).delete("a")
+    results = pipeline.execute()
+
+    assert results == [True, True, b"1", [b"1", None], 1]
+    conn = _transaction(client.engine).__enter__.return_value
+    client._bulk_upsert.assert_called_once_with(conn, [("a", b"1", None), ("b", b"2", None)])
+    client._bulk_select.assert_called_once()
+    client._bulk_delete.assert_called_once_with(conn, ["a"])
+    client.engine.begin.assert_called_once()
+    assert len(pipeline) == 0
+
+
+def test_pipeline_execute_splits_delete_counts():
+    client = _mock_client()
+    client._bulk_select.return_value = {"a": (b"1", None), "b": (b"2", None)}
+    client._bulk_delete.return_value = 2
+
+    pipeline = MysqlPipeline(client)
+    pipeline.delete("a", "c").delete("a", "b")
+
+    assert pipeline.execute() == [1, 1]
+
+
+def test_pipeline_execute_rolls_back_on_error():
+    client = _mock_client()
+    client._bulk_upsert.side_effect = RuntimeError("boom")
+
+    pipeline = MysqlPipeline(client)
+    pipeline.set("a", "1")
+
+    assert pipeline.execute(raise_on_error=False) == [None]
+    # the transaction context manager saw the exception and rolls back
+    exc_type = _transaction(client.engine).__exit__.call_args.args[0]
+    assert exc_type is RuntimeError
+
+
+@pytest.mark.parametrize(
+    ("min_score", "max_score", "condition", "params"),
+    [
+        ("-inf", "+inf", "1 = 1", {}),
+        (0, 100, "score >= :min_score AND score <= :max_score", {"min_score": 0.0, "max_score": 100.0}),
+        ("(1", b"(5", "score > :min_score AND score < :max_score", {"min_score": 1.0, "max_score": 5.0}),
+        ("-inf", 10, "score <= :max_score", {"max_score": 10.0}),
+        ("+inf", 10, "1 = 0 AND score <= :max_score", {"max_score": 10.0}),
+    ],
+)
+def test_score_range_condition(min_score, max_score, condition, params):
+    assert _score_range_condition(min_score, max_score) == (condition, params)
+
+
+def _mock_lock_engine(rowcount):
+    engine = MagicMock()
+    conn = _transaction(engine).__enter__.return_value
+    conn.execute.return_value.rowcount = rowcount
+    return engine, conn
+
+
+def test_lock_acquire_and_release_by_token():
+    engine, conn = _mock_lock_engine(rowcount=1)
+    lock = MysqlLock(engine, "test", timeout=10)
+
+    assert lock.acquire(blocking=False) is True
+    token = conn.execute.call_args.args[1]["cache_value"]
+    lock.release()
+
+    release_params = conn.execute.call_args.args[1]
+    assert release_params == {"cache_key": "lock_test", "cache_value": token}
+    assert lock.acquire(blocking=False) is True
+    assert conn.execute.call_args.args[1]["cache_value"] != token
+
+
+def test_lock_blocking_acquire_backs_off_until_timeout():
+    engine, conn = _mock_lock_engine(rowcount=0)
+    lock = MysqlLock(engine, "test", timeout=10, sleep=0.01, blocking_timeout=0.2)
+
+    started = time.monotonic()
+    assert lock.acquire() is False
+    elapsed = time.monotonic() - started
+
+    assert 0.2 <= elapsed < 1
+    # one INSERT IGNORE plus one expired-lock DELETE per attempt, with exponential backoff between attempts
+    attempts = conn.execute.call_count // 2
+    assert 2 <= attempts < 20
+
+
+def test_lock_extend_requires_ownership():
+    engine, conn = _mock_lock_engine(rowcount=1)
+    lock = MysqlLock(engine, "test", timeout=10)
+
+    assert lock.extend(10) is False
+    lock.acquire(blocking=False)
+    assert lock.extend(10) is True
+    conn.execute.return_value.rowcount = 0
+    assert lock.extend(10) is False
+
+
+def test_client_never_touches_request_session():
+    meta_db = MagicMock()
+    engine = MagicMock()
+    client = MysqlRedisClient(meta_db, engine=engine)
+
+    client.set("key", "value", ex=10)
+    client.get("key")
+    client.delete("key")
+    client.zadd("zset", {"member": 1})
+
+    assert engine.begin.call_count == 3
+    assert engine.connect.call_count == 1
+    assert meta_db.session.mock_calls == []
+
+
+def _mock_engine_client():
+    engine = MagicMock()
+    return MysqlRedisClient(MagicMock(), engine=engine), engine
+
+
+def test_writes_queue_invalidations_without_a_local_layer():
+    client, engine = _mock_engine_client()
+    assert client._local_cache is None
+    conn = engine.begin.return_value.__enter__.return_value
+
+    client.delete("a", "b")
+
+    statement, params = conn.execute.call_args.args
+    assert str(statement).startswith("INSERT INTO cache_invalidations")
+    assert params == [{"cache_key": "a"}, {"cache_key": "b"}]
+
+
+def test_hset_upserts_all_fields_in_one_statement():
+    client, engine = _mock_engine_client()
+    conn = engine.begin.return_value.__enter__.return_value
+    # one field inserted, one field updated
+    conn.execute.return_value.rowcount = 3
+
+    assert client.hset("hash", "a", 1, mapping={"b": b"2"}) == 1
+
+    statement, params = conn.execute.call_args.args
+    assert "INSERT INTO cache_hashes" in str(statement)
+    assert "ON DUPLICATE KEY UPDATE" in str(statement)
+    assert (params["field_0"], params["value_0"]) == ("b", b"2")
+    assert (params["field_1"], params["value_1"]) == ("a", b"1")
+
+
+def test_zadd_gives_new_members_the_key_expire_time():
+    client, engine = _mock_engine_client()
+    conn = engine.begin.return_value.__enter__.return_value
+    expire_time = datetime.now() + timedelta(seconds=60)
+    conn.execute.return_value.scalar.return_value = expire_time
+
+    client.zadd("zset", {"a": 1, "b": 2})
+
+    (select, _), (upsert, params) = (call.args for call in conn.execute.call_args_list)
+    assert "SELECT MAX(expire_time) FROM cache_sorted_sets" in str(select)
+    assert "expire_time > :now" in str(select)
+    assert "INSERT INTO cache_sorted_sets (cache_key, member, score, expire_time)" in str(upsert)
+    assert params["expire_time"] == expire_time
+    assert (params["member_1"], params["score_1"]) == ("b", 2.0)
+
+
+def test_zadd_revives_expired_members():
+    client, engine = _mock_engine_client()
+    conn = engine.begin.return_value.__enter__.return_value
+    # the whole key has expired, so it is recreated without a TTL
+    conn.execute.return_value.scalar.return_value = None
+
+    client.zadd("zset", {"a": 1})
+
+    upsert, params = conn.execute.call_args.args
+    assert "expire_time = IF(expire_time IS NOT NULL AND expire_time <= :now, VALUES(expire_time), expire_time)" in str(
+        upsert
+    )
+    assert params["expire_time"] is None
+
+
+def test_hgetall_returns_bytes_fields():
+    client, engine = _mock_engine_client()
+    conn = engine.connect.return_value.__enter__.return_value
+    row = MagicMock(field="request", value=b"1700000000.0")
+    conn.execute.return_value.all.return_value = [row]
+
+    assert client.hgetall("hash") == {b"request": b"1700000000.0"}
+
+
+def test_exists_counts_each_requested_key():
+    client, engine = _mock_engine_client()
+    conn = engine.connect.return_value.__enter__.return_value
+    conn.execute.return_value.scalars.return_value = ["a"]
+
+    assert client.exists("a", "b", "a") == 2
+    conn.execute.assert_called_once()
+
+
+@pytest.mark.parametrize(
+    ("exists", "expires_in", "expected"),
+    [
+        (False, None, -2),
+        (True, None, -1),
+        (True, 30, 30),
+    ],
+)
+def test_ttl(exists, expires_in, expected):
+    client, engine = _mock_engine_client()
+    expire_time = datetime.now() + timedelta(seconds=expires_in) if expires_in else None
+    row = MagicMock(expire_time=expire_time) if exists else None
+    engine.connect.return_value.__enter__.return_value.execute.return_value.first.return_value = row
+
+    assert client.ttl("key") == expected
+
+
+def test_getdel_deletes_in_the_reading_transaction():
+    client, engine = _mock_engine_client()
+    conn = engine.begin.return_value.__enter__.return_value
+    conn.execute.return_value.first.return_value = MagicMock(cache_value=b"value", expire_time=None)
+
+    assert client.getdel("key") == b"value"
+    select, delete, invalidate = (call.args[0] for call in conn.execute.call_args_list)
+    assert "FOR UPDATE" in str(select)
+    assert str(delete).startswith("DELETE FROM caches")
+    assert str(invalidate).startswith("INSERT INTO cache_invalidations")
+    engine.begin.assert_called_once()
+
+
+def test_sweeper_deletes_in_batches_until_exhausted():
+    client, engine = _mock_engine_client()
+    client._sweep_batch_size = 2
+    client._sweep_batch_pause = 0
+    conn = engine.begin.return_value.__enter__.return_value
+    # caches: two full batches then a partial one, the other tables are empty
+    results = iter([2, 2, 1, 0, 0, 0])
+    conn.execute.side_effect = lambda *args: MagicMock(rowcount=next(results))
+
+    assert client.cleanup_expired() == 5
+
+    statements = [str(call.args[0]) for call in conn.execute.call_args_list]
+    assert all("LIMIT :limit" in statement for statement in statements)
+    assert [statement.split()[2] for statement in statements] == [
+        "caches",
+        "caches",
+        "caches",
+        "cache_sorted_sets",
+        "cache_hashes",
+        # old invalidation rows are purged even without a local layer in this process
+        "cache_invalidations",
+    ]
+
+
+def test_sweeper_stops_when_lease_is_lost():
+    client, engine = _mock_engine_client()
+    client._sweep_batch_size = 1
+    client._sweep_batch_pause = 0
+    engine.begin.return_value.__enter__.return_value.execute.return_value.rowcount = 1
+    lease = MagicMock()
+    lease.extend.return_value = False
+
+    assert client.cleanup_expired(lease=lease) == 1
+    engine.begin.assert_called_once()
+
+
+def test_only_the_lease_holder_sweeps(monkeypatch):
+    client, _ = _mock_engine_client()
+    lease = MagicMock()
+    monkeypatch.setattr("extensions.ext_mysql_redis.MysqlLock", MagicMock(return_value=lease))
+    monkeypatch.setattr(client, "cleanup_expired", MagicMock(return_value=7))
+
+    lease.acquire.return_value = False
+    assert client._sweep_if_leader() == 0
+    client.cleanup_expired.assert_not_called()
+
+    lease.acquire.return_value = True
+    assert client._sweep_if_leader() == 7
+    client.cleanup_expired.assert_called_once_with(lease=lease)
+    lease.release.assert_not_called()
@@ -0,0 +1,95 @@
+"""
+Unit tests for the write-behind implementation of WorkflowNodeExecutionRepository.
+"""
+
+from unittest.mock import MagicMock
+
+from sqlalchemy.orm import sessionmaker
+
+from core.repositories.write_behind_workflow_node_execution_repository import WorkflowNodeExecutionWriter
+from models.workflow import WorkflowNodeExecutionModel
+
+
+def _db_model(id: str, status: str) -> WorkflowNodeExecutionModel:
+    model = WorkflowNodeExecutionModel()
+    model.id = id
+    model.status = status
+    return model
+
+
+def _session_factory() -> sessionmaker:
+    session_factory = MagicMock(spec=sessionmaker)
+    session_factory.kw = {"bind": "engine"}
+    return session_factory
+
+
+def test_flush_coalesces_saves_of_the_same_execution():
+    writer = WorkflowNodeExecutionWriter(interval=60, batch_size=100, max_attempts=3)
+    writer._write = MagicMock()
+    session_factory = _session_factory()
+
+    writer.add(session_factory, _db_model("a", "running"))
+    writer.add(session_factory, _db_model("b", "running"))
+    writer.add(session_factory, _db_model("a", "succeeded"))
+    assert writer.queue_depth == 2
+
+    writer.flush()
+
+    writer._write.assert_called_once()
+    rows = writer._write.call_args.args[1]
+    assert {row["id"]: row["status"] for row in rows} == {"a": "succeeded", "b": "running"}
+    assert writer.queue_depth == 0
+
+
+def test_failed_flush_is_retried_without_overwriting_newer_saves():
+    writer = WorkflowNodeExecutionWriter(interval=60, batch_size=100, max_attempts=3)
+    writer._write = MagicMock(side_effect=RuntimeError("database unavailable"))
+    session_factory = _session_factory()
+
+    writer.add(session_factory, _db_model("a", "running"))
+    writer.add(session_factory, _db_model("b", "running"))
+    writer.flush()
+    assert writer.queue_depth == 2
+
+    writer.add(session_factory, _db_model("a", "succeeded"))
+    writer._write = MagicMock()
+    writer.flush()
+
+    rows = writer._write.call_args.args[1]
+    assert {row["id"]: row["status"] for row in rows} == {"a": "succeeded", "b": "running"}
+
+
+def test_bad_row_does_not_block_the_others():
+    writer = WorkflowNodeExecutionWriter(interval=60, batch_size=100, max_attempts=3)
+    written: list[str] = []
+
+    def write(session_factory, rows):
+        if any(row["id"] == "bad" for row in rows):
+            raise RuntimeError("data too long")
+        written.extend(row["id"] for row in rows)
+
+    writer._write = MagicMock(side_effect=write)
+    session_factory = _session_factory()
+
+    for id in ("a", "bad", "b"):
+        writer.add(session_factory, _db_model(id, "succeeded"))
+    writer.flush()
+
+    assert sorted(written) == ["a", "b"]
+    assert list(writer._pending) == ["bad"]
+
+
+def test_row_is_dropped_after_max_attempts():
+    writer = WorkflowNodeExecutionWriter(interval=60, batch_size=100, max_attempts=2)
+    writer._write = MagicMock(side_effect=RuntimeError("data too long"))
+    session_factory = _session_factory()
+
+    writer.add(session_factory, _db_model("bad", "succeeded"))
+    writer.flush()
+    assert writer.queue_depth == 1
+
+    writer.flush()
+    assert writer.queue_depth == 0
+
+    writer.flush()
+    assert writer._write.call_count == 4